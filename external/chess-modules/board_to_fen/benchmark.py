@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the per-board CPU cost around the CNN: tiling and FEN decoding.
+
+Compares the current Tiler / Decoder_FEN with the previous implementations
+(64 PIL crops, regex squeezing inside the per-square loop). The CNN itself is
+not timed, tensorflow is not needed.
+
+    $ python benchmark.py [image_path] [repeats]
+"""
+import re
+import sys
+import timeit
+from itertools import product
+
+import numpy as np
+from PIL import Image
+
+from board_to_fen.utils import LEGEND, Decoder_FEN, Tiler
+
+
+def legacy_tiles(img, d=50) -> np.ndarray:
+    img = img.resize((400, 400), Image.NEAREST).convert('RGB')
+    w, h = img.size
+    tiles = [img.crop((j, i, j + d, i + d)) for i, j in product(range(0, h - h % d, d), range(0, w - w % d, d))]
+    return np.stack([np.asarray(tile) for tile in tiles]).astype(np.float32)
+
+
+def legacy_fen_decode(squares, end_of_row='/', black_view=False) -> str:
+    def squeeze(fen):
+        for run in range(8, 1, -1):
+            fen = re.sub('1' * run, str(run), fen)
+        return fen
+
+    long_fen = ''
+    for i, square in enumerate(squares):
+        if i % 8 == 0 and i > 0:
+            long_fen += end_of_row
+        long_fen += LEGEND[square]
+        fen = squeeze(long_fen)
+        if black_view:
+            fen = fen[::-1]
+    return fen
+
+
+def bench(label, fn, repeats) -> float:
+    seconds = min(timeit.repeat(fn, number=repeats, repeat=5)) / repeats
+    print(f"{label:<32}{seconds * 1e6:>10.1f} us / board")
+    return seconds
+
+
+if __name__ == "__main__":
+    image_path = sys.argv[1] if len(sys.argv) > 1 else "./test_images/test_image1.png"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    img = Image.open(image_path)
+    img.load()
+
+    decoder = Decoder_FEN()
+    squares = np.array(["rook_black", "empty", "empty", "king_black"] + ["empty"] * 56 + ["king_white"] * 1 + ["pawn_white"] * 3)
+
+    new_tiles = Tiler().get_tile_view(img).astype(np.float32, order='C').reshape(64, 50, 50, 3)
+    assert np.array_equal(new_tiles, legacy_tiles(img))
+    for black_view in (False, True):
+        assert decoder.fen_decode(squares, black_view=black_view) == legacy_fen_decode(squares, black_view=black_view)
+
+    old = bench("tiling (PIL crops)", lambda: legacy_tiles(img), repeats)
+    new = bench("tiling (reshape view)", lambda: Tiler().get_tile_view(img).astype(np.float32, order='C').reshape(64, 50, 50, 3), repeats)
+    print(f"{'':<32}{old / new:>10.1f} x faster")
+    old = bench("FEN decoding (regex per square)", lambda: legacy_fen_decode(squares, black_view=True), repeats)
+    new = bench("FEN decoding (single pass)", lambda: decoder.fen_decode(squares, black_view=True), repeats)
+    print(f"{'':<32}{old / new:>10.1f} x faster")
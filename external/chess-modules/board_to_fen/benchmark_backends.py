@@ -0,0 +1,63 @@
+"""
+Latency and memory of the inference backends (see board_to_fen.predict.BACKENDS).
+
+Every backend is measured in a fresh process: time to import and load the
+model, per-board prediction latency (p50 / p95 over repeated boards) and peak
+resident memory. Backends whose runtime or exported model is missing are
+reported as unavailable.
+
+    $ python benchmark_backends.py [image_path] [repeats]
+"""
+import json
+import subprocess
+import sys
+
+from board_to_fen.predict import BACKENDS
+
+
+WORKER = r"""
+import json, resource, sys, time
+import numpy as np
+from PIL import Image
+
+start = time.perf_counter()
+from board_to_fen.predict import get_fen_from_image, get_model
+get_model(sys.argv[1])
+load_s = time.perf_counter() - start
+
+img = Image.open(sys.argv[2])
+img.load()
+fen = get_fen_from_image(img, backend=sys.argv[1])  # Warm up
+latencies = []
+for _ in range(int(sys.argv[3])):
+    start = time.perf_counter()
+    get_fen_from_image(img, backend=sys.argv[1])
+    latencies.append(time.perf_counter() - start)
+print(json.dumps({
+    "load_s": load_s,
+    "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+    "p95_ms": float(np.percentile(latencies, 95)) * 1e3,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+    "fen": fen,
+}))
+"""
+
+
+if __name__ == "__main__":
+    image_path = sys.argv[1] if len(sys.argv) > 1 else "./test_images/test_image1.png"
+    repeats = sys.argv[2] if len(sys.argv) > 2 else "50"
+
+    print(f"{'backend':<14}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}  FEN")
+    for backend in BACKENDS:
+        run = subprocess.run(
+            [sys.executable, "-c", WORKER, backend, image_path, repeats], capture_output=True, text=True
+        )
+        if run.returncode != 0:
+            error = (run.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{backend:<14}unavailable: {error}")
+            continue
+        result = json.loads(run.stdout.strip().splitlines()[-1])
+        print(
+            f"{backend:<14}{result['load_s']:>8.2f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            f"{result['max_rss_mb']:>9.0f}  {result['fen']}"
+        )
@@ -3,13 +3,18 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # Ignore warnings (E.g. CUDA drivers,
 from contextlib import redirect_stderr
 from keras import models, layers
 import numpy as np
+from .runtime import _Classifier
+from .utils import CATEGORIES, INPUT_SCALE, TILE_SHAPE as INPUT_SHAPE
 
-INPUT_SHAPE = (50, 50, 3)
+class KerasNeuralNetwork(_Classifier):
+    """
+    The square classifier CNN, trained and run with keras. predict / predict_boards
+    are shared with the lightweight runtimes (see runtime._Classifier).
+    """
 
-class KerasNeuralNetwork:
     def __init__(self) -> None:
-        self.CATEGORIES = ["bishop_black", "bishop_white","empty","king_black","king_white","knight_black", "knight_white","pawn_black", "pawn_white", "queen_black","queen_white", "rook_black","rook_white"]
-        self.predictions = []
+        super().__init__()
+        self.CATEGORIES = list(CATEGORIES)
         self.model = models.Sequential()
         self.model.add(layers.Input(shape=INPUT_SHAPE))
         #self.model.add(layers.Conv2D(50, (3,3), activation='relu', input_shape=(50,50,3)))  # DEPRECATED
@@ -24,8 +29,21 @@ class KerasNeuralNetwork:
         self.model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
 
     def fit(self, train_images, train_labels, test_images, test_labels, num_of_epochs=2, batch_size=32):
+        train_images = np.asarray(train_images, dtype=np.float32) * INPUT_SCALE
+        test_images = np.asarray(test_images, dtype=np.float32) * INPUT_SCALE
         self.model.fit(train_images, train_labels, epochs=num_of_epochs, verbose=1, validation_data=(test_images, test_labels), batch_size=batch_size)
 
+    def fit_dataset(self, train_dataset, test_dataset=None, num_of_epochs=2):
+        """
+        Train on batched tf.data datasets, e.g. from DataFetcher.get_datasets(scale=INPUT_SCALE)
+        """
+        self.model.fit(train_dataset, epochs=num_of_epochs, verbose=1, validation_data=test_dataset)
+
+    def evaluate_dataset(self, test_dataset):
+        loss, accuracy = self.model.evaluate(test_dataset)
+        print(f"accuracy:{accuracy}")
+        print(f"loss:{loss}")
+
     def save(self, path='.') -> None:
         self.model.save(path)
 
@@ -40,13 +58,5 @@ class KerasNeuralNetwork:
     def load_model(self, path):
         self.model = models.load_model(path)
     
-    def predict(self, tiles) -> list:
-        for image in tiles:
-            image = np.array(image)
-            image = np.reshape(image, (INPUT_SHAPE))
-            image = np.expand_dims(image, axis=0)
-            prediction = self.model.predict(image, verbose=0)
-            index = np.argmax(prediction)
-            self.predictions.append(self.CATEGORIES[index])
-        self.predictions = np.array(self.predictions)
-        return self.predictions
\ No newline at end of file
+    def _forward(self, batch) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(batch))
@@ -0,0 +1,126 @@
+"""
+Export the square classifier to lightweight runtimes and check their parity.
+
+    $ python -m board_to_fen.export                 # TFLite float + int8, ONNX, then parity check
+    $ python -m board_to_fen.export --formats tflite_int8 --calibration ./test_splitted/
+
+Needs tensorflow / keras (and tf2onnx for ONNX) at export time only. The
+exported files are written next to the Keras weights and picked by
+get_model(backend=...).
+"""
+import argparse
+import os
+
+import numpy as np
+from PIL import Image
+
+from .utils import Tiler
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(CURRENT_DIR, "saved_models")
+TEST_IMAGES_DIR = os.path.join(os.path.dirname(CURRENT_DIR), "test_images")
+EXPORT_PATHS = {
+    "tflite": os.path.join(MODELS_DIR, "november_model.tflite"),
+    "tflite_int8": os.path.join(MODELS_DIR, "november_model_int8.tflite"),
+    "onnx": os.path.join(MODELS_DIR, "november_model.onnx"),
+}
+
+
+def load_tiles(image_dir, limit=None) -> np.ndarray:
+    """
+    Square images used to calibrate int8 quantization and check parity.
+
+    Board images (any size) are split into their 64 squares; directories of
+    50x50 tiles (e.g. a training set) are read as they are.
+
+    Returns:
+        np.ndarray: float32 tiles, shape (n, 50, 50, 3)
+    """
+    tiler = Tiler()
+    tiles = []
+    for root, _, filenames in os.walk(image_dir):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
+                continue
+            with Image.open(os.path.join(root, filename)) as img:
+                if img.size == (50, 50):
+                    tiles.append(np.asarray(img.convert("RGB"))[None])
+                else:
+                    tiles.append(tiler.get_tiles(img))
+    tiles = np.concatenate(tiles).astype(np.float32)
+    return tiles[:limit] if limit else tiles
+
+
+def export_tflite(model, output_path, calibration_tiles=None) -> str:
+    """
+    Convert the Keras model to TFLite. With calibration tiles, weights and
+    activations are quantized to int8 (inputs and outputs stay float32).
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if calibration_tiles is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        def representative_dataset():
+            for tile in calibration_tiles:
+                yield [tile[None].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def export_onnx(model, output_path, opset=13) -> str:
+    """
+    Convert the Keras model to ONNX (needs tf2onnx).
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    signature = [tf.TensorSpec((None, 50, 50, 3), tf.float32, name="tiles")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output_path)
+    return output_path
+
+
+def check_parity(backends, tiles, reference="keras") -> dict:
+    """
+    Share of squares classified like the reference backend.
+
+    Returns:
+        dict: Agreement rate per backend
+    """
+    from .predict import get_model
+
+    expected = get_model(reference).predict(tiles)
+    return {backend: float(np.mean(get_model(backend).predict(tiles) == expected)) for backend in backends}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the board_to_fen square classifier")
+    parser.add_argument("--formats", nargs="+", choices=list(EXPORT_PATHS), default=list(EXPORT_PATHS))
+    parser.add_argument("--calibration", default=TEST_IMAGES_DIR, help="Boards or tiles used for int8 calibration")
+    parser.add_argument("--calibration-size", type=int, default=512)
+    parser.add_argument("--parity-images", default=TEST_IMAGES_DIR, help="Boards or tiles used for the parity check")
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    from .predict import get_model
+
+    model = get_model("keras").model
+    for fmt in args.formats:
+        if fmt == "onnx":
+            path = export_onnx(model, EXPORT_PATHS[fmt])
+        else:
+            calibration = load_tiles(args.calibration, limit=args.calibration_size) if fmt == "tflite_int8" else None
+            path = export_tflite(model, EXPORT_PATHS[fmt], calibration_tiles=calibration)
+        print(f"{fmt}: {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+
+    agreement = check_parity(args.formats, load_tiles(args.parity_images))
+    for backend, rate in agreement.items():
+        print(f"{backend}: {rate:.2%} of squares classified like keras")
+    failed = [backend for backend, rate in agreement.items() if rate < args.min_agreement]
+    if failed:
+        raise SystemExit(f"Parity check failed for {failed} (min agreement {args.min_agreement:.0%})")
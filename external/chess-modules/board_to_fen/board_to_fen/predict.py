@@ -1,9 +1,8 @@
 import io
 from PIL import Image
-from .KerasNeuralNetwork import KerasNeuralNetwork
 from .utils import Decoder_FEN, Tiler
 import os
-import tensorflow as tf
+import threading
 from board_to_fen import saved_models
 import numpy as np
 
@@ -14,9 +13,6 @@ import numpy as np
 #     import importlib_resources as pkg_resources
 # deprecated
 
-os.sys.path.append("board_to_fen/KerasNeuralNetwork")
-from .KerasNeuralNetwork import KerasNeuralNetwork
-
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(CURRENT_DIR, "saved_models")
 PATH_TO_MODEL = os.path.join(MODELS_DIR, "november_model")
@@ -24,11 +20,58 @@ PATH_TO_MODEL_WEIGHTS = os.path.join(MODELS_DIR, "november_model_weights.h5")
 # MODELS_DIR = "board_to_fen/saved_models/"
 # PATH_TO_MODEL_WEIGHTS = os.path.join(MODELS_DIR, "november_model_weights.h5")
 
-model = KerasNeuralNetwork()
-model.load_model_from_weights(path=PATH_TO_MODEL_WEIGHTS)
+# Inference runtime: "keras" (tensorflow), or a model exported by export.py:
+# "tflite", "tflite_int8" or "onnx", which don't import tensorflow
+BACKENDS = ("keras", "tflite", "tflite_int8", "onnx")
+DEFAULT_BACKEND = os.getenv("BOARD_TO_FEN_BACKEND", "keras")
+
+# Models are only loaded on the first prediction, one per backend
+_models = {}
+_model_lock = threading.Lock()
 # model = tf.keras.models.load_model("board_to_fen/saved_models/november_model_weights.h5")
 
-def get_fen_from_image_path(image_path, end_of_row='/', black_view=False) -> str:
+def _load_model(backend):
+    if backend == "keras":
+        from .KerasNeuralNetwork import KerasNeuralNetwork
+        net = KerasNeuralNetwork()
+        net.load_model_from_weights(path=PATH_TO_MODEL_WEIGHTS)
+        return net
+    from .export import EXPORT_PATHS
+    from .runtime import ONNXClassifier, TFLiteClassifier
+    if not os.path.isfile(EXPORT_PATHS[backend]):
+        raise FileNotFoundError(f"{EXPORT_PATHS[backend]} not found, run python -m board_to_fen.export first")
+    if backend == "onnx":
+        return ONNXClassifier(EXPORT_PATHS[backend])
+    return TFLiteClassifier(EXPORT_PATHS[backend])
+
+def get_model(backend=None):
+    """
+    Load the square classifier of a backend on first use and reuse it afterwards.
+    Heavy imports (tensorflow / keras, onnxruntime, ...) are deferred to this call.
+
+    Parameters
+    ----------
+    backend : str, optional
+        One of BACKENDS, BOARD_TO_FEN_BACKEND (default "keras") if omitted
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend not in _models:
+        with _model_lock:
+            if backend not in _models:
+                _models[backend] = _load_model(backend)
+    return _models[backend]
+
+def _board_tiles(image) -> np.ndarray:
+    """
+    Split a board image into its 64 squares, shape (64, 50, 50, 3)
+    """
+    # One copy: the tile view is converted to a contiguous float32 batch
+    return Tiler().get_tile_view(img=image).astype(np.float32, order='C').reshape(64, 50, 50, 3)
+
+
+def get_fen_from_image_path(image_path, end_of_row='/', black_view=False, backend=None) -> str:
     """
     Predict FEN position from path to a chess image.
 
@@ -40,28 +83,16 @@ def get_fen_from_image_path(image_path, end_of_row='/', black_view=False) -> str
         Indicate how to process end of chess row
     black_view : bool
         Set to True iff the board is viewed from Black's perspective.
+    backend : str, optional
+        Inference runtime, see get_model
     
     Returns:
         str: Predicted chess position in FEN notation
     """
     image = Image.open(image_path)
-    decoder = Decoder_FEN()
-    # net = KerasNeuralNetwork()
-    tiler = Tiler()
-    tiles = tiler.get_tiles(img=image)
-
-    # f = pkg_resources.open_text(saved_models, 'november_model')  # Deprecated
-    #net.load_model(f.name)
-    #predictions = net.predict(tiles=tiles) # Deprecated
-
-    # convert tiles object to tf tensor before compute predictions
-    tiles_array = np.array([np.array(tile) for tile in tiles], dtype=np.float32)
-    tiles_tensor = tf.convert_to_tensor(tiles_array, dtype=tf.float32)
-    predictions = model.predict(tiles_tensor)
-    fen = decoder.fen_decode(squares=predictions, end_of_row=end_of_row, black_view=black_view)
-    return fen
+    return get_fen_from_image(image, end_of_row=end_of_row, black_view=black_view, backend=backend)
 
-def get_fen_from_image(image, end_of_row='/', black_view=False) -> str:
+def get_fen_from_image(image, end_of_row='/', black_view=False, backend=None) -> str:
     """
     Predict FEN position from Image-like object, which represents a chess board.
 
@@ -73,20 +104,17 @@ def get_fen_from_image(image, end_of_row='/', black_view=False) -> str:
         Indicate how to process end of chess row
     black_view : bool
         Set to True if the board is viewed from Black's perspective.
+    backend : str, optional
+        Inference runtime, see get_model
 
     
     Returns:
         str: Predicted chess position in FEN notation
     """
     decoder = Decoder_FEN()
-    tiler = Tiler()
-    tiles = tiler.get_tiles(img=image)
 
-    tiles_array = np.array([np.array(tile) for tile in tiles], dtype=np.float32)
-    tiles_tensor = tf.convert_to_tensor(tiles_array, dtype=tf.float32)
-
-    # Predict
-    predictions = model.predict(tiles_tensor)
+    # Predict the 64 squares in a single forward pass
+    predictions = get_model(backend).predict(_board_tiles(image))
 
     # Decode predictions to FEN
     fen = decoder.fen_decode(
@@ -96,6 +124,46 @@ def get_fen_from_image(image, end_of_row='/', black_view=False) -> str:
     )
     return fen
 
+def get_fen_from_images(images, end_of_row='/', black_view=False, backend=None) -> list:
+    """
+    Predict FEN positions of several chess boards with a single batched inference.
+
+    Parameters
+    ----------
+    images : list
+        Paths to chess images and / or PIL.Image objects
+    end_of_row : str
+        Indicate how to process end of chess row
+    black_view : bool or list of bool
+        Set to True if the boards are viewed from Black's perspective. Pass a
+        list to set it board by board.
+    backend : str, optional
+        Inference runtime, see get_model
+
+    Returns:
+        list: Predicted chess positions in FEN notation, in the same order as images
+
+    Example:
+        >>> get_fen_from_images(["board_1.png", "board_2.png"])
+        ['rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', '8/8/8/4k3/8/8/8/4K3']
+    """
+    if not images:
+        return []
+    if isinstance(black_view, bool):
+        black_view = [black_view] * len(images)
+
+    boards = np.stack([
+        _board_tiles(Image.open(image) if isinstance(image, (str, os.PathLike)) else image)
+        for image in images
+    ])
+    predictions = get_model(backend).predict_boards(boards)
+
+    decoder = Decoder_FEN()
+    return [
+        decoder.fen_decode(squares=squares, end_of_row=end_of_row, black_view=view)
+        for squares, view in zip(predictions, black_view)
+    ]
+
 if __name__ == "__main__":
     img_path = "./board_to_fen/test_image.jpeg"
     fen = get_fen_from_image_path(img_path)
@@ -0,0 +1,135 @@
+"""
+Lightweight CPU runtimes for the square classifier.
+
+The CNN exported by export.py (TFLite, optionally int8 quantized, or ONNX) is
+run without importing tensorflow / keras, which cuts import time and resident
+memory of the process. Both classifiers share the batched predict /
+predict_boards of _Classifier with KerasNeuralNetwork.
+"""
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+
+from .utils import CATEGORIES, INPUT_SCALE, PREDICT_BATCH_SIZE, TILE_SHAPE
+
+
+def _as_tiles(tiles) -> np.ndarray:
+    if isinstance(tiles, (list, tuple)):
+        tiles = np.stack([np.asarray(tile) for tile in tiles])
+    tiles = np.asarray(tiles, dtype=np.float32).reshape((-1, *TILE_SHAPE))
+    if INPUT_SCALE != 1.0:
+        tiles = tiles * INPUT_SCALE
+    return tiles
+
+
+class _Classifier(ABC):
+    """
+    Batched predict / predict_boards on top of a runtime specific forward pass.
+    """
+
+    def __init__(self) -> None:
+        self._categories = np.array(CATEGORIES)
+        self.predictions = []
+
+    @abstractmethod
+    def _forward(self, batch) -> np.ndarray:
+        """
+        Class probabilities of a float32 batch of tiles, shape (n, len(CATEGORIES)).
+        """
+
+    def predict(self, tiles, batch_size=PREDICT_BATCH_SIZE) -> np.ndarray:
+        """
+        Classify board squares with batched forward passes.
+
+        Parameters
+        ----------
+        tiles : array-like
+            Square images, shape (n, 50, 50, 3). Lists of PIL images are accepted too
+        batch_size : int
+            Max number of squares per forward pass
+
+        Returns:
+            np.ndarray: Category name of each square, shape (n,)
+        """
+        tiles = _as_tiles(tiles)
+        indexes = np.empty(len(tiles), dtype=np.int64)
+        for start in range(0, len(tiles), batch_size):
+            probabilities = self._forward(tiles[start:start + batch_size])
+            indexes[start:start + batch_size] = np.argmax(probabilities, axis=-1)
+        self.predictions = self._categories[indexes]
+        return self.predictions
+
+    def predict_boards(self, boards, batch_size=PREDICT_BATCH_SIZE) -> np.ndarray:
+        """
+        Classify the 64 squares of several boards at once.
+
+        Returns:
+            np.ndarray: Category name of each square, shape (n_boards, 64)
+        """
+        boards = np.asarray(boards, dtype=np.float32).reshape((-1, 64, *TILE_SHAPE))
+        return self.predict(boards, batch_size=batch_size).reshape(len(boards), 64)
+
+
+def _tflite_interpreter_class():
+    # Smallest runtime available first, full tensorflow as a last resort
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+class TFLiteClassifier(_Classifier):
+    """
+    Square classifier exported to TFLite (float or int8 quantized).
+
+    Example:
+        >>> net = TFLiteClassifier("saved_models/november_model_int8.tflite")
+        >>> net.predict(tiles)[:3]
+        array(['rook_black', 'knight_black', 'bishop_black'], dtype='<U12')
+    """
+
+    def __init__(self, path, num_threads=None) -> None:
+        super().__init__()
+        self.interpreter = _tflite_interpreter_class()(model_path=path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        self._lock = threading.Lock()  # An interpreter is not thread safe
+
+    def _forward(self, batch) -> np.ndarray:
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], [len(batch), *TILE_SHAPE])
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            if self._input["dtype"] != np.float32:  # Fully quantized model
+                scale, zero_point = self._input["quantization"]
+                limits = np.iinfo(self._input["dtype"])
+                batch = np.clip(np.round(batch / scale + zero_point), limits.min, limits.max)
+                batch = batch.astype(self._input["dtype"])
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output["index"]).copy()
+
+
+class ONNXClassifier(_Classifier):
+    """
+    Square classifier exported to ONNX, run with onnxruntime.
+    """
+
+    def __init__(self, path, num_threads=None) -> None:
+        super().__init__()
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def _forward(self, batch) -> np.ndarray:
+        return self.session.run(None, {self._input_name: batch})[0]
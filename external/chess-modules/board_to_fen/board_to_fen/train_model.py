@@ -2,21 +2,17 @@ import os
 # silence tensorflow and keras debugging information
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '1'
 from .utils import DataFetcher
-from .KerasNeuralNetwork import KerasNeuralNetwork
+from .KerasNeuralNetwork import INPUT_SCALE, KerasNeuralNetwork
 
 
 if __name__ == "__main__":
-    #fetch and prepare data
-    fetcher = DataFetcher()
-    fetcher.fetch_and_shuffle(data_dir='./test_splitted/')
-    train_images, train_labels, test_images, test_labels = fetcher.get_train_test()
+    #fetch and prepare data, tiles are decoded in parallel into a memory-mapped uint8 array
+    with DataFetcher() as fetcher:  # Deletes the temporary memory-map file when done
+        fetcher.fetch_and_shuffle(data_dir='./test_splitted/')
+        train_dataset, test_dataset = fetcher.get_datasets(batch_size=32, scale=INPUT_SCALE)
 
-    #call and feed the neural network
-    net = KerasNeuralNetwork()
-    net.fit(train_images, train_labels, test_images, test_labels)
-    net.evaluate(test_images, test_labels)
+        #call and feed the neural network
+        net = KerasNeuralNetwork()
+        net.fit_dataset(train_dataset, test_dataset)
+        net.evaluate_dataset(test_dataset)
     net.save(path='./saved_models/another_model')
-
-
-
-
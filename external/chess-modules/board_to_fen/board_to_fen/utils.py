@@ -1,11 +1,19 @@
 import os
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import random
-import re
 from PIL import Image
-from itertools import product
 
 
+TILE_SHAPE = (50, 50, 3)
+PREDICT_BATCH_SIZE = 64 * 8  # Squares per forward pass (8 boards)
+# Pixel scale of the network inputs. The shipped weights take raw 0-255 pixels,
+# training and inference must use the same value
+INPUT_SCALE = 1.0
+# Output classes of the square classifier, in the order of the network outputs
+CATEGORIES = ["bishop_black", "bishop_white","empty","king_black","king_white","knight_black", "knight_white","pawn_black", "pawn_white", "queen_black","queen_white", "rook_black","rook_white"]
+
 LEGEND = {
     'pawn_white' : 'P',
     'pawn_black' : 'p',
@@ -26,16 +34,6 @@ class Decoder_FEN():
     def __init__(self) -> None:
         pass
 
-    def _squeeze(self, input) -> str:
-        filtered = re.sub('11111111', '8', input)
-        filtered = re.sub('1111111', '7', filtered)
-        filtered = re.sub('111111', '6', filtered)
-        filtered = re.sub('11111', '5', filtered)
-        filtered = re.sub('1111', '4', filtered)
-        filtered = re.sub('111', '3', filtered)
-        squeezed = re.sub('11', '2', filtered)
-        return squeezed
-
     def _simple_validator(self, squares):
         ''' ensures that model:
             - found only one white king
@@ -60,67 +58,223 @@ class Decoder_FEN():
             return 'invalid'
 
     def fen_decode(self, squares, end_of_row='/', black_view=False) -> str:
+        """
+        Encode the 64 predicted squares (a8 to h1 as seen on the image) as a FEN piece placement.
+
+        Empty squares are run-length encoded in a single pass. A board seen from
+        Black's perspective is the same board rotated by 180 degrees, so the
+        squares are read in reverse order once.
+        """
         if (self._simple_validator(squares) == 'invalid'):
             return 'Model can\'t find valid chessboard layout'
-        long_fen = ''
+        if black_view:
+            squares = squares[::-1]
+        fen = []
+        empty = 0
         for i, square in enumerate(squares):
-            if i % 8 == 0 and i>0:
-                long_fen+=end_of_row
-            long_fen+=LEGEND[square]
-            fen = self._squeeze(long_fen)
-            if black_view:
-                fen = fen[::-1]
-        return fen
+            if i % 8 == 0 and i > 0:
+                if empty:
+                    fen.append(str(empty))
+                    empty = 0
+                fen.append(end_of_row)
+            if square == 'empty':
+                empty += 1
+                continue
+            if empty:
+                fen.append(str(empty))
+                empty = 0
+            fen.append(LEGEND[square])
+        if empty:
+            fen.append(str(empty))
+        return ''.join(fen)
+
+
+def _remove_file(path) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 
 class DataFetcher:
-    def __init__(self) -> None: 
-        self.CATEGORIES = ["bishop_black", "bishop_white","empty","king_black","king_white","knight_black", "knight_white","pawn_black", "pawn_white", "queen_black","queen_white", "rook_black","rook_white"]        
-        self.data = []
-        self.images = []
-        self.labels = []
-
-    def fetch_and_shuffle(self, data_dir):
-        for category in self.CATEGORIES:
+    """
+    Load a training set of square images (data_dir/<category>/<image>).
+
+    Tiles are decoded in parallel straight into a preallocated uint8 array,
+    memory-mapped to disk unless memmap_path is False, so peak memory stays
+    about one byte per pixel. Shuffling permutes an index vector, the images
+    are never moved. The default temporary memory-map file is deleted by
+    close(), or when the fetcher is garbage collected.
+
+    Example:
+        >>> with DataFetcher() as fetcher:
+        ...     fetcher.fetch_and_shuffle('./test_splitted/')
+        ...     train_dataset, test_dataset = fetcher.get_datasets(scale=INPUT_SCALE)
+        ...     net.fit_dataset(train_dataset, test_dataset)
+    """
+
+    def __init__(self, workers=None) -> None:
+        self.CATEGORIES = list(CATEGORIES)
+        self.workers = workers or os.cpu_count() or 1
+        self.images = np.empty((0, *TILE_SHAPE), dtype=np.uint8)
+        self.labels = np.empty(0, dtype=np.int64)
+        self.order = np.empty(0, dtype=np.int64)  # Shuffled indices of the readable tiles
+        self.failed = []  # Paths of the images that could not be decoded
+        self._remove_memmap = None  # Finalizer deleting the temporary memory-map file
+
+    def close(self) -> None:
+        """
+        Release the images and delete the temporary file backing them, if any.
+        """
+        self.images = np.empty((0, *TILE_SHAPE), dtype=np.uint8)  # Unmap before deleting
+        if self._remove_memmap is not None:
+            self._remove_memmap()
+            self._remove_memmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _load_tile(self, index, path) -> bool:
+        try:
+            with Image.open(path) as img:
+                tile = img.convert('RGB')
+                if tile.size != TILE_SHAPE[:2]:
+                    tile = tile.resize(TILE_SHAPE[:2], Image.NEAREST)
+                self.images[index] = np.asarray(tile)
+            return True
+        except Exception:
+            self.failed.append(path)
+            return False
+
+    def fetch_and_shuffle(self, data_dir, memmap_path=None, seed=None):
+        """
+        Decode every tile of data_dir and shuffle them.
+
+        Parameters
+        ----------
+        data_dir : str
+            Directory with one sub-directory of images per category
+        memmap_path : str or False, optional
+            .npy file backing the images, kept on disk. By default a temporary file,
+            deleted by close(). False keeps the images in RAM
+        seed : int, optional
+            Seed of the shuffle
+        """
+        files = []
+        for class_num, category in enumerate(self.CATEGORIES):
             path = os.path.join(data_dir, category)
-            class_num = self.CATEGORIES.index(category)
-            for filename in os.listdir(path):
-                try:
-                    img = Image.open(os.path.join(path,filename)).convert('RGB')
-                    ima = np.array(img)
-                    #consider division /255
-                    self.data.append([img/255, class_num])
-                except Exception as e:
-                    pass
-        random.shuffle(self.data)
-        self._create_labels_and_images()
-
-    def _create_labels_and_images(self):
-        for features, label in self.data:
-            self.images.append(features)
-            self.labels.append(label)
-        self.images = np.array(self.images).reshape(-1, 50, 50, 3)
-        self.labels = np.array(self.labels)
+            files.extend((os.path.join(path, filename), class_num) for filename in sorted(os.listdir(path)))
+
+        shape = (len(files), *TILE_SHAPE)
+        self.close()  # Previous images and their temporary file
+        if memmap_path is False:
+            self.images = np.empty(shape, dtype=np.uint8)
+        else:
+            if memmap_path is None:
+                fd, memmap_path = tempfile.mkstemp(suffix='.npy', prefix='board_to_fen_tiles_')
+                os.close(fd)
+                self._remove_memmap = weakref.finalize(self, _remove_file, memmap_path)
+            self.images = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=np.uint8, shape=shape)
+        self.labels = np.fromiter((class_num for _, class_num in files), dtype=np.int64, count=len(files))
+        self.failed = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:  # PIL decodes without the GIL
+            loaded = np.fromiter(
+                executor.map(self._load_tile, range(len(files)), (path for path, _ in files)),
+                dtype=bool,
+                count=len(files),
+            )
+        if self.failed:
+            print(f"{len(self.failed)} images could not be read and are skipped")
+        self.order = np.random.default_rng(seed).permutation(np.flatnonzero(loaded))
+
+    def split_indices(self, split=0.85):
+        """
+        Returns:
+            tuple: Shuffled train and test indices into images / labels
+        """
+        pivot = int(split * len(self.order))
+        return self.order[:pivot], self.order[pivot:]
 
     def get_train_test(self, split=0.85):
-        pivot = int(split * len(self.images))
-        train_images = self.images[:pivot]
-        train_labels = self.labels[:pivot]
-        test_images = self.images[pivot:]
-        test_labels = self.labels[pivot:]
-        return train_images, train_labels, test_images, test_labels
+        """
+        Train and test sets as in-memory arrays (a copy, see get_datasets for large sets).
+        """
+        train, test = self.split_indices(split)
+        # Sorted gathers read the memory map sequentially
+        train, test = np.sort(train), np.sort(test)
+        return self.images[train], self.labels[train], self.images[test], self.labels[test]
+
+    def get_datasets(self, split=0.85, batch_size=32, scale=1.0):
+        """
+        Streaming tf.data train and test sets: batches are gathered from the
+        images on the fly, converted to float32, scaled and prefetched while
+        the model trains. Training batches are reshuffled every epoch.
+
+        Parameters
+        ----------
+        split : float
+            Share of the tiles used for training
+        batch_size : int
+            Tiles per batch
+        scale : float
+            Pixel scale factor. It must match the one used at inference
+            (INPUT_SCALE)
+
+        Returns:
+            tuple: (train_dataset, test_dataset)
+        """
+        import tensorflow as tf
+
+        def gather(indices):
+            indices = np.sort(indices)
+            return self.images[indices], self.labels[indices]
+
+        def make(indices, shuffle):
+            dataset = tf.data.Dataset.from_tensor_slices(indices)
+            if shuffle:
+                dataset = dataset.shuffle(len(indices), reshuffle_each_iteration=True)
+            dataset = dataset.batch(batch_size).map(
+                lambda batch: tf.numpy_function(gather, [batch], (tf.uint8, tf.int64)),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
+
+            def normalize(images, labels):
+                images = tf.ensure_shape(images, (None, *TILE_SHAPE))
+                labels = tf.ensure_shape(labels, (None,))
+                return tf.cast(images, tf.float32) * scale, labels
+
+            return dataset.map(normalize, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+        train, test = self.split_indices(split)
+        return make(train, shuffle=True), make(test, shuffle=False)
 
 
 class Tiler:
     def __init__(self) -> None:
-        self.tile_images = []
         pass
 
-    def get_tiles(self, img, d=50) -> list:
-        img = img.resize((400,400), Image.NEAREST).convert('RGB')
-        w, h = img.size
-        grid = product(range(0, h-h%d, d), range(0, w-w%d, d))
-        for i, j in grid:
-            box = (j, i, j+d, i+d)
-            self.tile_images.append(img.crop(box))
-        return self.tile_images
+    def get_tile_view(self, img, d=50) -> np.ndarray:
+        """
+        Resize a board image and split it into its squares without copying them.
+
+        Returns:
+            np.ndarray: uint8 view of the resized board, shape (8, 8, d, d, 3),
+            indexed by [row, column] from the top left corner of the image
+        """
+        board = np.asarray(img.resize((8 * d, 8 * d), Image.NEAREST).convert('RGB'))
+        # (rows, y, columns, x, rgb) -> (rows, columns, y, x, rgb), strides only
+        return board.reshape(8, d, 8, d, 3).swapaxes(1, 2)
+
+    def get_tiles(self, img, d=50) -> np.ndarray:
+        """
+        Split a board image into its 64 squares, row by row from the top left corner.
+
+        Returns:
+            np.ndarray: uint8 array of shape (64, d, d, 3)
+        """
+        # Merging the (row, column) axes of the view needs one contiguous copy
+        return self.get_tile_view(img, d=d).reshape(64, d, d, 3)
@@ -1,6 +1,12 @@
 import pytest
-from board_to_fen.predict import get_fen_from_image, get_fen_from_image_path
+from board_to_fen.predict import get_fen_from_image, get_fen_from_image_path, get_fen_from_images, get_model
+from board_to_fen.export import EXPORT_PATHS, check_parity, load_tiles
+from board_to_fen.runtime import _Classifier
+from board_to_fen.utils import CATEGORIES, DataFetcher, Decoder_FEN, Tiler
 from PIL import Image
+import gc
+import os
+import numpy as np
 
 
 img_path = "./test_images/test_image1.png"
@@ -11,3 +17,96 @@ class TestNetwork:
     def test_object_prediction(self):
         img = Image.open(img_path)
         assert get_fen_from_image(img) == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+    def test_bulk_prediction(self):
+        img = Image.open(img_path)
+        assert get_fen_from_images([img_path, img]) == ["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"] * 2
+
+
+class TestUtils:
+    def test_tiles_order(self):
+        img = Image.open(img_path)
+        tiles = Tiler().get_tiles(img)
+        board = img.resize((400, 400), Image.NEAREST).convert('RGB')
+        assert tiles.shape == (64, 50, 50, 3)
+        assert np.array_equal(tiles[9], np.asarray(board.crop((50, 50, 100, 100))))
+    def test_tile_view_is_not_a_copy(self):
+        view = Tiler().get_tile_view(Image.open(img_path))
+        assert view.shape == (8, 8, 50, 50, 3) and view.base is not None
+    def test_fen_decode(self):
+        squares = ['rook_black', 'empty', 'empty', 'king_black'] + ['empty'] * 56 + ['king_white', 'pawn_white', 'empty', 'empty']
+        assert Decoder_FEN().fen_decode(squares) == "r2k4/8/8/8/8/8/8/4KP2"
+        assert Decoder_FEN().fen_decode(squares, black_view=True) == "2PK4/8/8/8/8/8/8/4k2r"
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_model("torch")
+
+
+def make_training_set(root, per_category=2):
+    for class_num, category in enumerate(CATEGORIES):
+        os.makedirs(root / category)
+        for i in range(per_category):
+            Image.new('RGB', (50, 50), (class_num * 10, i, 0)).save(root / category / f"{i}.png")
+    return str(root)
+
+
+class TestDataFetcher:
+    def test_fetch_and_shuffle(self, tmp_path):
+        with DataFetcher(workers=2) as fetcher:
+            fetcher.fetch_and_shuffle(make_training_set(tmp_path), seed=0)
+            assert fetcher.images.shape == (2 * len(CATEGORIES), 50, 50, 3)
+            assert sorted(fetcher.order) == list(range(2 * len(CATEGORIES)))
+            assert fetcher.images[fetcher.labels == 3][0, 0, 0, 0] == 30
+    def test_temporary_memmap_is_deleted(self, tmp_path):
+        data_dir = make_training_set(tmp_path / "data", per_category=1)
+        fetcher = DataFetcher()
+        fetcher.fetch_and_shuffle(data_dir)
+        path = fetcher.images.filename
+        assert os.path.isfile(path)
+        fetcher.close()
+        assert not os.path.exists(path)
+
+        fetcher.fetch_and_shuffle(data_dir)
+        path = fetcher.images.filename
+        del fetcher
+        gc.collect()
+        assert not os.path.exists(path)
+    def test_explicit_memmap_is_kept(self, tmp_path):
+        path = str(tmp_path / "tiles.npy")
+        with DataFetcher() as fetcher:
+            fetcher.fetch_and_shuffle(make_training_set(tmp_path / "data", per_category=1), memmap_path=path)
+        assert np.load(path).shape == (len(CATEGORIES), 50, 50, 3)
+
+
+class MeanColorClassifier(_Classifier):
+    # Category index = red channel of the tile // 10
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+    def _forward(self, batch):
+        self.batch_sizes.append(len(batch))
+        return np.eye(len(CATEGORIES))[(batch[:, 0, 0, 0] // 10).astype(int)]
+
+
+class TestRuntime:
+    def test_forward_is_abstract(self):
+        with pytest.raises(TypeError):
+            _Classifier()
+    def test_batched_predict(self):
+        net = MeanColorClassifier()
+        boards = np.zeros((3, 64, 50, 50, 3), dtype=np.uint8)
+        boards[1, 5] = 30
+        predictions = net.predict_boards(boards, batch_size=100)
+        assert predictions.shape == (3, 64)
+        assert predictions[1, 5] == CATEGORIES[3] and predictions[0, 5] == CATEGORIES[0]
+        assert net.batch_sizes == [100, 92]
+
+    @pytest.mark.parametrize("backend", ["tflite", "tflite_int8", "onnx"])
+    def test_parity_with_keras(self, backend):
+        pytest.importorskip("tensorflow")  # Keras reference, and TFLite interpreter fallback
+        if backend == "onnx":
+            pytest.importorskip("onnxruntime")
+        if not os.path.isfile(EXPORT_PATHS[backend]):
+            pytest.skip(f"{EXPORT_PATHS[backend]} not exported, run python -m board_to_fen.export")
+        tiles = load_tiles("./test_images")
+        assert check_parity([backend], tiles)[backend] >= 0.99
+        assert get_fen_from_image_path(img_path, backend=backend) == get_fen_from_image_path(img_path, backend="keras")
@@ -15,33 +15,35 @@ from langchain_core.messages import (
     BaseMessage,
     ToolMessage,
 )
+from langchain_core.runnables import RunnableConfig
 from langchain_core.runnables.graph import MermaidDrawMethod
-from langgraph.checkpoint.memory import MemorySaver
 
 from asyncio import to_thread  # Asyncronous processing
 from dotenv import load_dotenv
 import os, sys
-import aiofiles
+import uuid
 import sys
 
 # from langgraph.prebuilt import ToolNode, tools_condition
 
 from langfuse.callback import CallbackHandler
-from playwright.async_api import async_playwright
 from langchain_community.agent_toolkits.playwright.toolkit import (
     PlayWrightBrowserToolkit,
 )
+from langchain_community.tools.playwright.base import BaseBrowserTool
 import asyncio
 
 tools_list = []
 clean_browser = None
 tools_by_name = {}
+browser_tools = []  # PlayWright tools, each run gets copies bound to its own browser context
+tool_executor = None
 model_with_tools = None
 _tools_initialized = False
 _tools_lock = asyncio.Lock()
 
 async def initialize_tools():
-    global tools_list, clean_browser, tools_by_name, model_with_tools, _tools_initialized
+    global tools_list, clean_browser, tools_by_name, browser_tools, tool_executor, model_with_tools, _tools_initialized
 
     async with _tools_lock:  # Esto se libera automáticamente
         if _tools_initialized:
@@ -53,7 +55,11 @@ async def initialize_tools():
             await import_local_modules()
             tools_list, clean_browser = await setup_tools()
             tools_by_name = {tool.name: tool for tool in tools_list}
-            model_with_tools = model.bind_tools(tools_list)
+            browser_tools = [tool for tool in tools_list if isinstance(tool, BaseBrowserTool)]
+            tool_executor = ToolExecutor(tools_by_name=tools_by_name)
+            # Fixed tool order: the tool schemas are part of the cached prompt prefix
+            model_with_tools = model.bind_tools(sorted(tools_list, key=lambda tool: tool.name))
+            await warmup_models()
             _tools_initialized = True
             print("Initialized tools")
         except Exception as e: 
@@ -61,6 +67,26 @@ async def initialize_tools():
             raise 
  
 
+async def warmup_models() -> None:
+    """
+    Load the models listed in WARMUP_MODELS into the model registry, so the
+    first question using them doesn't pay the cold-start cost.
+    """
+    loaders = {
+        "whisper": transcriber.load_whisper_model,
+        "yolo": handle_images.load_yolo_model,
+        "ocr": chess_tool.load_ocr_reader,
+        "chess_cnn": chess_tool.load_fen_model,
+    }
+    for model_name in WARMUP_MODELS:
+        if model_name not in loaders:
+            print(f"Unknown model to warm up: {model_name}")
+            continue
+        await asyncio.to_thread(loaders[model_name])
+    if WARMUP_MODELS:
+        print(f"Model registry: {model_registry.stats()}")
+
+
 async def import_local_modules() -> None:
     src_path = await asyncio.to_thread(lambda: os.path.abspath("src"))
     tools_path = await asyncio.to_thread(lambda: os.path.abspath("src/tools"))
@@ -83,48 +109,55 @@ from tools import (
     pandas_toolbox,
     handle_json,
     chess_tool,
+    chess_engine,
     handle_images,
+    tool_payloads,
 )
+from core.tool_executor import ToolExecutor
+from core.memory import SQLiteCheckpointer
+from core.context import ContextCompactor
+from core.prompt_store import prompt_store
+from core.instrumentation import instrumentation, run_id_var, LLMTimingCallback
+from core.browser_pool import BrowserPool
+from utils.decorators import memoize_tools
+from utils.loader import model_registry
+from utils.http_client import close_http_session
+from utils.python_pool import close_python_pool
 
 # Load credentials
 # var = "OPENAI_API_KEY"
 # os.env[var] = os.getenv(var)
 MAX_ITERATIONS = 7
-ROOT_DIR = "/home/santiagoal/current-projects/chappie/"
-AGENT_PROMPTS_DIR = os.path.join(ROOT_DIR, "prompts/agent/")
-#SYS_MSG_PATH = os.path.join(AGENT_PROMPTS_DIR, "gaia_system_message.md")
+SYSTEM_PROMPT = "agent/gaia_system_message.md"  # Relative to prompts/
 
 load_dotenv()
 
 use_studio = os.getenv("LANGGRAPH_STUDIO", "true").lower() == "true"  # BUG
-# LLM Model
-
-
-async def set_sys_msg(prompt_path: str):
-    sys_msg = ""
-    async with aiofiles.open(prompt_path, "r") as f:
-        async for line in f:
-            sys_msg += line
-    return sys_msg
 
+# Heavy models to load when tools are initialized (comma separated), e.g. "whisper,yolo,ocr,chess_cnn"
+WARMUP_MODELS = [name for name in os.getenv("WARMUP_MODELS", "").split(",") if name]
+# LLM Model
 
-#SYSTEM_MESSAGE = asyncio.run(set_sys_msg(prompt_path=SYS_MSG_PATH))
 
-model = ChatOpenAI(model="gpt-4o", temperature=0.5)
+# Response headers expose the OpenAI rate limits (used by the eval runner)
+model = ChatOpenAI(model="gpt-4o", temperature=0.5, include_response_headers=True)
 langfuse_callback_handler = CallbackHandler()
+context_compactor = ContextCompactor()
+browser_pool = BrowserPool()  # Isolated browser context per run, on one Chromium process
+llm_timing_callback = LLMTimingCallback(instrumentation)
 
 
 # Define tools to use
 async def setup_tools():
-    # Cargar herramientas locales
-    old_tools = [
+    # Cargar herramientas locales, deterministic tools answer repeated calls from a cache
+    old_tools = memoize_tools([
         calculator.sum_,
         calculator.subtract,
         calculator.multiply,
         calculator.divide,
         search.web_search,
         search.pull_youtube_video,
-        #search.fetch_online_pdf,
+        search.fetch_online_pdf,
         code_executor.code_executor,
         transcriber.transcriber,
         post_processing.sort_items_and_format,
@@ -135,24 +168,25 @@ async def setup_tools():
         chess_tool.grab_board_view,
         chess_tool.extract_fen_position,
         chess_tool.predict_next_best_move,
+        chess_tool.analyze_chess_position,
         handle_images.detect_objects,
-    ]
+        tool_payloads.read_tool_payload,
+    ])
 
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=True)
+    browser = await browser_pool.start()
 
     async def cleanup_browser():
-        await browser.close()
-        await playwright.stop()
-
-    # Herramientas del navegador
+        print(f"Browser pool: {browser_pool.stats()}")
+        await browser_pool.close()
+        await chess_engine.close_engine_pools()
+        await close_http_session()
+        await close_python_pool()
+
+    # Herramientas del navegador. These are templates: tools_node runs copies
+    # bound to the context of the run (timeouts and blocked resources are set
+    # on the contexts, see core.browser_pool)
     web_toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
     web_tools = web_toolkit.get_tools()
-    # Optional: ajusta el timeout predeterminado de las tools Playwright
-    for tool in web_tools:
-        if hasattr(tool, "timeout"):
-            tool.timeout = 60000 
-
 
     all_tools = old_tools + web_tools
     return all_tools, cleanup_browser
@@ -175,6 +209,7 @@ class TaskState(TypedDict):
 
 
 # Nodes
+@instrumentation.node("prepare_agent")
 async def prepare_agent(state: TaskState) -> dict[str, list]:
     try:
         await initialize_tools()
@@ -182,26 +217,54 @@ async def prepare_agent(state: TaskState) -> dict[str, list]:
         print(f"Error initializing tools: {e}")
         raise
 
-    messages = state.get("messages", [])
-    if not any(isinstance(m, SystemMessage) for m in messages):
-        sys_msg_path = os.path.join(AGENT_PROMPTS_DIR, "gaia_system_message.md")
-        sys_msg = await set_sys_msg(prompt_path=sys_msg_path)
-        messages.insert(0, SystemMessage(content=sys_msg))
+    # The system message always comes first and is the same text for every
+    # question, so with the tool schemas it forms a prefix the provider prompt
+    # cache reuses. The prompt file is only read again when it changes.
+    messages = [m for m in state.get("messages", []) if not isinstance(m, SystemMessage)]
+    messages.insert(0, SystemMessage(content=prompt_store.get(SYSTEM_PROMPT)))
 
     return {"messages": messages, "iteration": 0}
 
 
 
-async def tools_node(state: TaskState) -> dict[str, list]:
+def browser_lease_id(config: RunnableConfig) -> str:
+    # run_app sets a run id, graphs invoked directly (test_app, LangGraph Studio) lease per thread
+    return run_id_var.get() or config.get("configurable", {}).get("thread_id", "default")
+
+
+@instrumentation.node("tools")
+async def tools_node(state: TaskState, config: RunnableConfig) -> dict[str, list]:
     # result = []  # This line has been deleted cause we need to take in account chat history
     result = state.get("messages", [])
-    for tool_call in state["messages"][-1].tool_calls:
-        tool = tools_by_name[tool_call["name"]]
-        observation = await tool.ainvoke(tool_call["args"])
-        result.append(ToolMessage(content=observation, tool_call_id=tool_call["id"]))
+    tool_calls = state["messages"][-1].tool_calls
+    overrides = None
+    if any(isinstance(tools_by_name.get(call["name"]), BaseBrowserTool) for call in tool_calls):
+        # The run's browser context is leased on its first browser call, kept until the run ends
+        run_tools = await browser_pool.tools_for_run(browser_lease_id(config), browser_tools)
+        overrides = {tool.name: tool for tool in run_tools}
+    # Run all tool calls of the turn concurrently, messages keep the tool_calls order
+    tool_messages = await tool_executor.run(tool_calls, overrides=overrides)
+    result.extend(tool_messages)
     return {"messages": result}
 
 
+@instrumentation.node("release_browser")
+async def release_browser(state: TaskState, config: RunnableConfig) -> dict:
+    # Last node of every run: recycle the browser context leased by tools_node,
+    # whoever invoked the graph. run_app also releases it when the run fails
+    await browser_pool.release_run(browser_lease_id(config))
+    return {}
+
+
+@instrumentation.node("compact_context")
+async def compact_context(state: TaskState, config: RunnableConfig) -> dict[str, list]:
+    # Keep the prompt of the next agent turn under CONTEXT_TOKEN_BUDGET
+    thread_id = config.get("configurable", {}).get("thread_id", "default")
+    messages = await to_thread(context_compactor.compact, state.get("messages", []), thread_id)
+    return {"messages": messages}
+
+
+@instrumentation.node("agent")
 async def agent(state: TaskState) -> dict:
     """
     Agent node, contains the LLM Model used to process user requests.
@@ -306,22 +369,25 @@ def should_use_tool(state: TaskState) -> Literal["tools", END]:
 
 
 # Build Graph
-memory = MemorySaver()  # Add persistence
+memory = SQLiteCheckpointer()  # Add persistence, bounded and kept on disk
 builder = StateGraph(state_schema=TaskState)
 
 builder.add_node("prepare_agent", prepare_agent)
 builder.add_node("agent", agent)
 builder.add_node("tools", tools_node)
+builder.add_node("compact_context", compact_context)
+builder.add_node("release_browser", release_browser)
 
 builder.add_edge(START, "prepare_agent")
 builder.add_edge("prepare_agent", "agent")
 builder.add_conditional_edges(
-    source="agent", path=should_use_tool, path_map=["tools", END]
+    source="agent", path=should_use_tool, path_map={"tools": "tools", END: "release_browser"}
 )
-builder.add_edge("tools", "agent")
+builder.add_edge("tools", "compact_context")
+builder.add_edge("compact_context", "agent")
+builder.add_edge("release_browser", END)
 # builder.add_edge("agent", END)
 
-# memory = MemorySaver()
 graph = builder.compile() if use_studio else builder.compile(checkpointer=memory)
 
 # Save graph
@@ -345,13 +411,19 @@ async def test_app() -> None:
     """
     print("Testing App... \n")
     query = str(input("Ingresa tu pregunta: "))
-    response = await graph.ainvoke(
-        input={"messages": [HumanMessage(content=query)]},
-        config={
-            "callbacks": [langfuse_callback_handler],
-            "configurable": {"thread_id": "1"},
-        },
-    )
+    run_id = str(uuid.uuid4())
+    run_id_token = run_id_var.set(run_id)
+    try:
+        response = await graph.ainvoke(
+            input={"messages": [HumanMessage(content=query)]},
+            config={
+                "callbacks": [langfuse_callback_handler],
+                "configurable": {"thread_id": str(uuid.uuid4())},
+            },
+        )
+    finally:
+        await browser_pool.release_run(run_id)  # The graph run may have failed before release_browser
+        run_id_var.reset(run_id_token)
 
     # Show chat history
     for msg in response["messages"]:
@@ -365,21 +437,37 @@ async def run_app(
     user_query: str = None,
     print_response: bool = False,
     clean_browser_fn=None,
+    thread_id: Optional[str] = None,
+    callbacks: Optional[list] = None,
 ) -> Union[str, float, int]:
+    thread_id = thread_id or str(uuid.uuid4())
+    # Tags every node / LLM / tool event of this question in the trace
+    run_id = str(uuid.uuid4())
+    run_id_token = run_id_var.set(run_id)
     try:
         query = user_query if user_query else input("Pass your question: ")
         response = await graph.ainvoke(
             input={"messages": [HumanMessage(content=query)]},
             config={
-                "callbacks": [langfuse_callback_handler],
-                "configurable": {"thread_id": "1"},
+                "callbacks": [langfuse_callback_handler, llm_timing_callback] + (callbacks or []),
+                # Each request gets its own conversation thread unless told otherwise
+                "configurable": {"thread_id": thread_id},
             },
         )
+        context_stats = context_compactor.stats(thread_id)
+        if context_stats["tokens_saved"]:
+            print(
+                f"Context compaction: {context_stats['tokens_saved']} prompt tokens saved "
+                f"({context_stats['compacted_messages']} tool outputs compacted)"
+            )
         ai_answer = response.get("messages", [])[-1].content
         if print_response:
             print(ai_answer)
         return ai_answer
     finally:
+        context_compactor.reset_stats(thread_id)
+        await browser_pool.release_run(run_id)  # Recycle the run's browser context
+        run_id_var.reset(run_id_token)
         if clean_browser_fn:
             await clean_browser_fn()
 
@@ -0,0 +1,290 @@
+"""
+Pool of isolated Playwright browser contexts for the web tools.
+
+One headless Chromium process serves every question, but each agent run leases
+its own browser context (cookies, storage, pages), so concurrent questions
+never navigate each other's current page. Contexts:
+
+- come from a bounded pool (BROWSER_POOL_SIZE), runs wait for a free slot
+  (at most BROWSER_ACQUIRE_TIMEOUT seconds)
+- block images, fonts and media by default, pages load text only
+- are recycled when a run ends (pages closed, cookies cleared) and replaced
+  after BROWSER_CONTEXT_MAX_USES runs
+- are rebuilt on a fresh browser if Chromium crashes or disconnects
+
+The PlayWright toolkit tools read the page from `tool.async_browser.contexts[0]`,
+so a run gets copies of those tools whose async_browser is a RunBrowser wrapping
+its leased context.
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.tools.base import BaseTool
+
+from core.instrumentation import instrumentation
+
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", "20"))
+BROWSER_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "300"))  # Seconds waiting for a free context
+BROWSER_NAVIGATION_TIMEOUT = float(os.getenv("BROWSER_NAVIGATION_TIMEOUT", "30"))  # Seconds
+BROWSER_ACTION_TIMEOUT = float(os.getenv("BROWSER_ACTION_TIMEOUT", "10"))  # Clicks, selectors, ...
+# Playwright resource types aborted before they are downloaded
+BLOCKED_RESOURCE_TYPES = frozenset(
+    name for name in os.getenv("BROWSER_BLOCKED_RESOURCES", "image,font,media").split(",") if name
+)
+
+
+class RunBrowser:
+    """
+    Browser seen by the tools of one run: its only context is the leased one.
+    """
+
+    def __init__(self, context) -> None:
+        self.context = context
+
+    @property
+    def contexts(self) -> list:
+        return [self.context]
+
+    async def new_context(self, **kwargs):
+        return self.context
+
+    def is_connected(self) -> bool:
+        return self.context.browser is not None and self.context.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Bounded pool of Playwright browser contexts on a single Chromium process.
+
+    Parameters
+    ----------
+    size : int
+        Max contexts in use at the same time
+    max_uses : int
+        Runs served by a context before it is closed and replaced
+    blocked_resources : Iterable[str]
+        Playwright resource types to abort (e.g. "image", "font", "media")
+    headless : bool
+        Launch Chromium without a window
+    acquire_timeout : float
+        Max seconds a run waits for a free context, None waits forever
+
+    Example:
+        >>> pool = BrowserPool(size=4)
+        >>> run_tools = await pool.tools_for_run(run_id, web_tools)  # Leases a context
+        >>> await run_tools[0].ainvoke({"url": "https://example.com"})
+        >>> await pool.release_run(run_id)  # Context recycled for the next run
+        >>> await pool.close()
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_uses: int = BROWSER_CONTEXT_MAX_USES,
+        blocked_resources: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+        headless: bool = True,
+        acquire_timeout: Optional[float] = BROWSER_ACQUIRE_TIMEOUT,
+    ) -> None:
+        self.size = size
+        self.max_uses = max_uses
+        self.blocked_resources = frozenset(blocked_resources)
+        self.headless = headless
+        self.acquire_timeout = acquire_timeout
+        self._playwright = None
+        self._browser = None
+        self._generation = 0  # Incremented on every browser (re)launch
+        self._idle: List[Dict[str, Any]] = []  # {"context", "uses", "generation"}
+        self._leases: Dict[str, Dict[str, Any]] = {}  # Run id -> lease
+        # Locks and semaphores are bound to a loop, so keep one set per running loop
+        self._sync = weakref.WeakKeyDictionary()
+        self._counters = {
+            "leases": 0, "created": 0, "recycled": 0, "restarts": 0, "waiting": 0, "timeouts": 0
+        }
+        self._wait_total = 0.0
+
+    def _primitives(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._sync:
+            self._sync[loop] = {"lock": asyncio.Lock(), "slots": asyncio.Semaphore(self.size)}
+        return self._sync[loop]
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self) -> None:
+        # Called with the lock held
+        if self._browser_alive():
+            return
+        if self._browser is not None:
+            print("Browser disconnected, restarting Chromium")
+            self._counters["restarts"] += 1
+            self._idle.clear()  # Their contexts died with the browser
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._generation += 1
+
+    async def start(self):
+        """
+        Launch Chromium if it isn't running.
+
+        Returns:
+            Browser: The shared Playwright browser
+        """
+        async with self._primitives()["lock"]:
+            await self._ensure_browser()
+        return self._browser
+
+    async def _block_resource(self, route) -> None:
+        if route.request.resource_type in self.blocked_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_context(self) -> Dict[str, Any]:
+        context = await self._browser.new_context()
+        context.set_default_navigation_timeout(BROWSER_NAVIGATION_TIMEOUT * 1000)
+        context.set_default_timeout(BROWSER_ACTION_TIMEOUT * 1000)
+        if self.blocked_resources:
+            await context.route("**/*", self._block_resource)
+        self._counters["created"] += 1
+        return {"context": context, "uses": 0, "generation": self._generation}
+
+    async def _acquire(self) -> Dict[str, Any]:
+        primitives = self._primitives()
+        start = time.perf_counter()
+        self._counters["waiting"] += 1
+        try:
+            await asyncio.wait_for(primitives["slots"].acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            raise TimeoutError(
+                f"No browser context freed within {self.acquire_timeout:.0f} s "
+                f"({len(self._leases)} / {self.size} leased)"
+            ) from None
+        finally:
+            self._counters["waiting"] -= 1
+        waited = time.perf_counter() - start
+        self._wait_total += waited
+        try:
+            async with primitives["lock"]:
+                await self._ensure_browser()
+                lease = self._idle.pop() if self._idle else await self._new_context()
+        except BaseException:
+            primitives["slots"].release()
+            raise
+        lease["uses"] += 1
+        self._counters["leases"] += 1
+        instrumentation.record("browser", "acquire_context", waited)
+        return lease
+
+    async def _recycle(self, lease: Dict[str, Any]) -> None:
+        context = lease["context"]
+        reusable = (
+            lease["generation"] == self._generation
+            and self._browser_alive()
+            and lease["uses"] < self.max_uses
+        )
+        try:
+            if reusable:
+                for page in list(context.pages):
+                    await page.close()
+                await context.clear_cookies()
+                self._idle.append(lease)
+                self._counters["recycled"] += 1
+            else:
+                await context.close()
+        except Exception:  # Browser crashed meanwhile, the context is gone
+            if lease in self._idle:
+                self._idle.remove(lease)
+        finally:
+            self._primitives()["slots"].release()
+            self._report_usage()
+
+    async def lease(self, run_id: str):
+        """
+        Get the browser context of a run, leasing one from the pool on first use.
+
+        Returns:
+            RunBrowser: Browser-like wrapper exposing only the run's context
+
+        Raises:
+            TimeoutError: If no context is freed within acquire_timeout seconds
+        """
+        lease = self._leases.get(run_id)
+        if lease is not None and (lease["generation"] != self._generation or not self._browser_alive()):
+            # Chromium restarted (or crashed) since the lease, its context is dead
+            del self._leases[run_id]
+            await self._recycle(lease)
+            lease = None
+        if lease is None:
+            lease = await self._acquire()
+            self._leases[run_id] = lease
+            self._report_usage()
+        return RunBrowser(lease["context"])
+
+    async def tools_for_run(self, run_id: str, tools: Iterable[BaseTool]) -> List[BaseTool]:
+        """
+        Copies of the PlayWright tools bound to the context of a run.
+
+        Parameters
+        ----------
+        run_id : str
+            Id of the agent run (see core.instrumentation.run_id_var)
+        tools : Iterable[BaseTool]
+            Tools from PlayWrightBrowserToolkit
+
+        Returns:
+            List[BaseTool]: Same tools, using the run's browser context
+        """
+        browser = await self.lease(run_id)
+        return [tool.model_copy(update={"async_browser": browser}) for tool in tools]
+
+    async def release_run(self, run_id: Optional[str]) -> None:
+        """
+        Give back the context of a finished run. No-op if the run never used the browser.
+        """
+        lease = self._leases.pop(run_id, None)
+        if lease is not None:
+            await self._recycle(lease)
+
+    def _report_usage(self) -> None:
+        instrumentation.pool_usage("browser_contexts", in_use=len(self._leases), size=self.size)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict: Contexts in use / idle, runs waiting for a context, utilization
+            (in use / size), mean wait, and lease / creation / recycle / restart / timeout counters
+        """
+        leases = self._counters["leases"]
+        return {
+            "size": self.size,
+            "in_use": len(self._leases),
+            "idle": len(self._idle),
+            "utilization": round(len(self._leases) / self.size, 3) if self.size else 0.0,
+            "mean_wait_s": round(self._wait_total / leases, 3) if leases else 0.0,
+            **self._counters,
+        }
+
+    async def close(self) -> None:
+        for run_id in list(self._leases):
+            await self.release_run(run_id)
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
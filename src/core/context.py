@@ -0,0 +1,264 @@
+"""
+Token-budgeted compaction of the agent message history.
+
+Runs between the tools node and the agent node:
+
+- Tool outputs larger than TOOL_MESSAGE_MAX_TOKENS are cut (head + tail) and
+  the full payload is kept out of the prompt, in payload_store, under a
+  reference the agent can read back with the read_tool_payload tool.
+- If the history is still above CONTEXT_TOKEN_BUDGET, the outputs of older
+  turns are shrunk to short stubs, oldest first. The system prompt, the user
+  request and the last turn are never touched.
+
+Token counts are cached by content, so each message is tokenized once.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from utils.cache import MISSING, TieredCache
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "60000"))
+TOOL_MESSAGE_MAX_TOKENS = int(os.getenv("TOOL_MESSAGE_MAX_TOKENS", "4000"))
+STALE_TOOL_MESSAGE_TOKENS = int(os.getenv("STALE_TOOL_MESSAGE_TOKENS", "300"))
+TOOL_PAYLOAD_TTL = float(os.getenv("TOOL_PAYLOAD_TTL", str(24 * 3600)))
+TOKENIZER_ENCODING = "o200k_base"  # gpt-4o
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators added by the chat format
+CHARS_PER_TOKEN = 4  # Estimate used when tiktoken is not available
+
+# Full tool outputs, referenced from the compacted messages
+payload_store = TieredCache(
+    max_size=256, ttl=TOOL_PAYLOAD_TTL, disk_path=os.getenv("TOOL_PAYLOAD_DB")
+)
+
+
+class TokenCounter:
+    """
+    Count tokens with tiktoken, caching the counts of the last seen texts.
+
+    Example:
+        >>> counter = TokenCounter()
+        >>> counter.count("Hello world")
+        2
+    """
+
+    def __init__(self, encoding: str = TOKENIZER_ENCODING, max_cached: int = 4096) -> None:
+        self.encoding_name = encoding
+        self.max_cached = max_cached
+        self._encoding = None
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception:  # Not installed or no cached vocabulary offline
+                self._encoding = False
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        key = hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+        n_tokens = (
+            len(self.encoding.encode(text, disallowed_special=()))
+            if self.encoding
+            else len(text) // CHARS_PER_TOKEN + 1
+        )
+        with self._lock:
+            self._counts[key] = n_tokens
+            if len(self._counts) > self.max_cached:
+                self._counts.popitem(last=False)
+        return n_tokens
+
+    def head_tail(self, text: str, head_tokens: int, tail_tokens: int) -> tuple:
+        """
+        Returns:
+            tuple: (first head_tokens tokens, last tail_tokens tokens) of text
+        """
+        if self.encoding:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            head = self.encoding.decode(tokens[:head_tokens])
+            tail = self.encoding.decode(tokens[-tail_tokens:]) if tail_tokens else ""
+            return head, tail
+        head = text[: head_tokens * CHARS_PER_TOKEN]
+        tail = text[-tail_tokens * CHARS_PER_TOKEN:] if tail_tokens else ""
+        return head, tail
+
+
+def message_text(message: BaseMessage) -> str:
+    text = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += json.dumps([call["args"] for call in message.tool_calls], default=str)
+    return text
+
+
+def store_payload(content: str) -> str:
+    """
+    Keep a full tool output out of the prompt.
+
+    Returns:
+        str: Reference to pass to read_payload
+    """
+    ref = hashlib.sha1(content.encode("utf-8", "replace")).hexdigest()[:12]
+    payload_store.set(ref, content)
+    return ref
+
+
+def read_payload(ref: str) -> Optional[str]:
+    content = payload_store.get(ref)
+    return None if content is MISSING else content
+
+
+class ContextCompactor:
+    """
+    Keep the prompt sent to the LLM under a token budget.
+
+    Parameters
+    ----------
+    budget_tokens : int
+        Max tokens of the whole message history
+    max_tool_tokens : int
+        Max tokens of a single tool output, larger outputs are cut and stored by reference
+    stale_tool_tokens : int
+        Size of the outputs of older turns once shrunk to meet the budget
+
+    Example:
+        >>> compactor = ContextCompactor(budget_tokens=60000)
+        >>> messages = compactor.compact(state["messages"], thread_id="1")
+        >>> compactor.stats("1")
+        {'tokens_before': 81234, 'tokens_after': 23410, 'tokens_saved': 57824, 'compacted_messages': 3}
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+        max_tool_tokens: int = TOOL_MESSAGE_MAX_TOKENS,
+        stale_tool_tokens: int = STALE_TOOL_MESSAGE_TOKENS,
+        counter: Optional[TokenCounter] = None,
+    ) -> None:
+        self.budget_tokens = budget_tokens
+        self.max_tool_tokens = max_tool_tokens
+        self.stale_tool_tokens = stale_tool_tokens
+        self.counter = counter or TokenCounter()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"tokens_before": 0, "tokens_after": 0, "tokens_saved": 0, "compacted_messages": 0}
+        )
+
+    def count_message(self, message: BaseMessage) -> int:
+        return self.counter.count(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+    def count(self, messages: List[BaseMessage]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+    def count_uncompacted(self, messages: List[BaseMessage]) -> int:
+        # Size the history would have without any compaction
+        total = 0
+        for message in messages:
+            compacted = message.additional_kwargs.get("compacted")
+            if compacted:
+                total += compacted["original_tokens"] + MESSAGE_OVERHEAD_TOKENS
+            else:
+                total += self.count_message(message)
+        return total
+
+    def _shrink(self, message: ToolMessage, max_tokens: int) -> Optional[ToolMessage]:
+        # None if the message already fits
+        compacted = message.additional_kwargs.get("compacted")
+        if compacted and compacted["max_tokens"] <= max_tokens:
+            return None
+        content = read_payload(compacted["ref"]) if compacted else None
+        if content is None:
+            content = message_text(message)
+        n_tokens = self.counter.count(content)
+        if n_tokens <= max_tokens:
+            return None
+
+        ref = compacted["ref"] if compacted else store_payload(content)
+        head_tokens = max_tokens * 2 // 3
+        head, tail = self.counter.head_tail(content, head_tokens, max_tokens - head_tokens)
+        truncated = (
+            f"{head}\n\n[... output truncated, {n_tokens} tokens in total. "
+            f"Full output stored as payload '{ref}', read it with "
+            f"read_tool_payload(ref='{ref}', offset=...) if you need the missing part ...]\n\n{tail}"
+        )
+        return message.model_copy(
+            update={
+                "content": truncated,
+                "additional_kwargs": {
+                    **message.additional_kwargs,
+                    "compacted": {"ref": ref, "original_tokens": n_tokens, "max_tokens": max_tokens},
+                },
+            }
+        )
+
+    def compact(self, messages: List[BaseMessage], thread_id: str = "default") -> List[BaseMessage]:
+        """
+        Compact the message history.
+
+        Parameters
+        ----------
+        messages : List[BaseMessage]
+            Message history, left unchanged
+        thread_id : str
+            Conversation the metrics are recorded for
+
+        Returns:
+            List[BaseMessage]: Compacted history
+        """
+        messages = list(messages)
+        tokens_before = self.count_uncompacted(messages)
+        compacted_messages = 0
+
+        # 1. Cut oversized tool outputs
+        for i, message in enumerate(messages):
+            if isinstance(message, ToolMessage):
+                shrunk = self._shrink(message, self.max_tool_tokens)
+                if shrunk is not None:
+                    messages[i] = shrunk
+                    compacted_messages += 1
+
+        # 2. Shrink the outputs of older turns until the history fits the budget
+        total = self.count(messages)
+        last_turn = max(
+            (i for i, message in enumerate(messages) if isinstance(message, AIMessage)), default=len(messages)
+        )
+        for i in range(last_turn):
+            if total <= self.budget_tokens:
+                break
+            if isinstance(messages[i], ToolMessage):
+                shrunk = self._shrink(messages[i], self.stale_tool_tokens)
+                if shrunk is not None:
+                    total += self.count_message(shrunk) - self.count_message(messages[i])
+                    messages[i] = shrunk
+                    compacted_messages += 1
+
+        stats = self._stats[thread_id]
+        stats["tokens_before"] += tokens_before
+        stats["tokens_after"] += total
+        stats["tokens_saved"] += tokens_before - total
+        stats["compacted_messages"] += compacted_messages
+        return messages
+
+    def stats(self, thread_id: str = "default") -> Dict[str, int]:
+        """
+        Returns:
+            dict: Prompt tokens without / with compaction and tokens saved, summed over the turns of the thread
+        """
+        return dict(self._stats[thread_id])
+
+    def reset_stats(self, thread_id: str) -> None:
+        self._stats.pop(thread_id, None)
@@ -0,0 +1,325 @@
+"""
+Latency instrumentation of the agent: graph nodes, LLM calls and tool calls.
+
+Every event (duration, status, payload sizes, token counts) is tagged with the
+run id of the current question (a context variable set by run_app) and:
+
+- appended to a local JSONL trace (AGENT_TRACE_PATH, empty to disable)
+- exported as Prometheus metrics when prometheus_client is installed
+  (start_metrics_server exposes them over HTTP)
+
+summarize_trace aggregates a trace, e.g. a whole eval run, into a per-node /
+per-tool p50 / p95 table.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.loader import PROJECT_ROOT
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+AGENT_TRACE_PATH = os.getenv(
+    "AGENT_TRACE_PATH", os.path.join(PROJECT_ROOT, "data", "traces", "agent_trace.jsonl")
+)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Id of the question being answered, set by run_app
+run_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("run_id", default=None)
+
+
+_metrics: Optional[Dict[str, Any]] = None
+
+
+def _prometheus_metrics() -> Dict[str, Any]:
+    # Metrics can only be registered once per process
+    global _metrics
+    if _metrics is None:
+        _metrics = {
+            "seconds": prometheus_client.Histogram(
+                "agent_step_seconds",
+                "Duration of agent graph nodes, LLM calls and tool calls",
+                ["kind", "name"],
+                buckets=LATENCY_BUCKETS,
+            ),
+            "errors": prometheus_client.Counter(
+                "agent_step_errors_total", "Failed nodes, LLM calls and tool calls", ["kind", "name"]
+            ),
+            "output_bytes": prometheus_client.Counter(
+                "agent_step_output_bytes_total", "Size of tool outputs", ["kind", "name"]
+            ),
+            "tokens": prometheus_client.Counter("agent_llm_tokens_total", "LLM tokens", ["type"]),
+            "pool_in_use": prometheus_client.Gauge(
+                "agent_pool_in_use", "Resources of a shared pool in use", ["pool"]
+            ),
+            "pool_size": prometheus_client.Gauge("agent_pool_size", "Size of a shared pool", ["pool"]),
+        }
+    return _metrics
+
+
+class Instrumentation:
+    """
+    Record timing events and export them.
+
+    Parameters
+    ----------
+    trace_path : str, optional
+        JSONL file the events are appended to. No trace if empty
+    prometheus : bool
+        Export Prometheus metrics (needs prometheus_client)
+
+    Example:
+        >>> instrumentation = Instrumentation(trace_path="data/traces/agent_trace.jsonl")
+        >>> with instrumentation.span("tool", "web_search") as event:
+        ...     result = await search.web_search.ainvoke({"query": "GAIA"})
+        ...     event["output_bytes"] = len(result)
+    """
+
+    def __init__(self, trace_path: Optional[str] = AGENT_TRACE_PATH, prometheus: bool = True) -> None:
+        self.trace_path = trace_path or None
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._metrics = _prometheus_metrics() if prometheus and prometheus_client is not None else None
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        if self.trace_path is None:
+            return
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            if self._trace_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.trace_path)), exist_ok=True)
+                self._trace_file = open(self.trace_path, "a", buffering=1)
+            self._trace_file.write(line)
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        duration: float,
+        status: str = "ok",
+        **fields,
+    ) -> None:
+        """
+        Record one event.
+
+        Parameters
+        ----------
+        kind : str
+            "node", "llm", "tool" or "browser"
+        name : str
+            Node, model or tool name
+        duration : float
+            Wall time in seconds
+        status : str
+            "ok" or "error"
+        **fields
+            Extra fields: error, input_bytes, output_bytes, input_tokens, output_tokens, ...
+        """
+        event = {
+            "ts": time.time(),
+            "run_id": run_id_var.get(),
+            "kind": kind,
+            "name": name,
+            "duration": round(duration, 6),
+            "status": status,
+            **fields,
+        }
+        self._write(event)
+        if self._metrics is not None:
+            self._metrics["seconds"].labels(kind, name).observe(duration)
+            if status != "ok":
+                self._metrics["errors"].labels(kind, name).inc()
+            if fields.get("output_bytes"):
+                self._metrics["output_bytes"].labels(kind, name).inc(fields["output_bytes"])
+            for token_type in ("input_tokens", "output_tokens"):
+                if fields.get(token_type):
+                    self._metrics["tokens"].labels(token_type).inc(fields[token_type])
+
+    def pool_usage(self, pool: str, in_use: int, size: int) -> None:
+        """
+        Export the utilization of a shared pool (e.g. browser contexts) as gauges.
+        """
+        if self._metrics is not None:
+            self._metrics["pool_in_use"].labels(pool).set(in_use)
+            self._metrics["pool_size"].labels(pool).set(size)
+
+    def span(self, kind: str, name: str) -> "Span":
+        return Span(self, kind, name)
+
+    def node(self, name: str):
+        """
+        Decorator timing an async graph node.
+
+        Example:
+            >>> @instrumentation.node("agent")
+            ... async def agent(state: TaskState) -> dict:
+            ...     ...
+        """
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.span("node", name):
+                    return await fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+
+class Span:
+    """
+    Context manager recording the duration of its block. Fields set on the
+    yielded dict are added to the event; an exception marks it as an error.
+    """
+
+    def __init__(self, instrumentation: Instrumentation, kind: str, name: str) -> None:
+        self.instrumentation = instrumentation
+        self.kind = kind
+        self.name = name
+        self.fields: Dict[str, Any] = {}
+
+    def __enter__(self) -> Dict[str, Any]:
+        self._start = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        status = self.fields.pop("status", "ok")
+        if exc is not None:
+            status = "error"
+            self.fields["error"] = f"{exc_type.__name__}: {exc}"
+        self.instrumentation.record(
+            self.kind, self.name, time.perf_counter() - self._start, status=status, **self.fields
+        )
+        return False
+
+
+class LLMTimingCallback(BaseCallbackHandler):
+    """
+    Record the duration and token usage of every LLM call.
+    """
+
+    run_inline = True  # Keep the run id context variable
+
+    def __init__(self, instrumentation: Instrumentation) -> None:
+        self.instrumentation = instrumentation
+        self._starts: Dict[Any, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        name = (kwargs.get("metadata") or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        self._starts[run_id] = (name, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        name, start = self._starts.pop(run_id, ("llm", time.perf_counter()))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.instrumentation.record(
+            "llm",
+            name,
+            time.perf_counter() - start,
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        name, start = self._starts.pop(run_id, ("llm", time.perf_counter()))
+        self.instrumentation.record(
+            "llm", name, time.perf_counter() - start, status="error", error=str(error)
+        )
+
+
+def start_metrics_server(port: int = int(os.getenv("METRICS_PORT", "9464"))) -> bool:
+    """
+    Expose the Prometheus metrics on http://localhost:<port>/metrics.
+
+    Returns:
+        bool: False if prometheus_client is not installed
+    """
+    if prometheus_client is None:
+        print("prometheus_client is not installed, metrics are only written to the trace")
+        return False
+    prometheus_client.start_http_server(port)
+    return True
+
+
+def summarize_trace(
+    trace_path: str = AGENT_TRACE_PATH,
+    run_ids: Optional[Iterable[str]] = None,
+    since: Optional[float] = None,
+):
+    """
+    Aggregate a JSONL trace into a latency table.
+
+    Parameters
+    ----------
+    trace_path : str
+        Trace written by Instrumentation
+    run_ids : Iterable[str], optional
+        Only keep these runs (questions)
+    since : float, optional
+        Only keep the events recorded after this timestamp (e.g. start of an eval run)
+
+    Returns:
+        pd.DataFrame: One row per (kind, name) with calls, p50, p95, mean and total seconds,
+        error rate, mean output bytes and tokens, sorted by total time
+
+    Example:
+        >>> summarize_trace("data/traces/agent_trace.jsonl").head(3)
+                                   calls   p50_s   p95_s  total_s  error_rate ...
+        kind name
+        tool transcriber              12  41.200  88.100   512.40        0.08
+        llm  gpt-4o                   96   2.310   6.020   260.11        0.00
+        tool web_search               40   1.120   3.870    61.72        0.05
+    """
+    import pandas as pd
+
+    events = pd.read_json(trace_path, lines=True)
+    if run_ids is not None:
+        events = events[events["run_id"].isin(set(run_ids))]
+    if since is not None:
+        events = events[events["ts"] >= since]
+    for column in ("output_bytes", "input_tokens", "output_tokens"):
+        events[column] = events[column].fillna(0) if column in events else 0
+    events["is_error"] = events["status"] != "ok"
+
+    grouped = events.groupby(["kind", "name"])
+    summary = pd.DataFrame(
+        {
+            "calls": grouped.size(),
+            "p50_s": grouped["duration"].quantile(0.5),
+            "p95_s": grouped["duration"].quantile(0.95),
+            "mean_s": grouped["duration"].mean(),
+            "total_s": grouped["duration"].sum(),
+            "error_rate": grouped["is_error"].mean(),
+            "mean_output_bytes": grouped["output_bytes"].mean(),
+            "input_tokens": grouped["input_tokens"].sum(),
+            "output_tokens": grouped["output_tokens"].sum(),
+        }
+    )
+    return summary.sort_values("total_s", ascending=False).round(3)
+
+
+instrumentation = Instrumentation()
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(summarize_trace(sys.argv[1] if len(sys.argv) > 1 else AGENT_TRACE_PATH).to_string())
@@ -0,0 +1,429 @@
+"""
+Durable checkpointer for the agent graph.
+
+Checkpoints and pending writes are stored in a SQLite database (WAL mode), so
+conversations survive restarts and the process memory stays flat. Blobs are
+serialized by LangGraph's serializer (msgpack) and zstd-compressed when
+zstandard is installed. Only the last CHECKPOINT_MAX_PER_THREAD checkpoints of
+each thread are kept, and threads idle for more than CHECKPOINT_TTL seconds are
+garbage collected.
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from utils.loader import PROJECT_ROOT
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CHECKPOINT_DB = os.getenv(
+    "CHECKPOINT_DB", os.path.join(PROJECT_ROOT, "data", "checkpoints", "checkpoints.sqlite")
+)
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(7 * 24 * 3600)))
+CHECKPOINT_COMPRESS = os.getenv("CHECKPOINT_COMPRESS", "1") == "1"
+GC_INTERVAL = 600  # Seconds between two garbage collections
+COMPRESS_MIN_BYTES = 512  # Smaller blobs are stored as they are
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (created_at);
+"""
+
+ZSTD_SUFFIX = "+zstd"
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer backed by SQLite, with bounded history per thread.
+
+    Parameters
+    ----------
+    path : str
+        Database file, ":memory:" for a non persistent store
+    max_checkpoints_per_thread : int
+        Checkpoints kept per thread (and namespace), older ones are deleted. None keeps everything
+    ttl : float
+        Threads without a new checkpoint for ttl seconds are deleted. None disables the GC
+    compress : bool
+        zstd-compress checkpoint and write blobs (needs zstandard)
+
+    Example:
+        >>> memory = SQLiteCheckpointer("../../data/checkpoints/checkpoints.sqlite")
+        >>> graph = builder.compile(checkpointer=memory)
+        >>> await graph.ainvoke(inputs, config={"configurable": {"thread_id": str(uuid.uuid4())}})
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_DB,
+        max_checkpoints_per_thread: Optional[int] = CHECKPOINT_MAX_PER_THREAD,
+        ttl: Optional[float] = CHECKPOINT_TTL,
+        compress: bool = CHECKPOINT_COMPRESS,
+        serde=None,
+    ) -> None:
+        super().__init__(serde=serde)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # Pending writes of the current step must survive the pruning
+        self.max_checkpoints_per_thread = (
+            max(2, max_checkpoints_per_thread) if max_checkpoints_per_thread else None
+        )
+        self.ttl = ttl
+        self._compressor = zstandard.ZstdCompressor(level=3) if compress and zstandard else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    # Serialization
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if self._compressor is not None and len(data) >= COMPRESS_MIN_BYTES:
+            return type_ + ZSTD_SUFFIX, self._compressor.compress(data)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(ZSTD_SUFFIX):
+            if self._decompressor is None:
+                raise RuntimeError("zstandard is required to read compressed checkpoints")
+            type_, data = type_[: -len(ZSTD_SUFFIX)], self._decompressor.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._load(type_, checkpoint),
+            metadata=self._load(metadata_type, metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._load(value_type, value))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    # Sync API
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        conditions, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            conditions.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                conditions.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self._load(row[6], row[7])
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                results.append(self._to_tuple(row))
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self._dump(checkpoint)
+        metadata_type, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        data,
+                        metadata_type,
+                        metadata_data,
+                        time.time(),
+                    ),
+                )
+                if self.max_checkpoints_per_thread:
+                    self._prune(thread_id, checkpoint_ns)
+        self._maybe_gc()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts, ...) replace the previous ones,
+        # regular writes of a task are only stored once
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            verb = "INSERT OR REPLACE"
+        else:
+            verb = "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dump(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    data,
+                    task_path,
+                )
+            )
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    # Retention
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        # Caller holds the lock and the transaction
+        self._conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?)",
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        )
+        self._conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+        )
+
+    def _maybe_gc(self) -> None:
+        if self.ttl is not None and time.monotonic() - self._last_gc > GC_INTERVAL:
+            self.gc()
+
+    def gc(self) -> int:
+        """
+        Delete the threads without a new checkpoint for more than ttl seconds.
+
+        Returns:
+            int: Number of deleted threads
+        """
+        self._last_gc = time.monotonic()
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                expired = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                        (time.time() - self.ttl,),
+                    )
+                ]
+                self._conn.executemany(
+                    "DELETE FROM checkpoints WHERE thread_id = ?", [(t,) for t in expired]
+                )
+                self._conn.executemany(
+                    "DELETE FROM writes WHERE thread_id = ?", [(t,) for t in expired]
+                )
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            (writes,) = self._conn.execute("SELECT COUNT(*) FROM writes").fetchone()
+        size = os.path.getsize(self.path) if self.path != ":memory:" else 0
+        return {"threads": threads, "checkpoints": checkpoints, "writes": writes, "db_bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same versioning as langgraph's InMemorySaver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # Async API, SQLite calls run on a worker thread
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
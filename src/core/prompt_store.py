@@ -0,0 +1,83 @@
+"""
+Prompt files loaded once and reloaded only when they change on disk.
+
+Paths are resolved from the project prompts/ directory, so the agent runs from
+any checkout / working directory. Prompts are string.Template templates
+(`$variable`), rendered with safe_substitute.
+"""
+
+import os
+import threading
+from string import Template
+from typing import Dict, Tuple
+
+from utils.loader import PROJECT_ROOT
+
+
+PROMPTS_DIR = os.getenv("PROMPTS_DIR", os.path.join(PROJECT_ROOT, "prompts"))
+
+
+class PromptStore:
+    """
+    Cache of compiled prompt templates, with mtime-based hot reload.
+
+    Rendering without variables returns the file text as is, so the same
+    prompt is byte-identical across runs and the provider prompt cache can
+    reuse it.
+
+    Parameters
+    ----------
+    prompts_dir : str
+        Directory the prompt names are relative to
+
+    Example:
+        >>> store = PromptStore()
+        >>> sys_msg = store.get("agent/gaia_system_message.md")
+        >>> sys_msg is store.get("agent/gaia_system_message.md")  # Not read again
+        True
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR) -> None:
+        self.prompts_dir = prompts_dir
+        self._templates: Dict[str, Tuple[int, Template]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.prompts_dir, name)
+
+    def template(self, name: str) -> Template:
+        path = self.path(name)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        with open(path, "r") as f:
+            template = Template(f.read())
+        with self._lock:
+            self._templates[name] = (mtime, template)
+            self.loads += 1
+        return template
+
+    def get(self, name: str, **variables) -> str:
+        """
+        Render a prompt.
+
+        Parameters
+        ----------
+        name : str
+            Prompt path, relative to prompts_dir
+        **variables
+            Values of the $placeholders, unknown placeholders are left as they are
+
+        Returns:
+            str: Prompt text
+        """
+        template = self.template(name)
+        if not variables:
+            return template.template
+        return template.safe_substitute(variables)
+
+
+prompt_store = PromptStore()
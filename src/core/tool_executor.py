@@ -0,0 +1,221 @@
+"""
+Concurrent execution of the tool calls emitted by the LLM in a single AI turn.
+
+All calls of a turn are fanned out with asyncio. Sync tools (chess, whisper,
+YOLO, code runner, ...) run on a bounded thread pool so they don't block the
+event loop, every call is bounded by a timeout and, optionally, by a per-tool
+concurrency limit. Results keep the order of the original tool calls.
+
+Threads can't be killed: a sync tool that times out returns an error message
+to the agent but keeps running in the background, holding its pool worker and
+its concurrency slot until it returns. Waiting for a slot is bounded by the
+tool timeout too, so a hung call makes the next ones fail instead of hanging.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools.base import BaseTool
+
+from core.instrumentation import instrumentation
+
+
+MAX_TOOL_WORKERS = int(os.getenv("MAX_TOOL_WORKERS", "8"))
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("DEFAULT_TOOL_TIMEOUT", "120"))
+
+# Per-tool timeouts (seconds), tools not listed use DEFAULT_TOOL_TIMEOUT
+TOOL_TIMEOUTS = {
+    "transcriber": 600,
+    "detect_objects": 600,
+    "pull_youtube_video": 300,
+    "predict_next_best_move": 60,
+    "analyze_chess_position": 90,
+    "code_executor": 30,
+    "navigate_browser": 60,
+}
+
+# Max simultaneous calls per tool, tools not listed are only bound by the pool size
+TOOL_CONCURRENCY = {
+    "transcriber": 1,
+    "detect_objects": 1,
+    "grab_board_view": 2,
+    "extract_fen_position": 2,
+    "predict_next_best_move": 2,
+    "analyze_chess_position": 2,
+    "web_search": 4,
+}
+
+
+def _is_sync_tool(tool: BaseTool) -> bool:
+    # @tool on a plain function builds a StructuredTool with func set and no coroutine
+    return getattr(tool, "coroutine", None) is None and getattr(tool, "func", None) is not None
+
+
+class ToolExecutor:
+    """
+    Run the tool calls of an AI message concurrently.
+
+    Parameters
+    ----------
+    tools_by_name : Dict[str, BaseTool]
+        Available tools, indexed by tool name
+    max_workers : int
+        Size of the thread pool used for sync tools
+    timeouts : Dict[str, float]
+        Per-tool timeouts in seconds
+    concurrency : Dict[str, int]
+        Per-tool concurrency limits
+    default_timeout : float
+        Timeout for tools not listed in timeouts
+
+    Example:
+        >>> executor = ToolExecutor(tools_by_name={"sum_": calculator.sum_})
+        >>> messages = await executor.run([{"name": "sum_", "args": {"a": 1, "b": 2}, "id": "call_1"}])
+        >>> messages[0].content
+        '3'
+    """
+
+    def __init__(
+        self,
+        tools_by_name: Dict[str, BaseTool],
+        max_workers: int = MAX_TOOL_WORKERS,
+        timeouts: Optional[Dict[str, float]] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        default_timeout: float = DEFAULT_TOOL_TIMEOUT,
+    ) -> None:
+        self.tools_by_name = tools_by_name
+        self.timeouts = TOOL_TIMEOUTS if timeouts is None else timeouts
+        self.concurrency = TOOL_CONCURRENCY if concurrency is None else concurrency
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool-worker"
+        )
+        # asyncio semaphores are bound to a loop, so keep one set per running loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        limit = self.concurrency.get(tool_name)
+        if not limit:
+            return None
+        loop_semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if tool_name not in loop_semaphores:
+            loop_semaphores[tool_name] = asyncio.Semaphore(limit)
+        return loop_semaphores[tool_name]
+
+    async def _invoke(self, tool: BaseTool, args: dict, semaphore: Optional[asyncio.Semaphore]):
+        # The semaphore is acquired by the caller and released here once the call really ends
+        if not _is_sync_tool(tool):
+            try:
+                return await tool.ainvoke(args)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()  # Keep context vars (e.g. run ids) in the worker thread
+        try:
+            future = loop.run_in_executor(self._pool, ctx.run, tool.invoke, args)
+        except BaseException:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+
+        def on_thread_done(future: asyncio.Future) -> None:
+            # A timed out thread can't be killed: it keeps its worker and its
+            # concurrency slot until it returns
+            if semaphore is not None:
+                semaphore.release()
+            if not future.cancelled():
+                future.exception()  # Retrieved, no "never retrieved" warning after a timeout
+
+        future.add_done_callback(on_thread_done)
+        # A timeout cancels the shield only, the future keeps tracking the thread
+        return await asyncio.shield(future)
+
+    async def _run_one(self, tool_call: dict, tools_by_name: Dict[str, BaseTool]) -> ToolMessage:
+        start = time.perf_counter()
+        message = await self._call(tool_call, tools_by_name)
+        fields = {
+            "input_bytes": len(json.dumps(tool_call["args"], default=str)),
+            "output_bytes": len(str(message.content)),
+        }
+        if message.status == "error":
+            fields["error"] = str(message.content)[:500]
+        instrumentation.record(
+            "tool",
+            tool_call["name"],
+            time.perf_counter() - start,
+            status="error" if message.status == "error" else "ok",
+            **fields,
+        )
+        return message
+
+    async def _call(self, tool_call: dict, tools_by_name: Dict[str, BaseTool]) -> ToolMessage:
+        tool_name = tool_call["name"]
+        tool_call_id = tool_call["id"]
+        tool = tools_by_name.get(tool_name)
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: unknown tool '{tool_name}'",
+                tool_call_id=tool_call_id,
+                status="error",
+            )
+
+        timeout = self.timeouts.get(tool_name, self.default_timeout)
+        timed_out = ToolMessage(
+            content=f"Error: tool '{tool_name}' timed out after {timeout}s",
+            tool_call_id=tool_call_id,
+            status="error",
+        )
+        semaphore = self._get_semaphore(tool_name)
+        if semaphore is not None:
+            # Up to timeout for a slot, then up to timeout for the call itself
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return timed_out
+        try:
+            observation = await asyncio.wait_for(
+                self._invoke(tool, tool_call["args"], semaphore), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return timed_out
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {tool_name} failed: {e}",
+                tool_call_id=tool_call_id,
+                status="error",
+            )
+        return ToolMessage(content=observation, tool_call_id=tool_call_id)
+
+    async def run(
+        self, tool_calls: List[dict], overrides: Optional[Dict[str, BaseTool]] = None
+    ) -> List[ToolMessage]:
+        """
+        Execute all tool calls concurrently.
+
+        Parameters
+        ----------
+        tool_calls : List[dict]
+            Tool calls of the last AI message (keys "name", "args" and "id")
+        overrides : Dict[str, BaseTool], optional
+            Tools replacing the shared ones for these calls only, e.g. the
+            browser tools bound to the context of the current run
+
+        Returns:
+            List[ToolMessage]: One message per tool call, in the same order as tool_calls
+        """
+        tools_by_name = {**self.tools_by_name, **overrides} if overrides else self.tools_by_name
+        return list(
+            await asyncio.gather(*(self._run_one(call, tools_by_name) for call in tool_calls))
+        )
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,185 @@
+"""
+Pool of long-lived Stockfish processes driven through chess.engine's async protocol.
+
+Engines are started on demand (up to the pool size), reused across questions
+and shut down with close_engine_pools(). Analyses are cached by FEN + search
+limit, so repeated positions in an eval sweep return instantly.
+"""
+
+import asyncio
+import os
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import chess as c
+import chess.engine as ce
+
+
+STOCKFISH_POOL_SIZE = int(os.getenv("STOCKFISH_POOL_SIZE", "2"))
+STOCKFISH_THREADS = int(os.getenv("STOCKFISH_THREADS", "1"))
+STOCKFISH_HASH_MB = int(os.getenv("STOCKFISH_HASH_MB", "64"))
+ANALYSIS_CACHE_SIZE = int(os.getenv("STOCKFISH_CACHE_SIZE", "1024"))
+
+# Analyses are plain data, so the cache is shared by every pool / event loop
+_analysis_cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+
+
+def _cache_key(fen: str, limit: ce.Limit, multipv: int) -> tuple:
+    return (fen, limit.time, limit.depth, limit.nodes, multipv)
+
+
+class EnginePool:
+    """
+    Keep up to `size` warm UCI engines and lend them to analysis requests.
+
+    Parameters
+    ----------
+    engine_path : str
+        Path to the Stockfish executable
+    size : int
+        Max number of engine processes
+    threads : int
+        UCI "Threads" option of each engine
+    hash_mb : int
+        UCI "Hash" option of each engine
+
+    Example:
+        >>> pool = EnginePool(STOCKFISH_EXECUTABLE_PATH)
+        >>> lines = await pool.analyse(chess.Board(), ce.Limit(depth=12), multipv=2)
+        >>> lines[0]["san"]
+        'e4'
+    """
+
+    def __init__(
+        self,
+        engine_path: str,
+        size: int = STOCKFISH_POOL_SIZE,
+        threads: int = STOCKFISH_THREADS,
+        hash_mb: int = STOCKFISH_HASH_MB,
+    ) -> None:
+        self.engine_path = engine_path
+        self.size = size
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._engines: List[ce.Protocol] = []
+        self._start_lock = asyncio.Lock()
+
+    async def _start_engine(self) -> ce.Protocol:
+        _, engine = await ce.popen_uci(self.engine_path)
+        await engine.configure({"Threads": self.threads, "Hash": self.hash_mb})
+        return engine
+
+    async def _acquire(self) -> ce.Protocol:
+        while True:
+            if self._idle.empty():
+                async with self._start_lock:
+                    if len(self._engines) < self.size:
+                        engine = await self._start_engine()
+                        self._engines.append(engine)
+                        return engine
+            engine = await self._idle.get()
+            if engine is not None:
+                return engine
+            # None: a discarded engine freed its slot, start a replacement
+
+    async def _discard(self, engine: ce.Protocol) -> None:
+        if engine in self._engines:
+            self._engines.remove(engine)
+            self._idle.put_nowait(None)  # Wake up a caller waiting for an engine
+        try:
+            await asyncio.wait_for(engine.quit(), timeout=5)
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def engine(self):
+        """
+        Borrow an engine. Engines that fail (crash, cancelled search, ...) are
+        dropped and restarted on demand.
+        """
+        engine = await self._acquire()
+        try:
+            yield engine
+        except BaseException:
+            await self._discard(engine)
+            raise
+        else:
+            self._idle.put_nowait(engine)
+
+    async def analyse(
+        self, board: c.Board, limit: ce.Limit, multipv: int = 1
+    ) -> List[Dict]:
+        """
+        Analyse a position, reusing cached results for the same FEN and limit.
+
+        Parameters
+        ----------
+        board : chess.Board
+            Position to analyse
+        limit : chess.engine.Limit
+            Search limit (time, depth and / or nodes)
+        multipv : int
+            Number of principal variations to return
+
+        Returns:
+            List[Dict]: One dict per line, best first, with keys "move", "san",
+            "score_cp", "mate" (from the side to move's perspective) and "pv"
+        """
+        key = _cache_key(board.fen(), limit, multipv)
+        if key in _analysis_cache:
+            _analysis_cache.move_to_end(key)
+            return _analysis_cache[key]
+
+        async with self.engine() as engine:
+            infos = await engine.analyse(board, limit, multipv=multipv)
+
+        lines = []
+        for info in infos:
+            pv = info.get("pv", [])
+            if not pv:
+                continue
+            score = info["score"].pov(board.turn)
+            lines.append(
+                {
+                    "move": pv[0].uci(),
+                    "san": board.san(pv[0]),
+                    "score_cp": score.score(),
+                    "mate": score.mate(),
+                    "pv": board.variation_san(pv),
+                }
+            )
+
+        _analysis_cache[key] = lines
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+        return lines
+
+    async def close(self) -> None:
+        engines, self._engines = self._engines, []
+        for engine in engines:
+            await self._discard(engine)
+
+
+# Async engines are bound to the loop that spawned them: one pool per (loop, executable)
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, EnginePool]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_engine_pool(engine_path: str) -> EnginePool:
+    loop_pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    if engine_path not in loop_pools:
+        loop_pools[engine_path] = EnginePool(engine_path)
+    return loop_pools[engine_path]
+
+
+async def close_engine_pools() -> None:
+    """
+    Quit every engine started from the running event loop.
+    """
+    loop_pools = _pools.pop(asyncio.get_running_loop(), {})
+    for pool in loop_pools.values():
+        await pool.close()
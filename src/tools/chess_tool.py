@@ -1,15 +1,19 @@
 # from PIL import Image
-from board_to_fen.predict import get_fen_from_image_path
+from board_to_fen.predict import get_fen_from_image, get_fen_from_image_path, get_model
 import chess as c
 import chess.engine as ce
 
-import easyocr
 from langchain.tools import tool
 
 import os
+import asyncio
+import hashlib
 import numpy as np
-import cv2
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+from utils.cache import MISSING, TTLCache
+from utils.loader import model_registry
+from tools.chess_engine import get_engine_pool
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
@@ -21,6 +25,116 @@ STOCKFISH_EXECUTABLE_PATH = os.path.join(
 )
 
 STOCKFISH_EXECUTABLE_PATH = os.path.normpath(STOCKFISH_EXECUTABLE_PATH)
+STOCKFISH_TIME_LIMIT = float(os.getenv("STOCKFISH_TIME_LIMIT", "10"))
+
+# Board coordinates are the only glyphs worth reading
+COORDINATE_GLYPHS = "abcdefgh12345678"
+# Glyphs expected in each corner square, by view (black_view False / True)
+CORNER_GLYPHS = {
+    "bottom_left": {False: "a1", True: "h8"},
+    "top_left": {False: "a8", True: "h1"},
+    "bottom_right": {False: "h1", True: "a8"},
+    "top_right": {False: "h8", True: "a1"},
+}
+
+# Board orientation and full analyses, by image content hash
+orientation_cache = TTLCache(max_size=256)
+analysis_cache = TTLCache(max_size=256)
+
+
+def load_ocr_reader(gpu: bool = False):
+    """
+    Get the easyocr reader used to read board coordinates from the shared model registry.
+    """
+    import easyocr  # Heavy (torch), imported on first use
+
+    return model_registry.get(
+        key=("easyocr", "en", "cuda" if gpu else "cpu"),
+        loader=lambda: easyocr.Reader(["en"], gpu=gpu),
+    )
+
+
+def load_fen_model():
+    """
+    Load the board-to-FEN CNN (and tensorflow) ahead of the first chess question.
+    """
+    return get_model()
+
+
+def read_image(image_path: str) -> Tuple[str, np.ndarray]:
+    """
+    Read and decode an image in memory.
+
+    Returns:
+        Tuple[str, np.ndarray]: sha256 of the file content and the decoded BGR image
+    """
+    import cv2
+
+    with open(image_path, "rb") as f:
+        data = f.read()
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Cannot decode image: {image_path}")
+    return hashlib.sha256(data).hexdigest(), image
+
+
+def _corner_views(image: np.ndarray) -> Dict[str, np.ndarray]:
+    # Views (no copy) of the four corner squares, all the same size for the batched OCR
+    rows, cols = image.shape[:2]
+    h, w = rows // 8, cols // 8
+    return {
+        "bottom_left": image[rows - h :, :w],
+        "top_left": image[:h, :w],
+        "bottom_right": image[rows - h :, cols - w :],
+        "top_right": image[:h, cols - w :],
+    }
+
+
+def detect_board_orientation(image: np.ndarray, image_hash: Optional[str] = None) -> Optional[bool]:
+    """
+    Tell whether a board image is viewed from Black's perspective, from the
+    coordinate labels printed in its corner squares.
+
+    The four corner squares are read in one batched OCR call restricted to the
+    coordinate glyphs, and every glyph votes for a view: the bottom-left square
+    is a1 from White's side and h8 from Black's, and so on for the others.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        Decoded board image (e.g. from read_image), cropped to the board
+    image_hash : str, optional
+        Content hash of the image, results are cached by it
+
+    Returns:
+        bool: True if viewed from Black's perspective, False from White's, None if
+        no coordinate could be read
+
+    Example:
+        >>> detect_board_orientation(*reversed(read_image("chess_board.png")))
+        True
+    """
+    if image_hash is not None:
+        cached = orientation_cache.get(image_hash)
+        if cached is not MISSING:
+            return cached
+
+    corners = _corner_views(image)
+    reader = load_ocr_reader()
+    results = reader.readtext_batched(list(corners.values()), allowlist=COORDINATE_GLYPHS)
+
+    votes = {False: 0.0, True: 0.0}  # black_view -> confidence sum
+    for corner, corner_results in zip(corners, results):
+        for _, text, confidence in corner_results:
+            for glyph in text.lower():
+                for black_view, glyphs in CORNER_GLYPHS[corner].items():
+                    if glyph in glyphs:
+                        votes[black_view] += confidence
+
+    black_view = None if votes[True] == votes[False] else votes[True] > votes[False]
+    if image_hash is not None:
+        orientation_cache.set(image_hash, black_view)
+    return black_view
 
 
 @tool
@@ -34,47 +148,15 @@ def grab_board_view(chess_img_path: str) -> Dict:
         File path to Chess Board Image. It must point to a 2D board image
 
     Returns:
-        Dict: {"board_view", board_view}  # Where board_view in (True, False, "Unknown")
+        Dict: {"black_view", black_view}  # Where black_view in (True, False, "Unknown")
 
     Example:
         >>> grab_board_view("chess_board.png")
-        {"board_view", True}
-    """
-    cropped_square_path = "temp-square.png"
-    # Read Chess Board Img and Crop the bottom-left square
-    img_bgr = cv2.imread(chess_img_path)
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-
-    img_np = np.array(img_rgb)
-    img_np_shape = img_np.shape
-    img_rows, img_cols = img_np_shape[:2]
-    img_cropped = img_np[img_rows // 8 * 7 :, : img_cols // 8 * 1, :]
-    img_cropped = cv2.cvtColor(img_cropped, cv2.COLOR_BGR2RGB)
-    cv2.imwrite(cropped_square_path, img_cropped)
-
-    # Wrap text from image path
-    reader = easyocr.Reader(["en"], gpu=False)
-    results = reader.readtext(image=cropped_square_path)
-    results.reverse()
-
-    # Grab text
-    left_bottom_cell = ""
-    for _, text_temp, _ in results:
-        left_bottom_cell += text_temp
-
-    # Identify black view
-    if left_bottom_cell in ("h8", "8h", "h", "8"):
-        black_view = True
-    elif left_bottom_cell in ("a1", "1a", "a", "1"):
-        black_view = False
-    else:
-        black_view = "Unknown"
-
-    # delete temp image
-    if os.path.isfile(cropped_square_path):
-        os.remove(cropped_square_path)
-
-    return {"black_view": black_view}
+        {"black_view", True}
+    """
+    image_hash, image = read_image(chess_img_path)
+    black_view = detect_board_orientation(image, image_hash=image_hash)
+    return {"black_view": "Unknown" if black_view is None else black_view}
 
 
 @tool
@@ -102,8 +184,13 @@ def extract_fen_position(path_to_chess_img: str, black_view: bool = True) -> str
 
 
 @tool
-def predict_next_best_move(
-    fen_position: str, path_to_stockfish: str = STOCKFISH_EXECUTABLE_PATH
+async def predict_next_best_move(
+    fen_position: str,
+    time_limit: Optional[float] = STOCKFISH_TIME_LIMIT,
+    depth: Optional[int] = None,
+    nodes: Optional[int] = None,
+    multipv: int = 1,
+    path_to_stockfish: str = STOCKFISH_EXECUTABLE_PATH,
 ) -> str:
     """
     Leverage Stockfish 17.1 to predict the next best move.
@@ -113,10 +200,18 @@ def predict_next_best_move(
     fen_position : str
         FEN notation for the Chess Image. Must have the following syntax
         syntax: [Piece Placement] [Active Color] [Castling Availability] [En Passant Target Square] [Halfmove Clock] [Fullmove Number]
-
+    time_limit : float, optional
+        Max search time in seconds
+    depth : int, optional
+        Max search depth (plies)
+    nodes : int, optional
+        Max number of searched nodes
+    multipv : int
+        Number of candidate moves to return. Pass 1 to only get the best move
 
     Returns:
-        str: Predicted next best move in FEN notation
+        str: Predicted next best move in Standard Algebraic Notation. If multipv > 1,
+        one line per candidate move with its evaluation and principal variation
 
     Example:
         >>> predict_next_best_move('r1bqkbnr/pppp1ppp/2n5/4p3/1b2P3/2N2N2/PPPP1PPP/R1BQKB1R w KQkq - 2 4')
@@ -125,16 +220,109 @@ def predict_next_best_move(
     # Init Chess Board
     board = c.Board(fen_position)
 
-    # Get Stockfish model
-    chess_engine = ce.SimpleEngine.popen_uci(path_to_stockfish)
+    # Predict next best move with a warm engine from the pool
+    limit = ce.Limit(time=time_limit, depth=depth, nodes=nodes)
+    engine_pool = get_engine_pool(path_to_stockfish)
+    lines = await engine_pool.analyse(board=board, limit=limit, multipv=multipv)
+    if not lines:
+        return "No legal moves in this position."
+
+    if multipv == 1:
+        return lines[0]["san"]
+
+    candidates = []
+    for i, line in enumerate(lines, start=1):
+        candidates.append(f"{i}. {line['san']} ({_format_score(line)}) pv: {line['pv']}")
+    return "\n".join(candidates)
 
-    # Predict next best move
-    stockfish_player = chess_engine.play(board=board, limit=ce.Limit(time=10))
-    best_move_uci = stockfish_player.move
-    best_move = board.san(
-        move=best_move_uci
-    )  # Convert from Universal Chess interface to Standard Algebraic Notation
-    return best_move
+
+def _format_score(line: Dict) -> str:
+    return f"mate in {line['mate']}" if line["mate"] is not None else f"{line['score_cp']} cp"
+
+
+def fen_from_array(image: np.ndarray, black_view: bool = False) -> str:
+    """
+    Piece placement of a decoded (BGR) board image, predicted in one batched CNN call.
+    """
+    import cv2
+    from PIL import Image
+
+    return get_fen_from_image(Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)), black_view=black_view)
+
+
+@tool
+async def analyze_chess_position(
+    chess_img_path: str,
+    side_to_move: str = "w",
+    black_view: Optional[bool] = None,
+    castling: str = "-",
+    time_limit: Optional[float] = STOCKFISH_TIME_LIMIT,
+    multipv: int = 1,
+) -> Dict:
+    """
+    Solve a chess board image in one call: board view, FEN position, best move and evaluation.
+
+    Parameters
+    ----------
+    chess_img_path : str
+        File path to a 2D chess board image (.png, .jpg or .jpeg)
+    side_to_move : str
+        "w" or "b", the side to play (usually stated in the question)
+    black_view : bool, optional
+        Whether the board is viewed from Black's perspective. Detected from the
+        board coordinates if omitted
+    castling : str
+        Castling rights in FEN syntax, e.g. "KQkq". "-" if unknown
+    time_limit : float, optional
+        Max engine search time in seconds
+    multipv : int
+        Number of candidate moves to return
+
+    Returns:
+        Dict: "fen", "black_view", "best_move" (SAN), "evaluation" (from the side to
+        move's perspective) and, if multipv > 1, the candidate "lines". An "error"
+        key instead of the move if the predicted position is not legal
+
+    Example:
+        >>> await analyze_chess_position.ainvoke({"chess_img_path": "chess_board.png", "side_to_move": "b"})
+        {'fen': '3r2k1/pp3pp1/4b2p/7Q/3n4/PqBBR2P/5PP1/6K1 b - - 0 1', 'black_view': True,
+         'best_move': 'Rd5', 'evaluation': 'mate in 3'}
+    """
+    image_hash, image = await asyncio.to_thread(read_image, chess_img_path)
+    key = (image_hash, side_to_move, black_view, castling, time_limit, multipv)
+    result = analysis_cache.get(key)
+    if result is not MISSING:
+        return result
+
+    # Orientation and squares are read from the same decoded array
+    if black_view is None:
+        black_view = await asyncio.to_thread(detect_board_orientation, image, image_hash)
+        if black_view is None:
+            black_view = False  # No readable coordinates, most diagrams are from White's side
+    placement = await asyncio.to_thread(fen_from_array, image, black_view)
+
+    result = {"fen": placement, "black_view": black_view}
+    try:
+        board = c.Board(f"{placement} {side_to_move} {castling} - 0 1")
+    except ValueError as e:
+        return {**result, "error": f"Invalid FEN prediction: {e}"}
+    if not board.is_valid():
+        return {**result, "fen": board.fen(), "error": f"Illegal position ({board.status()!r})"}
+    result["fen"] = board.fen()
+
+    engine_pool = get_engine_pool(STOCKFISH_EXECUTABLE_PATH)
+    lines = await engine_pool.analyse(board=board, limit=ce.Limit(time=time_limit), multipv=multipv)
+    if not lines:
+        result.update(best_move=None, evaluation="No legal moves in this position.")
+    else:
+        result.update(best_move=lines[0]["san"], evaluation=_format_score(lines[0]))
+        if multipv > 1:
+            result["lines"] = [
+                {"move": line["san"], "evaluation": _format_score(line), "pv": line["pv"]}
+                for line in lines
+            ]
+    analysis_cache.set(key, result)
+    return result
 
 
 if __name__ == "__main__":
@@ -148,7 +336,7 @@ if __name__ == "__main__":
     #)
     usr_res = input("Pass FEN: ")
     fen = usr_res if len(usr_res) > 1 else fen
-    best_move = predict_next_best_move(fen_position=fen)
+    best_move = asyncio.run(predict_next_best_move.ainvoke({"fen_position": fen}))
     print(f"The next best move is: {best_move}")
 
 # TODO: Address warnings
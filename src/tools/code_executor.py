@@ -1,6 +1,8 @@
 from typing import Literal
 from langchain.tools import tool
-import subprocess
+import asyncio
+
+from utils.python_pool import get_python_pool
 
 
 def read_multiline_code() -> Literal:
@@ -15,9 +17,10 @@ def read_multiline_code() -> Literal:
 
 
 @tool
-def code_executor(src_code: str) -> str:
+async def code_executor(src_code: str) -> str:
     """
     Tool to let the Agent run its own python code.
+    numpy and pandas are already imported in the interpreter, so importing them is free.
 
     Parameters
     ----------
@@ -33,12 +36,11 @@ def code_executor(src_code: str) -> str:
         'hello world!'
     """
     try:
-        result = subprocess.run(
-            ["python", "-c", src_code], capture_output=True, text=True, timeout=5
-        )
-        if result.returncode != 0:
-            return f"Error: {result.stderr.strip()}"
-        return result.stdout.strip() or "Code Executed with no output."
+        # Runs on a warm, resource-limited worker interpreter
+        result = await get_python_pool().run(src_code)
+        if not result["ok"]:
+            return f"Error: {result['stderr'].strip()}"
+        return result["stdout"].strip() or "Code Executed with no output."
     except Exception as e:
         return f"Execution failed: {str(e)}"
 
@@ -46,5 +48,5 @@ def code_executor(src_code: str) -> str:
 if __name__ == "__main__":
     # TODO: include multiline function to run code in the terminal
     code = input("Write your python code " + "\n" + ("=" * 20) + "\n")
-    output = code_executor.invoke(input=code)
+    output = asyncio.run(code_executor.ainvoke(input=code))
     print(output)
@@ -1,11 +1,118 @@
 from langchain.tools import tool
-from ultralytics import YOLO
-import subprocess
+from collections import Counter
+import os
+
+from utils.loader import model_registry
+from utils.youtube import is_ingest_output
+
+MAX_SEGMENTS = 50  # Max run-length segments returned to the LLM
+
+
+def load_yolo_model(yolo_model: str = "yolov8s.pt"):
+    """
+    Get a YOLO detection model from the shared model registry.
+    """
+    from ultralytics import YOLO  # Heavy (torch), imported on first use
+
+    return model_registry.get(
+        key=("yolo", yolo_model, "cpu"),
+        loader=lambda: YOLO(model=yolo_model, task="detect"),
+    )
+
+
+class DetectionSummary:
+    """
+    Aggregate per-frame detections into a compact, bounded summary.
+
+    Keeps, per class, the max number of simultaneous objects and the first / last
+    frame where it was seen, plus run-length segments of consecutive frames with
+    identical detections (at most max_segments of them).
+    """
+
+    def __init__(self, max_segments: int = MAX_SEGMENTS) -> None:
+        self.max_segments = max_segments
+        self.frames_processed = 0
+        self.objects = {}
+        self.segments = []
+        self.segments_truncated = 0
+        self._last_signature = None
+        self._segment_open = False  # The last segment is the run of the previous frame
+
+    def update(self, frame: int, counts: Counter) -> None:
+        self.frames_processed += 1
+        for name, count in counts.items():
+            stats = self.objects.setdefault(
+                name, {"max_simultaneous": 0, "first_frame": frame, "last_frame": frame, "frames_seen": 0}
+            )
+            stats["max_simultaneous"] = max(stats["max_simultaneous"], count)
+            stats["last_frame"] = frame
+            stats["frames_seen"] += 1
+
+        signature = tuple(sorted(counts.items()))
+        if signature and signature == self._last_signature:
+            if self._segment_open:  # Else the run was truncated, and already counted
+                self.segments[-1]["end_frame"] = frame
+        elif signature and len(self.segments) < self.max_segments:
+            self.segments.append(
+                {"start_frame": frame, "end_frame": frame, "objects": dict(signature)}
+            )
+            self._segment_open = True
+        else:
+            if signature:
+                self.segments_truncated += 1
+            self._segment_open = False
+        self._last_signature = signature
+
+    def to_dict(self) -> dict:
+        return {
+            "frames_processed": self.frames_processed,
+            "objects": self.objects,
+            "segments": self.segments,
+            "segments_truncated": self.segments_truncated,
+        }
+
+
+def iter_frame_batches(video_path: str, frame_stride: int = 1, batch_size: int = 16):
+    """
+    Read a video lazily, yielding (frame numbers, frames) batches of every frame_stride-th frame.
+    Frame numbers are 1-based. Only one batch is held in memory at a time.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+
+    frame_numbers, frames = [], []
+    index = 0
+    try:
+        while True:
+            index += 1
+            if (index - 1) % frame_stride:
+                if not capture.grab():  # Skip the frame without decoding it
+                    break
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frame_numbers.append(index)
+            frames.append(frame)
+            if len(frames) == batch_size:
+                yield frame_numbers, frames
+                frame_numbers, frames = [], []
+        if frames:
+            yield frame_numbers, frames
+    finally:
+        capture.release()
 
 
 @tool
 def detect_objects(
-    video_path: str, remove_after: bool = True, yolo_model: str = "yolov8s.pt"
+    video_path: str,
+    remove_after: bool = True,
+    yolo_model: str = "yolov8s.pt",
+    frame_stride: int = 1,
+    batch_size: int = 16,
 ) -> dict:
     """
     Object detection task for a given video file (e.g. .mp4 file).
@@ -16,62 +123,58 @@ def detect_objects(
         Path to the video file (e.g. .mp4 file)
 
     remove_after: bool
-        Pass True if it is desired to remove after finishing task, which is optimal for memory-usage reasons-
+        Pass True if it is desired to remove after finishing task, which is optimal for memory-usage reasons.
+        Videos pulled with pull_youtube_video are always kept, they are reused by later questions
 
     yolo_model: str
         Path or name of the model to use. For, custom tasks such as bird species detection, pass 'external/ai-models/bird-species-detection.pt' as arg value
 
+    frame_stride: int
+        Only analyze one frame out of frame_stride. Increase it for long videos
+
+    batch_size: int
+        Number of frames per model inference
+
     Returns:
-        dict: Dict containing keys "video_path" (The same as input) and "detected_object" (A list of dicts, each dict has keys "frame" -the ith frame- and "result" -a list of detected objects in the ith frame-)
+        dict: Dict containing keys "video_path" (The same as input), "frames_processed",
+        "objects" (per detected class: max number of simultaneous objects, first / last frame
+        where it appears and number of frames where it appears) and "segments" (runs of
+        consecutive frames with the same detections, frames without detections are omitted)
 
     Example:
         >>> detect_objects(video_path='../../data/temp/processed_yt_video.mp4')
         '{
             "video_path": video_path,
-            "detected_objects":  [
-                {'frame': 1, 'result': []},
-                {'frame': 2, 'result':
-                    [
-                        'person',
-                        'bird',
-                        'bird'
-                    ]},
+            "frames_processed": 121,
+            "objects": {
+                "bird": {"max_simultaneous": 3, "first_frame": 2, "last_frame": 57, "frames_seen": 40},
+                "person": {"max_simultaneous": 1, "first_frame": 2, "last_frame": 4, "frames_seen": 3}
+            },
+            "segments": [
+                {"start_frame": 2, "end_frame": 4, "objects": {"bird": 2, "person": 1}},
+                {"start_frame": 5, "end_frame": 12, "objects": {"bird": 3}},
                 ...
-                {'frame': 121, 'result': []}
-                ]
+            ],
+            "segments_truncated": 0
         }'
     """
+    cv_model = load_yolo_model(yolo_model)  # Shared object detection model
+    summary = DetectionSummary()
+
+    # Stream the video by batches: memory stays bounded regardless of its length
+    for frame_numbers, frames in iter_frame_batches(
+        video_path, frame_stride=max(1, frame_stride), batch_size=max(1, batch_size)
+    ):
+        results = cv_model.predict(source=frames, verbose=False)
+        for frame_number, result in zip(frame_numbers, results):
+            counts = Counter(result.names[int(cls)] for cls in result.boxes.cls)
+            summary.update(frame_number, counts)
 
-    def summarize(results):
-        # Module to retrieve data on stream
-        for i, result in enumerate(results):
-            yield {
-                "frame": i + 1,
-                "result": [result.names[int(cls)] for cls in result.boxes.cls],
-            }
-
-    cv_model = YOLO(
-        model=yolo_model, task="detect"
-    )  # Initialize object detection model
-    cv_results_raw = cv_model.predict(
-        source=video_path, stream=True
-    )  # Identify video objects
-    cv_results_processed = list(
-        summarize(cv_results_raw)
-    )  # Process / clean model results
-
-    if remove_after:
-        # Remove raw video
-        remove_processed_video_cmd = (
-            f"rm {video_path}"  # Warning: take caution when modifying this line
-        )
-        subprocess.run(remove_processed_video_cmd, shell=True)
+    if remove_after and os.path.isfile(video_path) and not is_ingest_output(video_path):
+        os.remove(video_path)  # Remove processed video
 
     # Prepare tool results
-    processed_data = {
-        "video_path": video_path,
-        "detected_objects": cv_results_processed,
-    }
+    processed_data = {"video_path": video_path, **summary.to_dict()}
 
     return processed_data
 
@@ -1,12 +1,9 @@
 import os, dotenv
-from typing import Dict
+from typing import Dict, List, Optional
 from langchain.tools import tool
 from tavily import TavilyClient
-from pytubefix import YouTube
-import subprocess
 from playwright.async_api import async_playwright
-import pdfplumber
-import io
+import tempfile
 
 # Web search
 from urllib.parse import quote_plus, urlparse, parse_qs, unquote
@@ -15,18 +12,204 @@ import aiohttp #import aiohttp
 from bs4 import BeautifulSoup
 from markdownify import markdownify
 import asyncio
+import re
 
-# Document mining
-from langchain_community.document_loaders import OnlinePDFLoader
+from utils.cache import MISSING, TieredCache
+from utils.http_client import get_http_session
+from utils.pdf_extract import count_pages, extract_pdf_pages, parse_page_range
+from utils.youtube import ingest_youtube
 
 
 dotenv.load_dotenv()
 
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", str(24 * 3600)))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "1024"))
+# Optional sqlite file to persist searches across runs (e.g. offline replays of an eval set)
+WEB_SEARCH_CACHE_DB = os.getenv("WEB_SEARCH_CACHE_DB")
+
+search_cache = TieredCache(
+    max_size=WEB_SEARCH_CACHE_SIZE,
+    ttl=WEB_SEARCH_CACHE_TTL,
+    disk_path=WEB_SEARCH_CACHE_DB,
+)
+
+# "Search and read" mode
+PAGE_FETCH_TIMEOUT = float(os.getenv("PAGE_FETCH_TIMEOUT", "10"))
+CHARS_PER_TOKEN = 4  # Rough estimate, good enough to keep results under a budget
+PAGE_NOISE_TAGS = ["script", "style", "noscript", "nav", "footer", "header", "form", "svg"]
+
+# Online PDFs
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024**2)))
+PDF_DOWNLOAD_TIMEOUT = float(os.getenv("PDF_DOWNLOAD_TIMEOUT", "60"))
+PDF_CHUNK_SIZE = 256 * 1024
+PDF_CACHE_TTL = float(os.getenv("PDF_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Extracted text by URL, revalidated with the ETag of the server when there is one
+pdf_cache = TieredCache(max_size=64, ttl=PDF_CACHE_TTL, disk_path=os.getenv("PDF_CACHE_DB"))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase and collapse whitespaces so equivalent queries share a cache entry.
+    """
+    return " ".join(query.lower().split())
+
+
+async def fetch_search_results(query: str, limit: int = 3) -> list:
+    """
+    Query DuckDuckGo (html version) through the shared HTTP client.
+    Results are cached by normalized query.
+
+    Parameters
+    ----------
+    query : str
+        Web search query
+    limit : int
+        Max number of results
+
+    Returns:
+        list: (title, url) tuples, in DuckDuckGo ranking order
+    """
+    cache_key = ("duckduckgo", normalize_query(query), limit)
+    cached = search_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
+    http_session = get_http_session()
+    async with http_session.get(url) as response:
+        http_response = await response.text()
+
+    soup = await asyncio.to_thread(
+        BeautifulSoup, markup=http_response, features="html.parser"
+    )
+    results = []
+    for tag in soup.find_all(name="a", class_="result__a", limit=limit):
+        title = tag.get_text(strip=True)
+        raw_href = tag.get("href", "")
+        parsed = parse_qs(urlparse(raw_href).query)
+        cleaned_url = (
+            unquote(parsed.get("uddg", [""])[0]) if "uddg" in parsed else raw_href
+        )
+        results.append((title, cleaned_url))
+
+    if results:  # Don't cache empty pages (e.g. rate-limited responses)
+        search_cache.set(cache_key, results)
+    return results
+
+
+def html_to_markdown(html: str) -> str:
+    """
+    Convert a web page to markdown, dropping scripts, menus and other noise.
+    """
+    soup = BeautifulSoup(html, features="html.parser")
+    for noise in soup(PAGE_NOISE_TAGS):
+        noise.decompose()
+    text = markdownify(str(soup), heading_style="ATX")
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+async def fetch_page_markdown(url: str) -> str:
+    """
+    Download a web page through the shared HTTP client and convert it to markdown.
+    Pages are cached like search results.
+    """
+    cache_key = ("page", url)
+    cached = search_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    http_session = get_http_session()
+    async with http_session.get(url, timeout=PAGE_FETCH_TIMEOUT) as response:
+        response.raise_for_status()
+        if "html" not in response.headers.get("Content-Type", "html"):
+            raise ValueError(f"unsupported content type {response.content_type}")
+        html = await response.text(errors="replace")
+
+    page = await asyncio.to_thread(html_to_markdown, html)
+    search_cache.set(cache_key, page)
+    return page
+
+
+def select_snippets(page: str, query: str, max_chars: int) -> tuple:
+    """
+    Pick the paragraphs of a page that best match the query, within max_chars.
+
+    Parameters
+    ----------
+    page : str
+        Page content in markdown
+    query : str
+        Web search query, its words are used to score paragraphs
+    max_chars : int
+        Max length of the returned text
+
+    Returns:
+        tuple: (relevance score, snippets text). Snippets keep the page order
+    """
+    terms = {word for word in re.findall(r"\w+", query.lower()) if len(word) > 2}
+    paragraphs = [p.strip() for p in page.split("\n\n") if p.strip()]
+    scored = []
+    for position, paragraph in enumerate(paragraphs):
+        words = re.findall(r"\w+", paragraph.lower())
+        score = sum(word in terms for word in words)
+        if score:
+            scored.append((score, position, paragraph))
+
+    # Best paragraphs first until the budget is spent, then restore page order
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    selected, used = [], 0
+    for score, position, paragraph in scored:
+        if used >= max_chars:
+            break
+        paragraph = paragraph[: max_chars - used]
+        selected.append((position, paragraph))
+        used += len(paragraph)
+
+    if not selected:  # No overlap with the query, fall back on the beginning of the page
+        return 0, page[:max_chars]
+    selected.sort()
+    relevance = sum(score for score, _, _ in scored)
+    return relevance, "\n\n".join(paragraph for _, paragraph in selected)
+
+
+async def search_and_read(query: str, max_results: int, token_budget: int) -> str:
+    """
+    Search the web, read the top results concurrently and return ranked snippets
+    whose total length fits in token_budget.
+    """
+    results = await fetch_search_results(query, limit=max_results)
+    if not results:
+        return "No results found."
+
+    pages = await asyncio.gather(
+        *(fetch_page_markdown(url) for _, url in results), return_exceptions=True
+    )
+
+    max_chars = token_budget * CHARS_PER_TOKEN // len(results)
+    ranked = []
+    for rank, ((title, url), page) in enumerate(zip(results, pages), start=1):
+        if isinstance(page, BaseException):
+            ranked.append((-1, rank, title, url, f"(Page could not be read: {page})"))
+            continue
+        relevance, snippets = await asyncio.to_thread(select_snippets, page, query, max_chars)
+        ranked.append((relevance, rank, title, url, snippets))
+
+    # Most relevant pages first, search engine rank breaks ties
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return "\n\n".join(
+        f"{i}. [{title}]({url})\n{snippets}"
+        for i, (_, _, title, url, snippets) in enumerate(ranked, start=1)
+    )
+
+
 # search_engine = TavilyClient(api_key=os.getenv(key="TAVILY_API_KEY"))
 
 # TODO: update docstrings
 @tool
-async def web_search(query: str) -> str:  # Q: how to pass GuestState as type?
+async def web_search(
+    query: str, max_results: int = 3, read_pages: bool = False, token_budget: int = 3000
+) -> str:  # Q: how to pass GuestState as type?
     """
     This tools searchs in the web to retrieve information related to the user query.
 
@@ -34,9 +217,16 @@ async def web_search(query: str) -> str:  # Q: how to pass GuestState as type?
     ----------
     query : str
         Web search query
+    max_results : int
+        Number of search results to return
+    read_pages : bool
+        Pass True to also read the result pages and get their most relevant
+        passages in the same call (instead of browsing them one by one)
+    token_budget : int
+        Approximate max size (in tokens) of the page passages when read_pages is True
 
     Returns:
-        str: Web search result with related links
+        str: Web search result with related links (and ranked page passages if read_pages is True)
 
     Example:
         >>> search_tool.invoke(state={
@@ -47,65 +237,136 @@ async def web_search(query: str) -> str:  # Q: how to pass GuestState as type?
     """
     module_name = "Web Search Tool"
     # logging.info(f"[{module_name}] Running web search...")
-    query = quote_plus(query)  # format query
-    # Get page data 
-    url = (
-        f"https://html.duckduckgo.com/html/?q={query}"  # Process user query as http url
-    )
-
-    headers = {"User-Agent": "Mozilla/5.0"}
-    http_query = {"url": url, "headers": headers}
-    
-    async with aiohttp.ClientSession() as http_session:
-        async with http_session.get(**http_query) as response:
-            http_response = await response.text()
+    if read_pages:
+        return await search_and_read(query, max_results=max_results, token_budget=token_budget)
 
-    soup = await asyncio.to_thread(
-        BeautifulSoup, markup=http_response, features="html.parser"
-    )
-    results_raw = soup.find_all(name="a", class_="result__a", limit=3)
+    results = await fetch_search_results(query, limit=max_results)
 
     # logging.info(f"[{module_name}] Web search completed.")
-    if not results_raw:
+    if not results:
         return "No results found."
 
-    formatted_results = []
-    for i, tag in enumerate(results_raw, start=1):
-        title = tag.get_text(strip=True)
-        raw_href = tag.get("href", "")
-        parsed = parse_qs(urlparse(raw_href).query)
-        cleaned_url = (
-            unquote(parsed.get("uddg", [""])[0]) if "uddg" in parsed else raw_href
-        )
-        formatted_results.append(f"{i}. [{title}]({cleaned_url})")
-
+    formatted_results = [
+        f"{i}. [{title}]({url})" for i, (title, url) in enumerate(results, start=1)
+    ]
     return "\n\n".join(formatted_results)
 
 
+async def download_pdf(pdf_url: str, output_file, etag: Optional[str] = None) -> tuple:
+    """
+    Stream a PDF into output_file by chunks, never holding the whole document in memory.
+
+    Parameters
+    ----------
+    pdf_url : str
+        URL that points directly to the pdf file
+    output_file : file object
+        Binary file to write into
+    etag : str, optional
+        ETag of a cached copy. If the server answers 304 Not Modified nothing is downloaded
+
+    Returns:
+        tuple: (modified, etag). modified is False when the server answered 304 Not Modified
+
+    Raises:
+        ValueError: If the document is bigger than PDF_MAX_BYTES
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    http_session = get_http_session()
+    async with http_session.get(pdf_url, headers=headers, timeout=PDF_DOWNLOAD_TIMEOUT) as response:
+        if response.status == 304:
+            return False, etag
+        response.raise_for_status()
+        if (response.content_length or 0) > PDF_MAX_BYTES:
+            raise ValueError(f"PDF is too large ({response.content_length} bytes)")
+
+        downloaded = 0
+        async for chunk in response.content.iter_chunked(PDF_CHUNK_SIZE):
+            downloaded += len(chunk)
+            if downloaded > PDF_MAX_BYTES:
+                raise ValueError(f"PDF is too large (more than {PDF_MAX_BYTES} bytes)")
+            await asyncio.to_thread(output_file.write, chunk)
+        return True, response.headers.get("ETag")
+
+
+def format_pdf_pages(
+    texts: Dict[int, str], page_numbers: List[int], n_pages: int, keywords: Optional[List[str]]
+) -> str:
+    """
+    Join the selected pages, keeping only those that mention a keyword (if any given).
+    """
+    if keywords:
+        lowered = [keyword.lower() for keyword in keywords]
+        page_numbers = [
+            page for page in page_numbers
+            if any(keyword in texts[page].lower() for keyword in lowered)
+        ]
+        if not page_numbers:
+            return f"None of the keywords {keywords} was found in the PDF ({n_pages} pages)."
+
+    return "\n\n".join(f"--- Page {page} / {n_pages} ---\n{texts[page]}" for page in page_numbers)
+
+
 @tool
-async def fetch_online_pdf(pdf_url: str) -> str:
+async def fetch_online_pdf(
+    pdf_url: str, pages: Optional[str] = None, keywords: Optional[List[str]] = None
+) -> str:
     """
     Extract text from a PDF file saved in the web
-    
+
     Args:
-        url (str): URL that points directly to the pdf file
+        pdf_url (str): URL that points directly to the pdf file
+        pages (str, optional): Pages to read (1-based), e.g. "1-3,7". Every page by default
+        keywords (List[str], optional): Only return the pages that contain at least one of
+            these words (case insensitive). Useful to find a passage in a long report
 
     Returns:
-        str: PDF text
+        str: PDF text, page by page
     """
-    pdf_object = OnlinePDFLoader(file_path=pdf_url)
-    pdf = await pdf_object.load()
-
-    return pdf
+    cache_key = ("pdf", pdf_url)
+    cached = pdf_cache.get(cache_key)
+    cached = None if cached is MISSING else cached
+
+    if cached and cached["etag"] is None:
+        # Nothing to revalidate with: rely on the cache TTL
+        n_pages, texts = cached["n_pages"], cached["pages"]
+        page_numbers = parse_page_range(pages, n_pages)
+        if all(page in texts for page in page_numbers):
+            return format_pdf_pages(texts, page_numbers, n_pages, keywords)
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        # Revalidate the cached text, or download the document
+        cached_etag = cached["etag"] if cached else None
+        modified, etag = await download_pdf(pdf_url, pdf_file, etag=cached_etag)
+        pdf_file.flush()
+
+        if modified:
+            n_pages = await asyncio.to_thread(count_pages, pdf_file.name)
+            texts = {}
+        else:
+            n_pages, texts = cached["n_pages"], cached["pages"]
+
+        page_numbers = parse_page_range(pages, n_pages)
+        missing_pages = [page for page in page_numbers if page not in texts]
+        if missing_pages and not modified:
+            # Pages never extracted before: the document is needed after all
+            modified, etag = await download_pdf(pdf_url, pdf_file)
+            pdf_file.flush()
+        if missing_pages:
+            texts = {**texts, **await extract_pdf_pages(pdf_file.name, missing_pages)}
+
+    pdf_cache.set(cache_key, {"etag": etag, "n_pages": n_pages, "pages": texts})
+    return format_pdf_pages(texts, page_numbers, n_pages, keywords)
 
 
 @tool
-def pull_youtube_video(
+async def pull_youtube_video(
     url: str, output_dir: str, get_audio: bool = False, get_video: bool = False
 ) -> Dict:
     """
     Import Youtube video and audio to local.
-    The output are one of two files: processed_yt_video.mp4 and yt_audio.mp3 saved in output_dir
+    The output are one of two files: processed_yt_video.mp4 (1 fps, no sound) and yt_audio.mp3,
+    saved in output_dir/<video_id>/. Videos already imported are not downloaded again.
     Use get_audio and get_video to indicate which file to pull from the youtube video URL (can be both)
 
     Parameters
@@ -113,6 +374,9 @@ def pull_youtube_video(
     url : str
         Youtube video URL
 
+    output_dir: str
+        Directory where the files are saved (in a sub-directory named after the video id)
+
     get_audio: bool
         Pass True to retrieve the audio from the youtube URL
 
@@ -123,11 +387,13 @@ def pull_youtube_video(
         Dict: Result message
 
     Example:
-        >>> pull_youtube_video(
-            url="https://www.youtube.com/watch?v=IMgN1MGRKgA",
-            output_dir="data/temp/"
-        )
-        {"result": f"Data saved in 'data/temp/yt_audio.mp3' and '../../data/temp/processed_yt_video.mp4'"}
+        >>> await pull_youtube_video.ainvoke({
+            "url": "https://www.youtube.com/watch?v=IMgN1MGRKgA",
+            "output_dir": "data/temp/",
+            "get_audio": True,
+            "get_video": True,
+        })
+        {"result": "Data saved in: data/temp/IMgN1MGRKgA/processed_yt_video.mp4 data/temp/IMgN1MGRKgA/yt_audio.mp3"}
     """
     try:
         assert not ((get_audio == False) and (get_video == False))
@@ -136,53 +402,11 @@ def pull_youtube_video(
             "arguments get_audio, get_video cannot be both False. Please set one (or both) of them as True to run this module"
         )
 
-    yt = YouTube(url)  # Youtube object that pulls video / audio
-    output_message = "Data saved in: "
-
-    # 1. Video Task
-    if get_video:
-        # Define filenames and paths to save imported video and audio files
-        raw_yt_video_filename = "raw_yt_video.mp4"
-        processed_yt_video_filename = "processed_yt_video.mp4"
-
-        raw_yt_video_path = os.path.join(output_dir, raw_yt_video_filename)
-        processed_yt_video_path = os.path.join(output_dir, processed_yt_video_filename)
-
-        # Define how to import yt video: video file
-        yt_video = (
-            yt.streams.filter(only_video=True, fps=25, res="144p")
-            .order_by("fps")
-            .asc()
-            .first()
-        )
-
-        # Download audio and raw video
-        yt_video.download(output_path=output_dir, filename=raw_yt_video_filename)
-
-        # Process the video to optimize memmory usage (create a new video file which is a version with fewer fps)
-        new_fps = 1
-        reduce_fps_cmd = f'ffmpeg -y -i {raw_yt_video_path} -filter:v "fps={new_fps}" -an {processed_yt_video_path}'
-        subprocess.run(reduce_fps_cmd, shell=True)
-
-        # Remove raw video
-        remove_raw_video_cmd = f"rm {raw_yt_video_path}"
-        subprocess.run(remove_raw_video_cmd, shell=True)
-        output_message += f"{processed_yt_video_path} "
-
-    # 2. Audio Task
-    if get_audio:
-        # Define filenames and paths to save audio files
-        yt_audio_filename = "yt_audio.mp3"
-        yt_audio_path = os.path.join(output_dir, yt_audio_filename)
-
-        # Define how to import yt video: audio file
-        yt = YouTube(url)
-        yt_audio = yt.streams.filter(only_audio=True).first()
-
-        # Download audio and raw video
-        yt_audio.download(output_path=output_dir, filename=yt_audio_filename)
-        output_message += f"{yt_audio_path}"
-
+    # Audio and video are downloaded concurrently, piped into ffmpeg (no raw file on disk)
+    paths = await ingest_youtube(url, output_dir, get_audio=get_audio, get_video=get_video)
+    output_message = "Data saved in: " + " ".join(
+        path for path in (paths["video"], paths["audio"]) if path
+    )
     return {"result": output_message}
 
 
@@ -198,16 +422,16 @@ def test_yt_func():
     # fast unit testing
     yt_url = input("Pass YT url: ")
     output_dir = input("Pass output dir: ")
-    result = pull_youtube_video.invoke(
-        input={"url": yt_url, "output_dir": output_dir, "get_video": True}
-    )
+    result = asyncio.run(pull_youtube_video.ainvoke(
+        input={"url": yt_url, "output_dir": output_dir, "get_video": True, "get_audio": True}
+    ))
     print("result", result)
 
 def test_fetch_pdf() -> None:
     user_query = input("Pass a pdf in the web to extract: ")
 
     async def inner():
-        result = await fetch_pdf_text.ainvoke(input=user_query)
+        result = await fetch_online_pdf.ainvoke(input={"pdf_url": user_query})
         print("Results")
         print("=" * 40)
         print(result)
@@ -0,0 +1,34 @@
+from langchain.tools import tool
+
+from core.context import read_payload
+
+
+@tool
+def read_tool_payload(ref: str, offset: int = 0, max_chars: int = 8000) -> str:
+    """
+    Read the full output of a previous tool call that was truncated to save context.
+
+    Truncated tool outputs end with a note like "Full output stored as payload '<ref>'".
+    Use this tool only when the missing part is needed to answer.
+
+    Args:
+        ref (str): Payload reference given in the truncation note
+        offset (int): First character to read
+        max_chars (int): Max number of characters to read
+
+    Returns:
+        str: Requested part of the payload, followed by the offset of the next part if any
+
+    Example:
+        >>> read_tool_payload.invoke({"ref": "3f2a9c1b7e4d", "offset": 8000})
+        '...text...\\n[Payload continues at offset=16000 of 52311 characters]'
+    """
+    content = read_payload(ref)
+    if content is None:
+        return f"Payload '{ref}' not found (expired or unknown reference). Run the original tool again."
+
+    part = content[offset:offset + max_chars]
+    end = offset + len(part)
+    if end < len(content):
+        part += f"\n[Payload continues at offset={end} of {len(content)} characters]"
+    return part
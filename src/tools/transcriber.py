@@ -1,47 +1,140 @@
-import whisper
 from langchain_core.tools import tool
+from typing import List, Optional
 import os
+import time
+
+from utils.audio import (
+    CHUNK_SECONDS,
+    SAMPLE_RATE,
+    WHISPER_OPTIONS,
+    format_timestamp,
+    iter_transcript,
+    probe_duration,
+)
+from utils.cache import MISSING, TieredCache
+from utils.decorators import file_digest
+from utils.loader import model_registry
+
+WHISPER_MODEL_SIZE = "tiny"
+# Optional sqlite file to keep transcripts across runs (e.g. data/cache/transcripts.sqlite)
+TRANSCRIPT_CACHE_DB = os.getenv("TRANSCRIPT_CACHE_DB")
+
+# Full transcripts (segments), keyed by audio content hash and model size
+transcript_cache = TieredCache(max_size=64, disk_path=TRANSCRIPT_CACHE_DB)
+
+
+def load_whisper_model(model_size: str = WHISPER_MODEL_SIZE, use_gpu: bool = False):
+    """
+    Get a whisper model from the shared model registry (loaded once per size / device).
+    """
+    import whisper  # Heavy (torch), imported on first use
+
+    device = "cuda" if use_gpu else "cpu"
+    return model_registry.get(
+        key=("whisper", model_size, device),
+        loader=lambda: whisper.load_model(model_size, device=device),
+    )
+
+
+def transcribe_in_process(
+    audio_path: str, use_gpu: bool = False, max_seconds: Optional[float] = None
+) -> List[dict]:
+    """
+    Transcribe with the registry model, in one whisper call. Used for short
+    audios (not worth starting the pool) and on GPU.
+    """
+    import whisper
+
+    ai_model = load_whisper_model(WHISPER_MODEL_SIZE, use_gpu=use_gpu)
+    audio = whisper.load_audio(audio_path)
+    if max_seconds is not None:
+        audio = audio[: int(max_seconds * SAMPLE_RATE)]
+    raw_transcript = ai_model.transcribe(audio, fp16=use_gpu, **WHISPER_OPTIONS)
+    return [
+        {"start": round(s["start"], 2), "end": round(s["end"], 2), "text": s["text"].strip()}
+        for s in raw_transcript["segments"]
+        if s["text"].strip()
+    ]
+
+
+def format_transcript(segments: List[dict], timestamps: bool = False) -> str:
+    if timestamps:
+        return "\n".join(
+            f"[{format_timestamp(s['start'])} - {format_timestamp(s['end'])}] {s['text']}"
+            for s in segments
+        )
+    return " ".join(s["text"] for s in segments)
+
 
 @tool
-def transcriber(audio_path: str, use_gpu: bool = False) -> str:
+def transcriber(
+    audio_path: str,
+    use_gpu: bool = False,
+    timestamps: bool = False,
+    max_audio_seconds: Optional[float] = None,
+    time_budget: Optional[float] = None,
+) -> str:
     """
     Transcribes an audio file
 
+    Long audios are split in chunks transcribed in parallel.
+
     Parameters
     ----------
     audio_path : str or Path
         Path to an existing audio file (e.g. .wav, .mp3). Must be readable by ffmpeg.
     use_gpu: bool
         Pass True if you are in a colab GPU environment or you have an integrated Nvidia GPU
-    
+    timestamps: bool
+        Pass True to get one "[hh:mm:ss - hh:mm:ss] text" line per segment
+    max_audio_seconds: float, optional
+        Only transcribe the first seconds of the audio (e.g. 120 to skim a long video)
+    time_budget: float, optional
+        Max seconds to spend, the transcript of the part done so far is returned when exceeded
+
     Returns:
-        str: Text of the transcript 
+        str: Text of the transcript
     """
-    
-    model_size = "tiny"
-    ai_model = (
-        whisper.load_model(model_size).cuda()
-        if use_gpu
-        else whisper.load_model(model_size)
-    )
-        
-    raw_transcript = ai_model.transcribe(
-        audio_path,
-        word_timestamps=False,
-        no_speech_threshold=0.5,
-        condition_on_previous_text=True,
-        compression_ratio_threshold=2.0,
-    )
-    
-    transcript = raw_transcript["text"]
-    
+    audio_key = ("whisper", file_digest(audio_path), WHISPER_MODEL_SIZE)
+    segments = transcript_cache.get(audio_key)
+    if segments is not MISSING:
+        if max_audio_seconds is not None:
+            segments = [s for s in segments if s["start"] < max_audio_seconds]
+        return format_transcript(segments, timestamps=timestamps)
+
+    duration = probe_duration(audio_path)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    complete = True
+    if use_gpu or (duration is not None and duration <= CHUNK_SECONDS * 1.5):
+        segments = transcribe_in_process(audio_path, use_gpu=use_gpu, max_seconds=max_audio_seconds)
+    else:
+        segments = []
+        try:
+            for segment in iter_transcript(
+                audio_path, WHISPER_MODEL_SIZE, max_seconds=max_audio_seconds, deadline=deadline
+            ):
+                segments.append(segment)
+        except TimeoutError:
+            complete = False
+
+    if complete and max_audio_seconds is None:
+        transcript_cache.set(audio_key, segments)
+
+    transcript = format_transcript(segments, timestamps=timestamps)
+    if not complete:
+        done = segments[-1]["end"] if segments else 0
+        total = f" of {format_timestamp(duration)}" if duration else ""
+        transcript += (
+            f"\n[Partial transcript: time budget of {time_budget} s exceeded, "
+            f"transcribed up to {format_timestamp(done)}{total}]"
+        )
     return transcript
 
 if __name__ == "__main__":
     #audio_path = "~/.cache/huggingface/hub/datasets--gaia-benchmark--GAIA/snapshots/897f2dfbb5c952b5c3c1509e648381f9c7b70316/2023/validation/99c9cc74-fdc8-46c6-8f8d-3ce2d3bfeea3.mp3"#input("Pass your audio path to transcribe: ")
     #audio_path = os.path.expanduser(audio_path)
     audio_path = "data/temp/yt_audio.mp3"
-    print("=" * 30, "\nTranscription\n", "=" * 30, "\n", transcriber(audio_path))
+    print("=" * 30, "\nTranscription\n", "=" * 30, "\n", transcriber.invoke({"audio_path": audio_path}))
 
 
-# TODO: include unit testing modules
\ No newline at end of file
+# TODO: include unit testing modules
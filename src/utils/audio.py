@@ -0,0 +1,240 @@
+"""
+Chunked, parallel audio transcription.
+
+ffmpeg decodes the audio as a 16 kHz mono PCM stream, which is cut into
+chunks of about CHUNK_SECONDS at the quietest point near each boundary (energy
+based voice activity detection), so words are not split between chunks.
+Chunks are transcribed on a process pool where every worker loads the whisper
+model once, and the segments are stitched back in order with their timestamps.
+This module is kept light on imports because it is the one loaded by the pool
+workers.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000  # Whisper input rate
+CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "28"))  # Whisper windows are 30 s
+CUT_SEARCH_SECONDS = 4.0  # Cut points are searched in the last seconds of each chunk
+VAD_FRAME_SECONDS = 0.03
+READ_BLOCK_SECONDS = 5.0
+TRANSCRIBE_WORKERS = int(
+    os.getenv("TRANSCRIBE_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2))))
+)
+
+WHISPER_OPTIONS = {
+    "word_timestamps": False,
+    "no_speech_threshold": 0.5,
+    "condition_on_previous_text": True,
+    "compression_ratio_threshold": 2.0,
+}
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_worker_model = None  # Whisper model of a pool worker
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """
+    Returns:
+        float: Duration of the audio in seconds, None if ffprobe can't tell
+    """
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", audio_path,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return float(output.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def stream_pcm(audio_path: str, max_seconds: Optional[float] = None) -> Iterator[np.ndarray]:
+    """
+    Decode an audio file with ffmpeg, block by block.
+
+    Yields:
+        np.ndarray: int16 mono samples at SAMPLE_RATE
+    """
+    command = ["ffmpeg", "-nostdin", "-v", "error", "-i", audio_path]
+    if max_seconds is not None:
+        command += ["-t", str(max_seconds)]
+    command += ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    block_bytes = int(READ_BLOCK_SECONDS * SAMPLE_RATE) * 2
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[: len(data) - len(data) % 2], dtype=np.int16)
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {audio_path}: {process.stderr.read().decode()}")
+    finally:
+        if process.poll() is None:  # Consumer stopped early
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def find_cut(samples: np.ndarray, start: int, end: int) -> int:
+    """
+    Index of the quietest VAD frame of samples[start:end].
+    """
+    frame = int(VAD_FRAME_SECONDS * SAMPLE_RATE)
+    window = samples[start:end].astype(np.float32)
+    n_frames = len(window) // frame
+    if n_frames == 0:
+        return end
+    energy = np.square(window[: n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_chunks(
+    audio_path: str,
+    chunk_seconds: float = CHUNK_SECONDS,
+    max_seconds: Optional[float] = None,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Split an audio file into chunks cut in silences.
+
+    Parameters
+    ----------
+    audio_path : str
+        Any file readable by ffmpeg
+    chunk_seconds : float
+        Max chunk duration
+    max_seconds : float, optional
+        Only read the beginning of the audio
+
+    Yields:
+        Tuple[float, np.ndarray]: Chunk start in seconds and int16 samples
+
+    Example:
+        >>> [(start, len(samples) / SAMPLE_RATE) for start, samples in iter_chunks("talk.mp3")][:2]
+        [(0.0, 27.135), (27.135, 26.415)]
+    """
+    chunk_size = int(chunk_seconds * SAMPLE_RATE)
+    search_size = int(min(CUT_SEARCH_SECONDS, chunk_seconds / 2) * SAMPLE_RATE)
+    buffer = np.empty(0, dtype=np.int16)
+    offset = 0  # Samples already yielded
+    for block in stream_pcm(audio_path, max_seconds=max_seconds):
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= chunk_size:
+            cut = find_cut(buffer, chunk_size - search_size, chunk_size)
+            yield offset / SAMPLE_RATE, buffer[:cut]
+            buffer = buffer[cut:]
+            offset += cut
+    if len(buffer):
+        yield offset / SAMPLE_RATE, buffer
+
+
+def _init_worker(model_size: str, n_threads: int) -> None:
+    # Runs once per pool worker
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(n_threads)
+    _worker_model = whisper.load_model(model_size, device="cpu")
+
+
+def _transcribe_chunk(samples: np.ndarray, start: float) -> List[dict]:
+    # Runs in a pool worker
+    audio = samples.astype(np.float32) / 32768.0
+    result = _worker_model.transcribe(audio, fp16=False, **WHISPER_OPTIONS)
+    return [
+        {
+            "start": round(start + segment["start"], 2),
+            "end": round(start + segment["end"], 2),
+            "text": segment["text"].strip(),
+        }
+        for segment in result["segments"]
+        if segment["text"].strip()
+    ]
+
+
+def get_transcribe_pool(model_size: str) -> ProcessPoolExecutor:
+    if model_size not in _pools:
+        n_threads = max(1, (os.cpu_count() or 1) // TRANSCRIBE_WORKERS)
+        # spawn: forking a process that runs threads (tool executor) is unsafe
+        _pools[model_size] = ProcessPoolExecutor(
+            max_workers=TRANSCRIBE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_size, n_threads),
+        )
+    return _pools[model_size]
+
+
+def iter_transcript(
+    audio_path: str,
+    model_size: str,
+    max_seconds: Optional[float] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[dict]:
+    """
+    Transcribe an audio file in parallel chunks.
+
+    Segments are yielded in order as soon as the chunks before them are done,
+    so callers can stop early with a partial transcript. At most two chunks
+    per worker are decoded ahead, memory does not grow with the audio length.
+
+    Parameters
+    ----------
+    audio_path : str
+        Any file readable by ffmpeg
+    model_size : str
+        Whisper model, e.g. "tiny"
+    max_seconds : float, optional
+        Only transcribe the beginning of the audio
+    pool : ProcessPoolExecutor, optional
+        Pool to use, the shared pool of model_size by default
+    deadline : float, optional
+        time.monotonic() value after which TimeoutError is raised, segments
+        already yielded form the partial transcript
+
+    Yields:
+        dict: Segments {"start", "end", "text"}, times in seconds from the start of the audio
+    """
+    pool = pool or get_transcribe_pool(model_size)
+    pending = deque()
+
+    def next_result() -> List[dict]:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return pending.popleft().result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError("Transcription time budget exceeded") from None
+
+    try:
+        for start, samples in iter_chunks(audio_path, max_seconds=max_seconds):
+            pending.append(pool.submit(_transcribe_chunk, samples, start))
+            if len(pending) >= 2 * TRANSCRIBE_WORKERS:
+                yield from next_result()
+        while pending:
+            yield from next_result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def format_timestamp(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
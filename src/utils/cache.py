@@ -0,0 +1,239 @@
+"""
+Small caching primitives shared by the tools.
+
+- TTLCache: in-memory LRU cache with per-entry expiration
+- SQLiteCache: on-disk tier (sqlite, pickled values) that survives restarts
+- TieredCache: memory in front of an optional disk tier, with hit-rate metrics
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+# Returned by get() on a miss, so None can be cached as a regular value
+MISSING = object()
+
+
+class TTLCache:
+    """
+    In-memory LRU cache whose entries expire after ttl seconds.
+
+    Parameters
+    ----------
+    max_size : int
+        Max number of entries, least recently used entries are evicted first
+    ttl : float, optional
+        Default time to live in seconds. None means entries never expire
+
+    Example:
+        >>> cache = TTLCache(max_size=2, ttl=60)
+        >>> cache.set("query", "result")
+        >>> cache.get("query")
+        'result'
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key / value cache stored in a sqlite file.
+
+    Keys are stored as their repr, values are pickled.
+
+    Parameters
+    ----------
+    path : str
+        sqlite file, created (with its parent directory) if needed
+    ttl : float, optional
+        Default time to live in seconds. None means entries never expire
+    max_entries : int, optional
+        Max number of entries, the oldest writes are deleted first. None means no limit
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (repr(key),)
+            ).fetchone()
+        if row is None:
+            return MISSING
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return MISSING
+        return pickle.loads(value)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (repr(key), blob, expires_at),
+            )
+            if self.max_entries is not None:
+                # INSERT OR REPLACE gives a new rowid, so rowids follow the write order
+                self._conn.execute(
+                    "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (repr(key),))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    Memory cache backed by an optional sqlite tier, with hit / miss counters.
+
+    Parameters
+    ----------
+    max_size : int
+        Max number of entries kept in memory
+    ttl : float, optional
+        Default time to live in seconds for both tiers
+    disk_path : str, optional
+        sqlite file for the disk tier. No disk tier if omitted
+    disk_max_entries : int, optional
+        Max number of entries of the disk tier. No limit if omitted
+
+    Example:
+        >>> cache = TieredCache(max_size=512, ttl=3600, disk_path="data/cache/search.sqlite")
+        >>> cache.set(("ddg", "what is uber"), "1. [Uber](https://uber.com)")
+        >>> cache.stats()["hit_rate"]
+        0.0
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        disk_max_entries: Optional[int] = None,
+    ) -> None:
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = (
+            SQLiteCache(disk_path, ttl=ttl, max_entries=disk_max_entries) if disk_path else None
+        )
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key: Hashable) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not MISSING:
+                self._count("disk_hits")
+                self.memory.set(key, value)
+                return value
+        self._count("misses")
+        return MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=ttl)
+
+    def delete(self, key: Hashable) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache counters.
+
+        Returns:
+            Dict: memory / disk hits, misses, hit rate and number of entries in memory
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
@@ -0,0 +1,230 @@
+"""
+Memoization of tool results.
+
+Deterministic tools (FEN extraction, board views, text and JSON handling, ...)
+are often called again with the same inputs during a GAIA sweep.
+memoize_tools wraps them so identical calls are answered from a two-tier
+(memory + sqlite) cache. The cache key is the tool name, the canonicalized
+arguments and the content hash of every argument that points to a file, so an
+edited or replaced attachment is never answered from the cache. The cache is
+built on first use.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.tools.base import BaseTool
+
+from utils.cache import MISSING, TieredCache
+from utils.loader import PROJECT_ROOT
+
+
+TOOL_CACHE_DB = os.getenv(
+    "TOOL_CACHE_DB", os.path.join(PROJECT_ROOT, "data", "cache", "tool_results.sqlite")
+)
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "512"))
+TOOL_CACHE_DISK_ENTRIES = int(os.getenv("TOOL_CACHE_DISK_ENTRIES", "10000"))
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Per-tool TTLs (seconds), tools not listed use TOOL_CACHE_TTL
+TOOL_CACHE_TTLS: Dict[str, float] = {}
+
+# Tools never memoized: side effects, stateful or already cached internally
+MEMOIZE_EXCLUDE = {
+    "code_executor",  # Side effects (files, network), may be non deterministic
+    "pull_youtube_video",  # Its result is a file written on disk
+    "web_search",  # Cached in tools.search
+    "fetch_online_pdf",  # Cached in tools.search, revalidated with ETags
+    "transcriber",  # Cached in tools.transcriber by audio content hash and model size
+    "analyze_chess_position",  # Cached in tools.chess_tool by image content hash
+    "predict_next_best_move",  # Analyses cached in tools.chess_engine by FEN
+    "detect_objects",  # Deletes its input by default, the key would fall back to the bare path
+    "read_df",  # Mutable DataFrames: the memory tier would share one object between calls
+    "query_df",
+    "read_tool_payload",
+    "sum_",
+    "subtract",
+    "multiply",
+    "divide",
+}
+
+HASH_CHUNK_SIZE = 1024**2
+
+_tool_cache: Optional[TieredCache] = None
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+_counters: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def get_tool_cache() -> TieredCache:
+    # Built on first use, importing the module doesn't create the sqlite file
+    global _tool_cache
+    with _lock:
+        if _tool_cache is None:
+            _tool_cache = TieredCache(
+                max_size=TOOL_CACHE_SIZE,
+                ttl=TOOL_CACHE_TTL,
+                disk_path=TOOL_CACHE_DB,
+                disk_max_entries=TOOL_CACHE_DISK_ENTRIES,
+            )
+    return _tool_cache
+
+
+def file_digest(path: str) -> str:
+    """
+    sha256 of a file content, memoized by (path, mtime, size) so large
+    videos / audios are only read once.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    with _lock:
+        if len(_file_hashes) > 4096:
+            _file_hashes.clear()
+        _file_hashes[key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def _referenced_files(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value] if len(value) < 4096 and os.path.isfile(value) else []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return [path for item in value for path in _referenced_files(item)]
+    return []
+
+
+def make_key(tool_name: str, args: tuple, kwargs: dict) -> Tuple[str, str, Tuple[str, ...]]:
+    """
+    Cache key of a tool call.
+
+    Returns:
+        tuple: (tool name, canonical JSON of the arguments, content hashes of the referenced files)
+    """
+    arguments = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True, default=str)
+    files = _referenced_files(list(args) + list(kwargs.values()))
+    return tool_name, arguments, tuple(file_digest(path) for path in files)
+
+
+def _count(tool_name: str, counter: str) -> None:
+    with _lock:
+        counters = _counters.setdefault(tool_name, {"hits": 0, "misses": 0})
+        counters[counter] += 1
+
+
+def _store(key: tuple, result: Any, ttl: Optional[float]) -> None:
+    try:
+        get_tool_cache().set(key, result, ttl=ttl)
+    except Exception as e:  # Unpicklable result, disk full, ...
+        print(f"Tool result of {key[0]} not cached: {e}")
+
+
+def memoize_tool(tool: BaseTool, ttl: Optional[float] = None) -> BaseTool:
+    """
+    Copy of a tool whose results are cached.
+
+    Parameters
+    ----------
+    tool : BaseTool
+        Tool built with @tool (sync func and / or async coroutine)
+    ttl : float, optional
+        Time to live of the results in seconds, TOOL_CACHE_TTL if omitted
+
+    Returns:
+        BaseTool: Memoized copy, the original tool is left unchanged
+
+    Example:
+        >>> fen_tool = memoize_tool(chess_tool.extract_fen_position)
+        >>> fen_tool.invoke({"image_path": "board.png"})  # Runs the CNN
+        >>> fen_tool.invoke({"image_path": "board.png"})  # Cache hit
+    """
+    name = tool.name
+    update = {}
+
+    if getattr(tool, "func", None) is not None:
+        func = tool.func
+
+        @functools.wraps(func)
+        def memoized_func(*args, **kwargs):
+            key = make_key(name, args, kwargs)
+            result = get_tool_cache().get(key)
+            if result is not MISSING:
+                _count(name, "hits")
+                return result
+            _count(name, "misses")
+            result = func(*args, **kwargs)
+            _store(key, result, ttl)
+            return result
+
+        update["func"] = memoized_func
+
+    if getattr(tool, "coroutine", None) is not None:
+        coroutine = tool.coroutine
+
+        @functools.wraps(coroutine)
+        async def memoized_coroutine(*args, **kwargs):
+            # Hashing files and the sqlite tier are blocking
+            key = await asyncio.to_thread(make_key, name, args, kwargs)
+            result = await asyncio.to_thread(get_tool_cache().get, key)
+            if result is not MISSING:
+                _count(name, "hits")
+                return result
+            _count(name, "misses")
+            result = await coroutine(*args, **kwargs)
+            await asyncio.to_thread(_store, key, result, ttl)
+            return result
+
+        update["coroutine"] = memoized_coroutine
+
+    if not update:
+        return tool
+    return tool.model_copy(update=update)
+
+
+def memoize_tools(
+    tools: Iterable[BaseTool],
+    ttls: Dict[str, float] = TOOL_CACHE_TTLS,
+    exclude: Iterable[str] = MEMOIZE_EXCLUDE,
+) -> List[BaseTool]:
+    """
+    Memoize every tool except the excluded ones.
+
+    Parameters
+    ----------
+    tools : Iterable[BaseTool]
+        Tools to wrap
+    ttls : Dict[str, float]
+        Per-tool TTLs in seconds
+    exclude : Iterable[str]
+        Names of the tools to leave as they are (side effects, stateful tools)
+
+    Returns:
+        List[BaseTool]: Tools, in the same order
+    """
+    exclude = set(exclude)
+    return [
+        tool if tool.name in exclude else memoize_tool(tool, ttl=ttls.get(tool.name))
+        for tool in tools
+    ]
+
+
+def tool_cache_stats() -> Dict[str, Any]:
+    """
+    Returns:
+        Dict: Hits / misses per tool, and the counters of the cache tiers
+    """
+    with _lock:
+        per_tool = {name: dict(counters) for name, counters in _counters.items()}
+    return {"tools": per_tool, "cache": _tool_cache.stats() if _tool_cache is not None else {}}
@@ -1,12 +1,32 @@
 # Useful fucntions to validate performance of agents regarding GAIA dataset
 import pandas as pd
-from typing import Literal
+from typing import Dict, Literal
+import argparse
+import asyncio
+import csv
 import os
+import re
 import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
 
 os.sys.path.append("../agents")
 import react
 import gaia_scorer
+from utils.decorators import tool_cache_stats
+from core.instrumentation import start_metrics_server, summarize_trace
+
+RESULT_COLUMNS = ["Question", "file_path", "Agent response", "Final answer", "is_correct"]
+ITERATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../data/agent_experiments/iterations"
+)
+
+# Eval runner defaults
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "30000"))
+TOKENS_PER_QUESTION = int(os.getenv("EVAL_TOKENS_PER_QUESTION", "8000"))  # Estimate, all agent turns included
+
 
 def evaluate_response(row: pd.Series) -> Literal[0, 1]:
     """
@@ -33,14 +53,22 @@ def evaluate_response(row: pd.Series) -> Literal[0, 1]:
     score = int(score) 
     return score
 
+
+def build_user_query(row: pd.Series) -> str:
+    raw_user_query = row["Question"]
+    attached_files = row["file_path"]
+    return f"User request:{raw_user_query}\nAttached files: {attached_files if attached_files is not None else 'None'}"
+
+
 def get_agent_response(row: pd.Series) -> str:
     """
     Map dataset questions to Responses using .apply pandas method.
+    Questions run one by one, prefer run_evaluation to evaluate a whole dataset.
 
     Parameters
     ----------
     row : pd.Series
-        Series containing fields 'Question' and 'file_path' 
+        Series containing fields 'Question' and 'file_path'
     agent
         Agent module with integrate function .run_app()
 
@@ -52,11 +80,223 @@ def get_agent_response(row: pd.Series) -> str:
 
     """
     time.sleep(5)  # Wait to avoid gpt-4o tokens-per-minute limit
-    raw_user_query = row["Question"]
-    attached_files = row["file_path"]
-    user_query = f"User request:{raw_user_query}\nAttached files: {attached_files if attached_files is not None else 'None'}"
-    print(f"attached_files: {attached_files}")
+    user_query = build_user_query(row)
+    print(f"attached_files: {row['file_path']}")
 
-    agent_response = react.run_app(user_query=user_query)
+    agent_response = asyncio.run(react.run_app(user_query=user_query))
     agent_response = str(agent_response)
     return agent_response
+
+
+def parse_reset_duration(value: str) -> float:
+    """
+    Parse OpenAI rate limit reset durations, e.g. "1m30.5s", "6s", "20ms".
+
+    Returns:
+        float: Duration in seconds
+    """
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(
+        float(amount) * units[unit]
+        for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value or "")
+    )
+
+
+class TokenBucket:
+    """
+    Token bucket limiter for the OpenAI tokens-per-minute quota.
+
+    The bucket refills continuously at tokens_per_minute / 60 tokens per second.
+    When OpenAI rate limit headers are available, the bucket follows the
+    remaining tokens reported by the server.
+
+    Parameters
+    ----------
+    tokens_per_minute : int
+        Tokens-per-minute limit of the account / model
+
+    Example:
+        >>> bucket = TokenBucket(tokens_per_minute=30000)
+        >>> await bucket.acquire(8000)  # Waits until 8000 tokens are available
+    """
+
+    def __init__(self, tokens_per_minute: int = OPENAI_TOKENS_PER_MINUTE) -> None:
+        self.capacity = float(tokens_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.capacity)
+        async with self._lock:  # First come, first served
+            while True:
+                self._refill()
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                if wait <= 0:
+                    wait = (tokens - self.tokens) * 60 / self.capacity
+                await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Dict[str, str]) -> None:
+        limit = headers.get("x-ratelimit-limit-tokens")
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if limit:
+            self.capacity = float(limit)
+        if remaining is None:
+            return
+        self._refill()
+        self.tokens = min(self.tokens, float(remaining))
+        if float(remaining) <= 0:
+            reset = parse_reset_duration(headers.get("x-ratelimit-reset-tokens", ""))
+            self._blocked_until = time.monotonic() + reset
+
+
+class RateLimitCallback(BaseCallbackHandler):
+    """
+    Feed the OpenAI rate limit headers of every LLM response into a TokenBucket.
+    Requires ChatOpenAI(include_response_headers=True).
+    """
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                headers = (generation.generation_info or {}).get("headers")
+                if headers:
+                    self.bucket.update_from_headers(
+                        {name.lower(): value for name, value in headers.items()}
+                    )
+
+
+def _append_result(output_csv: str, result: dict) -> None:
+    write_header = not os.path.isfile(output_csv) or os.path.getsize(output_csv) == 0
+    with open(output_csv, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        writer.writerow(result)
+        f.flush()
+
+
+async def run_evaluation(
+    questions_df: pd.DataFrame,
+    output_csv: str,
+    concurrency: int = EVAL_CONCURRENCY,
+    tokens_per_minute: int = OPENAI_TOKENS_PER_MINUTE,
+    tokens_per_question: int = TOKENS_PER_QUESTION,
+) -> pd.DataFrame:
+    """
+    Evaluate the agent on a set of GAIA questions, several questions at a time.
+
+    Each question runs in its own conversation thread. Requests are paced by a
+    token bucket fed by the OpenAI rate limit headers. Every answer is appended
+    to output_csv as soon as it is scored (data/agent_experiments/iterations/
+    format), and questions already in output_csv are skipped, so an interrupted
+    sweep resumes where it stopped. Questions that fail are not written and run
+    again on the next call.
+
+    Parameters
+    ----------
+    questions_df : pd.DataFrame
+        Questions with columns 'Question', 'file_path' and 'Final answer'
+    output_csv : str
+        Results file, created if needed
+    concurrency : int
+        Max number of questions answered at the same time
+    tokens_per_minute : int
+        OpenAI tokens-per-minute limit
+    tokens_per_question : int
+        Tokens reserved in the bucket before starting a question
+
+    Returns:
+        pd.DataFrame: Every result in output_csv, empty if no question was ever answered
+
+    Example:
+        >>> results_df = asyncio.run(gaia_eval.run_evaluation(
+        ...     questions_df, output_csv="../../data/agent_experiments/iterations/9_parallel_eval.csv"
+        ... ))
+        >>> results_df["is_correct"].mean()
+        0.25
+    """
+    done = set()
+    if os.path.isfile(output_csv) and os.path.getsize(output_csv) > 0:
+        done = set(pd.read_csv(output_csv)["Question"])
+    pending = questions_df[~questions_df["Question"].isin(done)]
+    print(f"{len(done)} questions already answered, {len(pending)} to go")
+
+    bucket = TokenBucket(tokens_per_minute=tokens_per_minute)
+    rate_limit_callback = RateLimitCallback(bucket)
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+
+    async def answer(row: pd.Series) -> None:
+        async with semaphore:
+            await bucket.acquire(tokens_per_question)
+            try:
+                agent_response = await react.run_app(
+                    user_query=build_user_query(row),
+                    thread_id=str(uuid.uuid4()),
+                    callbacks=[rate_limit_callback],
+                )
+            except Exception as e:
+                print(f"Question failed, it will be retried on the next run: {e}")
+                return
+
+        result = {
+            "Question": row["Question"],
+            "file_path": row["file_path"],
+            "Agent response": str(agent_response),
+            "Final answer": row["Final answer"],
+        }
+        result["is_correct"] = evaluate_response(result)
+        async with write_lock:
+            await asyncio.to_thread(_append_result, output_csv, result)
+
+    await asyncio.gather(*(answer(row) for _, row in pending.iterrows()))
+    if not os.path.isfile(output_csv) or os.path.getsize(output_csv) == 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS)  # Every question failed, or none to answer
+    return pd.read_csv(output_csv)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the agent on GAIA questions")
+    parser.add_argument("questions_csv", help="CSV with columns Question, file_path and Final answer")
+    parser.add_argument("output_csv", help=f"Results file, e.g. {ITERATIONS_DIR}/9_my_experiment.csv")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY)
+    parser.add_argument("--tokens-per-minute", type=int, default=OPENAI_TOKENS_PER_MINUTE)
+    parser.add_argument("--metrics-port", type=int, help="Expose Prometheus metrics on this port")
+    args = parser.parse_args()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    started_at = time.time()
+
+    questions_df = pd.read_csv(args.questions_csv)
+    questions_df["file_path"] = questions_df["file_path"].where(questions_df["file_path"].notna(), None)
+
+    async def main() -> pd.DataFrame:
+        try:
+            return await run_evaluation(
+                questions_df,
+                output_csv=args.output_csv,
+                concurrency=args.concurrency,
+                tokens_per_minute=args.tokens_per_minute,
+            )
+        finally:
+            if react.clean_browser:
+                await react.clean_browser()
+
+    results_df = asyncio.run(main())
+    print(f"Accuracy: {results_df['is_correct'].mean():.2f} ({len(results_df)} questions)")
+    print(f"Tool cache: {tool_cache_stats()['tools']}")
+    if react.instrumentation.trace_path:
+        print(summarize_trace(react.instrumentation.trace_path, since=started_at).to_string())
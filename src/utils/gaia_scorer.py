@@ -6,6 +6,13 @@ import string
 import warnings
 
 import numpy as np
+import pandas as pd
+
+# Compiled once, question_scorer / score_batch run them for every answer
+SPLIT_PATTERN = re.compile(r"[,;]")
+WHITESPACE_PATTERN = re.compile(r"\s")
+NUMBER_NOISE_PATTERN = re.compile(r"[$%,]")
+PUNCT_TRANSLATOR = str.maketrans("", "", string.punctuation)
 
 
 def normalize_number_str(number_str: str) -> float:
@@ -24,6 +31,8 @@ def split_string(
     s: str,
     char_list: list[str] = [",", ";"],
 ) -> list[str]:
+    if char_list == [",", ";"]:
+        return SPLIT_PATTERN.split(s)
     pattern = f"[{''.join(char_list)}]"
     return re.split(pattern, s)
 
@@ -90,18 +99,26 @@ def check_prediction_contains_answer_letters_in_order(prediction, true_answer):
     return True
 
 
+def is_close_call(prediction, true_answer) -> bool:
+    # Same rule as check_close_call for a wrong answer, without printing
+    if is_float(true_answer):
+        return False
+    prediction, true_answer = str(prediction), str(true_answer)
+    return (
+        check_prediction_contains_answer_letters_in_order(prediction, true_answer)
+        and len(true_answer) * 0.5 <= len(prediction) <= len(true_answer) * 2
+    )
+
+
 def check_close_call(prediction, true_answer, is_correct):
     if is_correct:
         return True
     else:
-        if is_float(true_answer):
-            return is_correct
+        if is_close_call(prediction, true_answer):
+            print(f"Close call: {prediction} vs {true_answer}")
+            return True
         else:
-            if check_prediction_contains_answer_letters_in_order(str(prediction), str(true_answer)) and len(str(true_answer)) * 0.5 <= len(str(prediction)) <= len(str(true_answer))*2:
-                print(f"Close call: {prediction} vs {true_answer}")
-                return True
-            else:
-                return False
+            return False
 
 
 def normalize_str(input_str, remove_punct=True) -> str:
@@ -117,11 +134,151 @@ def normalize_str(input_str, remove_punct=True) -> str:
     - str, the normalized string
     """
     # Remove all white spaces. Required e.g for seagull vs. sea gull
-    no_spaces = re.sub(r"\s", "", input_str)
+    no_spaces = WHITESPACE_PATTERN.sub("", input_str)
 
     # Remove punctuation, if specified.
     if remove_punct:
-        translator = str.maketrans("", "", string.punctuation)
-        return no_spaces.lower().translate(translator)
+        return no_spaces.lower().translate(PUNCT_TRANSLATOR)
     else:
-        return no_spaces.lower()
\ No newline at end of file
+        return no_spaces.lower()
+
+
+def classify_ground_truth(ground_truth: str) -> str:
+    # Same precedence as question_scorer: number, then list, then string
+    if is_float(ground_truth):
+        return "number"
+    if SPLIT_PATTERN.search(ground_truth):
+        return "list"
+    return "string"
+
+
+def _score_list(model_answer: str, ground_truth: str) -> tuple:
+    # question_scorer list branch, returning a failure reason instead of warning
+    gt_elems = split_string(ground_truth)
+    ma_elems = split_string(model_answer)
+    if len(gt_elems) != len(ma_elems):
+        return False, "list length mismatch"
+    for ma_elem, gt_elem in zip(ma_elems, gt_elems):
+        if is_float(gt_elem):
+            try:
+                correct = float(NUMBER_NOISE_PATTERN.sub("", ma_elem)) == float(gt_elem)
+            except ValueError:
+                correct = False
+        else:
+            correct = normalize_str(ma_elem, remove_punct=False) == normalize_str(
+                gt_elem, remove_punct=False
+            )
+        if not correct:
+            return False, "list element mismatch"
+    return True, None
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def _normalize_series(values: pd.Series) -> pd.Series:
+    return (
+        values.str.replace(WHITESPACE_PATTERN, "", regex=True)
+        .str.lower()
+        .str.translate(PUNCT_TRANSLATOR)
+    )
+
+
+def score_batch(answers, truths) -> pd.DataFrame:
+    """
+    Score many answers at once, with the same rules as question_scorer.
+
+    Ground truths are classified once (number / list / string). Numbers and
+    strings are normalized and compared with vectorized pandas operations, lists
+    element by element. Nothing is printed nor warned.
+
+    Parameters
+    ----------
+    answers : array-like
+        Agent answers (missing answers count as empty strings)
+    truths : array-like
+        Ground truths, same length as answers
+
+    Returns:
+        pd.DataFrame: Columns "score" (bool), "close_call" (bool, wrong answers that
+        are close to the truth), "failure_reason" (None if correct) and "truth_type".
+        Same index as answers if it is a Series
+
+    Example:
+        >>> score_batch(["4", "paris", "a, b"], ["4", "Paris", "a; c"])
+           score  close_call         failure_reason truth_type
+        0   True       False                   None     number
+        1   True       False                   None     string
+        2  False       False  list element mismatch       list
+    """
+    answers = pd.Series(answers).fillna("").astype(str)
+    truths = pd.Series(list(truths), index=answers.index).fillna("").astype(str)
+
+    truth_types = truths.map({truth: classify_ground_truth(truth) for truth in truths.unique()})
+    scores = pd.Series(False, index=answers.index)
+    reasons = pd.Series(None, index=answers.index, dtype=object)
+
+    # Numbers
+    is_number = truth_types == "number"
+    if is_number.any():
+        cleaned = answers[is_number].str.replace(NUMBER_NOISE_PATTERN, "", regex=True).str.strip()
+        numeric_answers = pd.to_numeric(cleaned, errors="coerce").astype(float)
+        # float() also reads "1_000" or non-ASCII digits, which to_numeric rejects
+        unparsed = numeric_answers.isna() & cleaned.ne("")
+        if unparsed.any():
+            numeric_answers[unparsed] = cleaned[unparsed].map(_to_float)
+        numeric_truths = truths[is_number].map(float)
+        scores.loc[is_number] = (numeric_answers == numeric_truths).astype(bool)
+        reasons[is_number & ~scores] = "number mismatch"
+        reasons[is_number & ~scores & numeric_answers.reindex(answers.index).isna()] = "answer is not a number"
+
+    # Strings
+    is_string = truth_types == "string"
+    if is_string.any():
+        scores.loc[is_string] = (
+            _normalize_series(answers[is_string]) == _normalize_series(truths[is_string])
+        ).astype(bool)
+        reasons[is_string & ~scores] = "string mismatch"
+
+    # Lists
+    is_list = truth_types == "list"
+    for index in truths.index[is_list]:
+        scores.loc[index], reasons.loc[index] = _score_list(answers[index], truths[index])
+
+    close_calls = pd.Series(False, index=answers.index)
+    for index in answers.index[~scores & ~is_number]:
+        close_calls[index] = is_close_call(answers[index], truths[index])
+
+    return pd.DataFrame(
+        {
+            "score": scores.astype(bool),
+            "close_call": close_calls,
+            "failure_reason": reasons,
+            "truth_type": truth_types,
+        }
+    )
+
+
+if __name__ == "__main__":
+    # Re-score every iteration CSV, e.g. after changing the scoring rules
+    import glob
+    import os
+    import sys
+    import time
+
+    iterations_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "../../data/agent_experiments/iterations"
+    )
+    start = time.perf_counter()
+    for path in sorted(glob.glob(os.path.join(iterations_dir, "*.csv"))):
+        results_df = pd.read_csv(path)
+        scores = score_batch(results_df["Agent response"], results_df["Final answer"])
+        print(
+            f"{os.path.basename(path)}: accuracy {scores['score'].mean():.2f}, "
+            f"close calls {scores['close_call'].sum()} / {len(scores)}"
+        )
+    print(f"Scored in {time.perf_counter() - start:.3f} s")
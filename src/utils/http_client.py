@@ -0,0 +1,66 @@
+"""
+Shared aiohttp client for the web tools.
+
+A single pooled ClientSession per event loop keeps TCP / TLS connections
+alive between requests and caches DNS lookups, instead of paying a new
+connector and handshake for every query.
+"""
+
+import asyncio
+import os
+import weakref
+
+import aiohttp
+
+
+HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", "100"))
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", "10"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# aiohttp sessions are bound to the loop that created them
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Get the pooled HTTP session of the running event loop, creating it if needed.
+
+    Returns:
+        aiohttp.ClientSession: Session with keep-alive, DNS cache and per-host connection limits
+
+    Example:
+        >>> session = get_http_session()
+        >>> async with session.get("https://html.duckduckgo.com/html/?q=uber") as response:
+        ...     html = await response.text()
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session() -> None:
+    """
+    Close the pooled session of the running event loop.
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
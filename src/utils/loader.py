@@ -0,0 +1,234 @@
+"""
+Loading helpers for heavy dependencies.
+
+- ModelRegistry: process-wide registry for heavy ML models (whisper, YOLO,
+  easyocr, ...). Models are loaded lazily on first use, shared between tool
+  calls and evicted in LRU order once the estimated memory of the loaded
+  models exceeds the configured budget.
+- import_time_report: measure what importing the agent costs, to check that
+  heavy modules stay out of the startup path.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "4096"))
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))  # Repository root
+
+# Modules that must only be imported when a tool actually needs them
+HEAVY_MODULES = ("tensorflow", "keras", "torch", "whisper", "ultralytics", "easyocr", "cv2")
+
+
+def _estimate_size_mb(model: Any) -> float:
+    """
+    Estimate the memory footprint of a model from its torch parameters.
+
+    Looks into common wrappers (ultralytics `.model`, easyocr `.detector` /
+    `.recognizer`). Returns 0 when nothing can be measured.
+    """
+    candidates = [model] + [
+        getattr(model, attr)
+        for attr in ("model", "detector", "recognizer")
+        if getattr(model, attr, None) is not None
+    ]
+    total_bytes = 0
+    seen = set()
+    for candidate in candidates:
+        parameters = getattr(candidate, "parameters", None)
+        if not callable(parameters):
+            continue
+        try:
+            for param in parameters():
+                if id(param) in seen:
+                    continue
+                seen.add(id(param))
+                total_bytes += param.numel() * param.element_size()
+        except Exception:
+            continue
+    return total_bytes / 1024**2
+
+
+class ModelRegistry:
+    """
+    Lazily load, share and LRU-evict models under a memory budget.
+
+    Parameters
+    ----------
+    memory_budget_mb : float
+        Max estimated memory of the loaded models. The last loaded model is
+        always kept, even when it alone exceeds the budget.
+
+    Example:
+        >>> registry = ModelRegistry(memory_budget_mb=2048)
+        >>> model = registry.get(("whisper", "tiny", "cpu"), loader=lambda: whisper.load_model("tiny"))
+        >>> registry.stats()["loads"]
+        1
+    """
+
+    def __init__(self, memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB) -> None:
+        self.memory_budget_mb = memory_budget_mb
+        self._models: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        # One lock per key so two threads never load the same model twice
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._counters = {"loads": 0, "hits": 0, "evictions": 0, "load_seconds": 0.0}
+
+    def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        size_mb: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the model stored under key, loading it with loader on a miss.
+
+        Parameters
+        ----------
+        key : Hashable
+            Model identifier, e.g. ("whisper", "tiny", "cpu")
+        loader : Callable[[], Any]
+            Function that builds the model
+        size_mb : float, optional
+            Memory footprint of the model. Estimated from its parameters if omitted
+
+        Returns:
+            Any: The loaded model
+        """
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._counters["hits"] += 1
+                return self._models[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return self._models[key][0]
+
+            start = time.perf_counter()
+            model = loader()
+            elapsed = time.perf_counter() - start
+            size = _estimate_size_mb(model) if size_mb is None else size_mb
+
+            with self._lock:
+                self._models[key] = (model, size)
+                self._counters["loads"] += 1
+                self._counters["load_seconds"] += elapsed
+                self._evict()
+            return model
+
+    def _evict(self) -> None:
+        while len(self._models) > 1 and self.memory_mb() > self.memory_budget_mb:
+            self._models.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def memory_mb(self) -> float:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def evict(self, key: Hashable) -> bool:
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return False
+            self._counters["evictions"] += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Registry counters.
+
+        Returns:
+            Dict: loads, hits, evictions, total load time, loaded keys and estimated memory
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "loaded": list(self._models.keys()),
+                "memory_mb": round(self.memory_mb(), 1),
+            }
+
+
+model_registry = ModelRegistry()
+
+
+def import_time_report(module: str = "agents.react", top: int = 15) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter with `-X importtime` and summarize the cost.
+
+    Parameters
+    ----------
+    module : str
+        Module to import, resolved with src/ and src/tools/ on the path
+    top : int
+        Number of most expensive top-level imports to report
+
+    Returns:
+        Dict: "total_seconds", "top_imports" (list of (module, cumulative seconds)),
+        "heavy_modules_loaded" (heavy modules imported at startup) and "error"
+
+    Example:
+        >>> report = import_time_report("agents.react")
+        >>> report["heavy_modules_loaded"]
+        []
+    """
+    check_heavy = (
+        f"import {module}, sys; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    python_path = [os.path.join(PROJECT_ROOT, "src"), os.path.join(PROJECT_ROOT, "src", "tools")]
+    if os.getenv("PYTHONPATH"):
+        python_path.append(os.getenv("PYTHONPATH"))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(python_path)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check_heavy],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    top_level: List[Tuple[str, float]] = []
+    other_lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            other_lines.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        if name.startswith(" ") and not name.startswith("  "):  # top-level import
+            top_level.append((name.strip(), int(fields[1]) / 1e6))
+
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "total_seconds": round(sum(seconds for _, seconds in top_level), 3),
+        "top_imports": [(name, round(seconds, 3)) for name, seconds in top_level[:top]],
+        "heavy_modules_loaded": [m for m in result.stdout.strip().split(",") if m],
+        "error": "\n".join(other_lines[-5:]) if result.returncode != 0 else None,
+    }
+
+
+if __name__ == "__main__":
+    report = import_time_report(sys.argv[1] if len(sys.argv) > 1 else "agents.react")
+    print(f"Total import time: {report['total_seconds']} s")
+    print(f"Heavy modules loaded at import: {report['heavy_modules_loaded'] or 'none'}")
+    for name, seconds in report["top_imports"]:
+        print(f"{seconds:8.3f} s  {name}")
+    if report["error"]:
+        print(f"Import failed:\n{report['error']}")
@@ -0,0 +1,117 @@
+"""
+Parallel PDF text extraction.
+
+Pages are split in contiguous chunks and extracted with pdfplumber on a
+process pool. This module is kept light on imports because it is the one
+loaded by the pool workers.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pdfplumber
+
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+MIN_PAGES_PER_WORKER = 4  # Below this, starting more tasks costs more than it saves
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs threads (tool executor) is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def parse_page_range(pages: Optional[str], n_pages: int) -> List[int]:
+    """
+    Parse a 1-based page selection such as "1-3,7" into sorted page numbers.
+
+    Parameters
+    ----------
+    pages : str, optional
+        Comma separated pages or ranges. None selects every page
+    n_pages : int
+        Number of pages of the document, out of range pages are ignored
+
+    Returns:
+        List[int]: Selected page numbers (1-based)
+
+    Example:
+        >>> parse_page_range("1-3, 7, 40-", n_pages=42)
+        [1, 2, 3, 7, 40, 41, 42]
+    """
+    if not pages:
+        return list(range(1, n_pages + 1))
+
+    selected = set()
+    for part in pages.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            start = int(start) if start.strip() else 1
+            end = int(end) if end.strip() else n_pages
+            selected.update(range(start, end + 1))
+        else:
+            selected.add(int(part))
+    return sorted(page for page in selected if 1 <= page <= n_pages)
+
+
+def _extract_pages(pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    # Runs in a pool worker
+    texts = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in page_numbers:
+            page = pdf.pages[page_number - 1]
+            texts[page_number] = page.extract_text() or ""
+            page.flush_cache()  # Keep worker memory flat on long documents
+    return texts
+
+
+async def extract_pdf_pages(pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    """
+    Extract the text of the given pages, in parallel across the process pool.
+
+    Parameters
+    ----------
+    pdf_path : str
+        Path to a local PDF file
+    page_numbers : List[int]
+        Pages to extract (1-based)
+
+    Returns:
+        Dict[int, str]: Text of each page, indexed by page number
+    """
+    if not page_numbers:
+        return {}
+    n_chunks = max(1, min(PDF_WORKERS, len(page_numbers) // MIN_PAGES_PER_WORKER))
+    chunk_size = -(-len(page_numbers) // n_chunks)  # ceil division
+    chunks = [
+        page_numbers[start:start + chunk_size]
+        for start in range(0, len(page_numbers), chunk_size)
+    ]
+
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, _extract_pages, pdf_path, chunk) for chunk in chunks)
+    )
+    texts = {}
+    for chunk_texts in results:
+        texts.update(chunk_texts)
+    return texts
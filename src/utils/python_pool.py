@@ -0,0 +1,230 @@
+"""
+Pool of warm Python interpreters for the code executor tool.
+
+Workers (utils/python_worker.py) are started ahead of time with numpy / pandas
+already imported, receive snippets over a pipe and are recycled after
+CODE_WORKER_MAX_RUNS runs, on crash or on timeout. Secrets (API keys, tokens)
+are removed from the workers environment.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import weakref
+from typing import Dict, List, Optional
+
+
+CODE_WORKERS = int(os.getenv("CODE_WORKERS", "2"))
+CODE_WORKER_MAX_RUNS = int(os.getenv("CODE_WORKER_MAX_RUNS", "50"))
+CODE_WORKER_PRELOAD = os.getenv("CODE_WORKER_PRELOAD", "numpy,pandas")
+CODE_WORKER_MEMORY_MB = int(os.getenv("CODE_WORKER_MEMORY_MB", "2048"))
+CODE_TIMEOUT = float(os.getenv("CODE_TIMEOUT", "10"))
+CODE_CPU_SECONDS = float(os.getenv("CODE_CPU_SECONDS", "10"))
+WORKER_STARTUP_TIMEOUT = 60
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+SECRET_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD")
+
+
+def _worker_env() -> Dict[str, str]:
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if not any(marker in name.upper() for marker in SECRET_MARKERS)
+    }
+    env.update(
+        CODE_WORKER_PRELOAD=CODE_WORKER_PRELOAD,
+        CODE_WORKER_MEMORY_MB=str(CODE_WORKER_MEMORY_MB),
+        # BLAS thread pools reserve a lot of address space, which RLIMIT_AS counts
+        OPENBLAS_NUM_THREADS="1",
+        OMP_NUM_THREADS="1",
+        MKL_NUM_THREADS="1",
+    )
+    return env
+
+
+class PythonWorker:
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self.runs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+
+class PythonWorkerPool:
+    """
+    Run Python snippets on a pool of pre-started, pre-imported interpreters.
+
+    Parameters
+    ----------
+    size : int
+        Number of worker processes
+    max_runs : int
+        Runs before a worker is replaced by a fresh one
+    timeout : float
+        Default wall-clock limit per snippet, in seconds
+    cpu_seconds : float
+        Default CPU time limit per snippet, in seconds
+
+    Example:
+        >>> pool = PythonWorkerPool(size=2)
+        >>> await pool.run("import pandas as pd; print(pd.Series([1, 2]).sum())")
+        {'ok': True, 'stdout': '3\\n', 'stderr': ''}
+    """
+
+    def __init__(
+        self,
+        size: int = CODE_WORKERS,
+        max_runs: int = CODE_WORKER_MAX_RUNS,
+        timeout: float = CODE_TIMEOUT,
+        cpu_seconds: float = CODE_CPU_SECONDS,
+    ) -> None:
+        self.size = size
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._workers: List[PythonWorker] = []
+        self._retired: List[PythonWorker] = []  # Killed, not reaped yet
+        self._refills: set = set()  # Background start() tasks
+        self._spawning = 0
+
+    async def _spawn(self) -> PythonWorker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-u",
+            WORKER_PATH,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=_worker_env(),
+            limit=16 * 1024**2,  # Max size of one answer line
+        )
+        worker = PythonWorker(process)
+        try:
+            ready = await asyncio.wait_for(
+                process.stdout.readline(), timeout=WORKER_STARTUP_TIMEOUT
+            )
+            if not ready:
+                raise RuntimeError("Python worker exited during startup")
+        except BaseException:
+            worker.kill()
+            raise
+        return worker
+
+    async def _add_worker(self) -> None:
+        self._spawning += 1
+        try:
+            worker = await self._spawn()
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        finally:
+            self._spawning -= 1
+
+    async def start(self) -> None:
+        """
+        Pre-start the missing workers.
+        """
+        missing = self.size - len(self._workers) - self._spawning
+        await asyncio.gather(*(self._add_worker() for _ in range(missing)))
+
+    def _retire(self, worker: PythonWorker) -> None:
+        worker.kill()
+        self._retired = [retired for retired in self._retired if retired.alive] + [worker]
+        if worker in self._workers:
+            self._workers.remove(worker)
+        # Replace it in the background so the next call finds a warm worker
+        refill = asyncio.get_running_loop().create_task(self.start())
+        self._refills.add(refill)
+        refill.add_done_callback(self._refills.discard)
+
+    async def run(
+        self,
+        code: str,
+        timeout: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+    ) -> dict:
+        """
+        Execute a snippet on an idle worker.
+
+        Parameters
+        ----------
+        code : str
+            Python source code
+        timeout : float, optional
+            Wall-clock limit in seconds
+        cpu_seconds : float, optional
+            CPU time limit in seconds
+
+        Returns:
+            dict: {"ok": bool, "stdout": str, "stderr": str}
+        """
+        timeout = self.timeout if timeout is None else timeout
+        cpu_seconds = self.cpu_seconds if cpu_seconds is None else cpu_seconds
+        if self._idle.empty():
+            await self.start()
+        worker = await self._idle.get()
+
+        request = json.dumps({"code": code, "cpu_seconds": cpu_seconds}) + "\n"
+        try:
+            worker.process.stdin.write(request.encode())
+            await worker.process.stdin.drain()
+            answer = await asyncio.wait_for(worker.process.stdout.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._retire(worker)
+            return {"ok": False, "stdout": "", "stderr": f"Timeout: execution exceeded {timeout} s"}
+        except BaseException:
+            self._retire(worker)
+            raise
+
+        if not answer:
+            await worker.process.wait()
+            self._retire(worker)
+            if worker.process.returncode == -signal.SIGXCPU:
+                reason = f"CPU time limit exceeded ({cpu_seconds} s)"
+            else:
+                reason = f"worker crashed (exit code {worker.process.returncode}), possibly out of memory"
+            return {"ok": False, "stdout": "", "stderr": reason}
+
+        worker.runs += 1
+        if worker.runs >= self.max_runs:
+            self._retire(worker)
+        else:
+            self._idle.put_nowait(worker)
+        return json.loads(answer)
+
+    async def close(self) -> None:
+        # Let pending replacements finish, their workers are closed below
+        await asyncio.gather(*self._refills, return_exceptions=True)
+        workers, self._workers = self._workers + self._retired, []
+        self._retired = []
+        for worker in workers:
+            worker.kill()
+            await worker.process.wait()
+
+
+# Subprocess pipes are bound to the loop that created them
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PythonWorkerPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_python_pool() -> PythonWorkerPool:
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = PythonWorkerPool()
+    return _pools[loop]
+
+
+async def close_python_pool() -> None:
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
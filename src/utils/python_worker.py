@@ -0,0 +1,86 @@
+"""
+Worker process of the code executor pool (see utils.python_pool).
+
+Pre-imports common libraries once, then reads JSON requests ({"code", "cpu_seconds"})
+line by line on stdin and answers each with {"ok", "stdout", "stderr"} on stdout.
+Every snippet runs with fresh globals; a CPU time limit is applied per request
+and an address space limit for the whole process.
+"""
+
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import traceback
+
+
+PRELOAD_MODULES = [m for m in os.getenv("CODE_WORKER_PRELOAD", "").split(",") if m]
+MEMORY_LIMIT_MB = int(os.getenv("CODE_WORKER_MEMORY_MB", "0"))
+MAX_OUTPUT_CHARS = int(os.getenv("CODE_WORKER_MAX_OUTPUT_CHARS", "100000"))
+
+
+def set_cpu_limit(cpu_seconds: float) -> None:
+    # RLIMIT_CPU counts the whole process life, so extend it from the time used so far
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    soft = int(used + cpu_seconds) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_code(code: str) -> dict:
+    stdout, stderr = io.StringIO(), io.StringIO()
+    ok = True
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(code, "<agent-code>", "exec"), {"__name__": "__main__"})
+        except SystemExit as e:
+            ok = e.code in (None, 0)
+        except BaseException as e:
+            ok = False
+            # Skip the worker frame, only the agent code is relevant
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    return {
+        "ok": ok,
+        "stdout": stdout.getvalue()[:MAX_OUTPUT_CHARS],
+        "stderr": stderr.getvalue()[:MAX_OUTPUT_CHARS],
+    }
+
+
+def main() -> None:
+    # Answers go through a private copy of stdout, writes to fd 1 by the agent
+    # code (os.system, C extensions, ...) can't corrupt the protocol
+    protocol = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    # Same for input(): requests are read from the original stdin only
+    requests = sys.stdin
+    sys.stdin = io.StringIO()
+
+    for module in PRELOAD_MODULES:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    if MEMORY_LIMIT_MB:
+        limit = MEMORY_LIMIT_MB * 1024**2
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    protocol.flush()
+
+    for line in requests:
+        request = json.loads(line)
+        set_cpu_limit(request.get("cpu_seconds", 10))
+        response = run_code(request["code"])
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
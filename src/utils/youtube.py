@@ -0,0 +1,172 @@
+"""
+Async YouTube ingest.
+
+Streams are resolved once per video, downloaded in ranged requests (as
+pytubefix does, YouTube throttles plain downloads) and piped straight into an
+ffmpeg subprocess, so no raw file is ever written. Outputs are produced in a
+private temporary directory, then moved to output_dir/<video_id>/, which is
+also the cache: a video already ingested is not downloaded again.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import aiohttp
+
+from utils.http_client import get_http_session
+
+
+YOUTUBE_RANGE_SIZE = 9 * 1024**2  # Same range size as pytubefix
+YOUTUBE_READ_TIMEOUT = float(os.getenv("YOUTUBE_READ_TIMEOUT", "60"))
+VIDEO_FILENAME = "processed_yt_video.mp4"
+AUDIO_FILENAME = "yt_audio.mp3"
+
+# ffmpeg output options
+VIDEO_FPS = 1  # Fewer frames for the object detector
+VIDEO_FFMPEG_ARGS = ["-filter:v", f"fps={VIDEO_FPS}", "-an"]
+AUDIO_FFMPEG_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-b:a", "32k"]  # Whisper input format
+
+
+def resolve_streams(url: str, get_audio: bool, get_video: bool) -> Dict:
+    """
+    Resolve the stream URLs of a YouTube video (blocking, one YouTube object for both).
+
+    Returns:
+        Dict: {"audio": (url, filesize) or None, "video": (url, filesize) or None}
+
+    Raises:
+        RuntimeError: If the video has no stream of a requested kind
+    """
+    from pytubefix import YouTube
+
+    yt = YouTube(url)
+    streams = {"audio": None, "video": None}
+    if get_video:
+        video = (
+            yt.streams.filter(only_video=True, fps=25, res="144p").order_by("fps").asc().first()
+            or yt.streams.filter(only_video=True).order_by("resolution").asc().first()
+        )
+        if video is None:
+            raise RuntimeError(f"No video stream available for {url}")
+        streams["video"] = (video.url, video.filesize)
+    if get_audio:
+        audio = yt.streams.filter(only_audio=True).order_by("abr").asc().first()
+        if audio is None:
+            raise RuntimeError(f"No audio stream available for {url}")
+        streams["audio"] = (audio.url, audio.filesize)
+    return streams
+
+
+def is_ingest_output(path: str) -> bool:
+    """
+    Whether a file was produced by ingest_youtube. Those files are the ingest
+    cache, consumers must not delete them.
+    """
+    return os.path.basename(path) in (VIDEO_FILENAME, AUDIO_FILENAME)
+
+
+async def download_to_ffmpeg(stream_url: str, filesize: int, ffmpeg_args: list, output_path: str) -> None:
+    """
+    Download a stream with ranged requests and pipe it into ffmpeg.
+
+    Parameters
+    ----------
+    stream_url : str
+        Direct googlevideo URL of the stream
+    filesize : int
+        Size of the stream in bytes
+    ffmpeg_args : list
+        ffmpeg output options
+    output_path : str
+        File written by ffmpeg
+    """
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-y", "-v", "error", "-i", "pipe:0", *ffmpeg_args, output_path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    session = get_http_session()
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=YOUTUBE_READ_TIMEOUT)
+    try:
+        for start in range(0, filesize, YOUTUBE_RANGE_SIZE):
+            end = min(start + YOUTUBE_RANGE_SIZE, filesize) - 1
+            async with session.get(f"{stream_url}&range={start}-{end}", timeout=timeout) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(256 * 1024):
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # ffmpeg exited early, its error is reported below
+    except BaseException:
+        process.kill()
+        await process.wait()
+        raise
+    if not process.stdin.is_closing():
+        process.stdin.close()  # EOF, communicate() only closes stdin when given an input
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {os.path.basename(output_path)}: {stderr.decode()[-500:]}")
+
+
+async def ingest_youtube(
+    url: str, output_dir: str, get_audio: bool = False, get_video: bool = False
+) -> Dict[str, Optional[str]]:
+    """
+    Download and process the audio and / or video of a YouTube video, concurrently.
+
+    Parameters
+    ----------
+    url : str
+        YouTube video URL
+    output_dir : str
+        Outputs go to output_dir/<video_id>/
+    get_audio : bool
+        Produce a 16 kHz mono mp3
+    get_video : bool
+        Produce a 1 fps mp4 without audio
+
+    Returns:
+        Dict[str, Optional[str]]: Paths of the "audio" and "video" files (None if not requested)
+
+    Example:
+        >>> await ingest_youtube("https://www.youtube.com/watch?v=IMgN1MGRKgA", "data/temp", get_audio=True)
+        {'audio': 'data/temp/IMgN1MGRKgA/yt_audio.mp3', 'video': None}
+    """
+    from pytubefix.extract import video_id as extract_video_id
+
+    video_dir = os.path.join(output_dir, extract_video_id(url))
+    os.makedirs(video_dir, exist_ok=True)
+    filenames = {"audio": AUDIO_FILENAME, "video": VIDEO_FILENAME}
+    ffmpeg_args = {"audio": AUDIO_FFMPEG_ARGS, "video": VIDEO_FFMPEG_ARGS}
+    requested = [kind for kind, wanted in (("audio", get_audio), ("video", get_video)) if wanted]
+    paths = {
+        kind: os.path.join(video_dir, filenames[kind]) if kind in requested else None
+        for kind in ("audio", "video")
+    }
+    missing = [kind for kind in requested if not os.path.isfile(paths[kind])]  # Others are cached
+    if not missing:
+        return paths
+
+    streams = await asyncio.to_thread(resolve_streams, url, "audio" in missing, "video" in missing)
+    # Private directory: concurrent questions on the same video don't collide
+    temp_dir = tempfile.mkdtemp(dir=video_dir, prefix=".ingest-")
+
+    async def ingest(kind: str) -> None:
+        stream_url, filesize = streams[kind]
+        temp_path = os.path.join(temp_dir, filenames[kind])
+        await download_to_ffmpeg(stream_url, filesize, ffmpeg_args[kind], temp_path)
+        os.replace(temp_path, paths[kind])  # Atomic, readers never see a partial file
+
+    tasks = [asyncio.create_task(ingest(kind)) for kind in missing]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return paths
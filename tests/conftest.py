@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT_DIR, "src"))
+sys.path.append(os.path.join(ROOT_DIR, "src", "tools"))
+
+# Keep traces and caches of the test session out of data/
+_test_data_dir = tempfile.mkdtemp(prefix="chappie-tests-")
+os.environ.setdefault("AGENT_TRACE_PATH", "")
+os.environ.setdefault("TOOL_CACHE_DB", os.path.join(_test_data_dir, "tool_results.sqlite"))
+os.environ.setdefault("TOOL_PAYLOAD_DB", os.path.join(_test_data_dir, "tool_payloads.sqlite"))
+os.environ.setdefault("TRANSCRIPT_CACHE_DB", os.path.join(_test_data_dir, "transcripts.sqlite"))
+os.environ.setdefault("CHECKPOINT_DB", os.path.join(_test_data_dir, "checkpoints.sqlite"))
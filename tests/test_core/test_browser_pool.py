@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from core.browser_pool import BrowserPool
+
+
+class FakeBrowser:
+    def is_connected(self):
+        return True
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.closed = False
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserPool(BrowserPool):
+    async def _ensure_browser(self):
+        if self._browser is None:
+            self._browser = FakeBrowser()
+            self._generation += 1
+
+    async def _new_context(self):
+        self._counters["created"] += 1
+        return {"context": FakeContext(self._browser), "uses": 0, "generation": self._generation}
+
+
+def test_contexts_are_leased_per_run_and_recycled():
+    async def scenario():
+        pool = FakeBrowserPool(size=2, max_uses=2)
+        first = await pool.lease("a")
+        assert (await pool.lease("a")).context is first.context  # Same run, same context
+        assert (await pool.lease("b")).context is not first.context
+        assert pool.stats()["in_use"] == 2
+
+        await pool.release_run("a")
+        await pool.release_run("a")  # No-op
+        assert (await pool.lease("c")).context is first.context  # Recycled
+        await pool.release_run("c")
+        assert first.context.closed  # Served max_uses runs
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["in_use"] == 1 and stats["leases"] == 3 and stats["recycled"] == 1
+
+
+def test_waiting_for_a_context_times_out():
+    async def scenario():
+        pool = FakeBrowserPool(size=1, acquire_timeout=0.05)
+        await pool.lease("a")
+        with pytest.raises(TimeoutError, match="1 / 1 leased"):
+            await pool.lease("b")  # The lease of "a" is never released
+        assert pool.stats()["timeouts"] == 1
+        assert pool.stats()["waiting"] == 0
+
+        # The slot is still usable once released
+        waiter = asyncio.create_task(pool.lease("c"))
+        await asyncio.sleep(0.01)
+        await pool.release_run("a")
+        await waiter
+        assert pool.stats()["in_use"] == 1
+        await pool.close()
+
+    asyncio.run(scenario())
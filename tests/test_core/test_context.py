@@ -0,0 +1,75 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from core.context import CHARS_PER_TOKEN, ContextCompactor, TokenCounter, read_payload
+
+
+@pytest.fixture
+def counter():
+    counter = TokenCounter()
+    counter._encoding = False  # Character estimate, same counts with or without tiktoken
+    return counter
+
+
+def tool_turn(index, n_chars):
+    call_id = f"call_{index}"
+    return [
+        AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": str(index)}, "id": call_id}]),
+        ToolMessage(content=f"result {index} " + "x" * n_chars, tool_call_id=call_id),
+    ]
+
+
+def history(n_turns, n_chars):
+    messages = [SystemMessage(content="You are a helpful agent."), HumanMessage(content="Question?")]
+    for index in range(n_turns):
+        messages += tool_turn(index, n_chars)
+    return messages
+
+
+def test_history_is_compacted_to_the_budget(counter):
+    compactor = ContextCompactor(budget_tokens=1400, max_tool_tokens=10_000, stale_tool_tokens=50, counter=counter)
+    messages = history(n_turns=5, n_chars=400 * CHARS_PER_TOKEN)
+    assert compactor.count(messages) > 2000
+
+    compacted = compactor.compact(messages, thread_id="t")
+    assert compactor.count(compacted) <= 1400
+    assert len(compacted) == len(messages)
+    assert compacted[:2] == messages[:2]  # System prompt and user request
+    assert compacted[-2:] == messages[-2:]  # Last turn
+    assert messages[3].content.startswith("result 0")  # Input left unchanged
+
+    # Oldest outputs are shrunk first, only as many as needed
+    shrunk = [i for i, message in enumerate(compacted) if "compacted" in message.additional_kwargs]
+    assert shrunk == [3, 5, 7]
+    for i in shrunk:
+        assert read_payload(compacted[i].additional_kwargs["compacted"]["ref"]) == messages[i].content
+
+    stats = compactor.stats("t")
+    assert stats["compacted_messages"] == 3
+    assert stats["tokens_before"] == compactor.count(messages)
+    assert stats["tokens_after"] == compactor.count(compacted)
+    assert stats["tokens_saved"] == stats["tokens_before"] - stats["tokens_after"]
+
+
+def test_oversized_tool_output_is_cut(counter):
+    compactor = ContextCompactor(budget_tokens=100_000, max_tool_tokens=100, counter=counter)
+    messages = history(n_turns=1, n_chars=1000 * CHARS_PER_TOKEN)
+    compacted = compactor.compact(messages)
+    message = compacted[-1]
+    ref = message.additional_kwargs["compacted"]["ref"]
+    assert f"read_tool_payload(ref='{ref}'" in message.content
+    assert message.content.startswith("result 0")
+    assert compactor.count_message(message) < 200
+    assert read_payload(ref) == messages[-1].content
+    # Already compacted messages are not cut again, and still count at their original size
+    assert compactor.compact(compacted) == compacted
+    assert compactor.count_uncompacted(compacted) == compactor.count(messages)
+
+
+def test_history_under_budget_is_unchanged(counter):
+    compactor = ContextCompactor(budget_tokens=10_000, max_tool_tokens=1000, counter=counter)
+    messages = history(n_turns=3, n_chars=100)
+    assert compactor.compact(messages, thread_id="t") == messages
+    assert compactor.stats("t")["tokens_saved"] == 0
+    compactor.reset_stats("t")
+    assert compactor.stats("t")["tokens_before"] == 0
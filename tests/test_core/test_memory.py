@@ -0,0 +1,97 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from core.memory import SQLiteCheckpointer
+
+
+class CounterState(TypedDict):
+    steps: Annotated[list, operator.add]
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(CounterState)
+    builder.add_node("first", lambda state: {"steps": ["first"]})
+    builder.add_node("second", lambda state: {"steps": ["second" * 200]})  # Large enough to be compressed
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def thread(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_graph_state_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    memory = SQLiteCheckpointer(path, max_checkpoints_per_thread=None)
+    graph = build_graph(memory)
+    graph.invoke({"steps": ["start"]}, config=thread("a"))
+    graph.invoke({"steps": ["again"]}, config=thread("a"))
+    expected = ["start", "first", "second" * 200, "again", "first", "second" * 200]
+    assert graph.get_state(thread("a")).values["steps"] == expected
+
+    # list() is newest first and every checkpoint points to its parent
+    checkpoints = list(memory.list(thread("a")))
+    assert len(checkpoints) == 8  # Input + 3 steps, per run
+    ids = [item.config["configurable"]["checkpoint_id"] for item in checkpoints]
+    assert ids == sorted(ids, reverse=True)
+    for child, parent in zip(checkpoints, checkpoints[1:]):
+        assert child.parent_config["configurable"]["checkpoint_id"] == parent.config["configurable"]["checkpoint_id"]
+    assert memory.get_tuple(thread("a")).config == checkpoints[0].config
+    assert list(memory.list(thread("a"), limit=2)) == checkpoints[:2]
+    assert [item.metadata["step"] for item in memory.list(thread("a"), filter={"source": "input"})] == [3, -1]
+    assert list(memory.list(thread("b"))) == []
+    memory.close()
+
+    # Conversations survive a restart
+    reopened = SQLiteCheckpointer(path)
+    assert build_graph(reopened).get_state(thread("a")).values["steps"] == expected
+    reopened.close()
+
+
+def test_history_is_pruned_per_thread(tmp_path):
+    memory = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), max_checkpoints_per_thread=3)
+    graph = build_graph(memory)
+    for _ in range(3):
+        graph.invoke({"steps": []}, config=thread("a"))
+    graph.invoke({"steps": []}, config=thread("b"))
+    assert len(list(memory.list(thread("a")))) == 3
+    assert memory.stats()["threads"] == 2
+    assert len(graph.get_state(thread("a")).values["steps"]) == 6
+
+    memory.delete_thread("a")
+    assert memory.get_tuple(thread("a")) is None
+    assert memory.stats()["threads"] == 1
+    memory.close()
+
+
+def test_async_api(tmp_path):
+    memory = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = build_graph(memory)
+
+    async def scenario():
+        await graph.ainvoke({"steps": ["start"]}, config=thread("a"))
+        state = await graph.aget_state(thread("a"))
+        latest = await memory.aget_tuple(thread("a"))
+        listed = [item async for item in memory.alist(thread("a"))]
+        return state, latest, listed
+
+    state, latest, listed = asyncio.run(scenario())
+    assert state.values["steps"] == ["start", "first", "second" * 200]
+    assert latest.config == listed[0].config
+    assert len(listed) == 4
+    memory.close()
+
+
+def test_expired_threads_are_garbage_collected(tmp_path):
+    memory = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), ttl=3600)
+    build_graph(memory).invoke({"steps": []}, config=thread("a"))
+    assert memory.gc() == 0
+    memory.ttl = -1  # Every thread is now older than the TTL
+    assert memory.gc() == 1
+    assert memory.get_tuple(thread("a")) is None
+    memory.close()
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.tools import tool
+
+from core.tool_executor import ToolExecutor
+
+
+@tool
+def slow_echo(text: str, delay: float = 0.0) -> str:
+    """Echo text after delay seconds (sync tool)"""
+    time.sleep(delay)
+    return text
+
+
+@tool
+async def async_echo(text: str, delay: float = 0.0) -> str:
+    """Echo text after delay seconds (async tool)"""
+    await asyncio.sleep(delay)
+    return text
+
+
+@tool
+def failing(text: str) -> str:
+    """Always fails"""
+    raise RuntimeError("boom")
+
+
+def call(name, call_id, **args):
+    return {"name": name, "args": args, "id": call_id}
+
+
+def make_executor(**kwargs):
+    tools = [slow_echo, async_echo, failing]
+    return ToolExecutor(tools_by_name={t.name: t for t in tools}, **kwargs)
+
+
+def test_results_keep_tool_call_order():
+    executor = make_executor(timeouts={}, concurrency={})
+    calls = [
+        call("slow_echo", "1", text="a", delay=0.2),
+        call("async_echo", "2", text="b", delay=0.1),
+        call("slow_echo", "3", text="c"),
+    ]
+    messages = asyncio.run(executor.run(calls))
+    assert [m.tool_call_id for m in messages] == ["1", "2", "3"]
+    assert [m.content for m in messages] == ["a", "b", "c"]
+
+
+def test_calls_run_concurrently():
+    executor = make_executor(timeouts={}, concurrency={})
+    calls = [call("slow_echo", str(i), text="x", delay=0.3) for i in range(4)]
+    start = time.perf_counter()
+    asyncio.run(executor.run(calls))
+    assert time.perf_counter() - start < 1.0
+
+
+def test_unknown_tool():
+    executor = make_executor()
+    [message] = asyncio.run(executor.run([call("missing", "1")]))
+    assert message.status == "error"
+    assert "unknown tool 'missing'" in message.content
+
+
+def test_error_becomes_tool_message():
+    executor = make_executor()
+    [message] = asyncio.run(executor.run([call("failing", "1", text="x")]))
+    assert message.status == "error"
+    assert message.tool_call_id == "1"
+    assert "boom" in message.content
+
+
+def test_timeout():
+    executor = make_executor(timeouts={"async_echo": 0.1, "slow_echo": 0.1}, concurrency={})
+    messages = asyncio.run(
+        executor.run(
+            [call("async_echo", "1", text="x", delay=2), call("slow_echo", "2", text="y", delay=0.5)]
+        )
+    )
+    assert all(m.status == "error" and "timed out" in m.content for m in messages)
+
+
+def test_timed_out_sync_tool_keeps_its_concurrency_slot():
+    executor = make_executor(timeouts={"slow_echo": 0.3}, concurrency={"slow_echo": 1})
+    running = []
+    lock = threading.Lock()
+
+    original = slow_echo.func
+
+    def tracked(text, delay=0.0):
+        with lock:
+            running.append(text)
+            assert len(running) == 1, "two calls ran at the same time"
+        try:
+            return original(text, delay)
+        finally:
+            with lock:
+                running.remove(text)
+
+    executor.tools_by_name["slow_echo"] = slow_echo.model_copy(update={"func": tracked})
+
+    async def scenario():
+        [first] = await executor.run([call("slow_echo", "1", text="a", delay=0.5)])
+        # The first thread is still running: the second call must wait for it
+        [second] = await executor.run([call("slow_echo", "2", text="b", delay=0.0)])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status == "error" and "timed out" in first.content
+    assert second.content == "b"
+
+
+def test_waiting_for_a_slot_held_by_a_hung_call_times_out():
+    executor = make_executor(timeouts={"slow_echo": 0.1}, concurrency={"slow_echo": 1})
+
+    async def scenario():
+        [hung] = await executor.run([call("slow_echo", "1", text="a", delay=1)])
+        start = time.perf_counter()
+        [waiting] = await executor.run([call("slow_echo", "2", text="b")])
+        return hung, waiting, time.perf_counter() - start
+
+    hung, waiting, waited = asyncio.run(scenario())
+    assert hung.status == "error" and waiting.status == "error"
+    assert waiting.content == "Error: tool 'slow_echo' timed out after 0.1s"
+    assert waited < 0.5
+    executor.shutdown()
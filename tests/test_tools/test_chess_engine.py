@@ -0,0 +1,56 @@
+import asyncio
+
+from tools.chess_engine import EnginePool
+
+
+class FakeEngine:
+    async def quit(self):
+        pass
+
+
+class FakeEnginePool(EnginePool):
+    def __init__(self, size):
+        super().__init__("stockfish", size=size)
+        self.started = 0
+
+    async def _start_engine(self):
+        self.started += 1
+        return FakeEngine()
+
+
+def test_waiter_gets_a_replacement_after_a_discard():
+    async def scenario():
+        pool = FakeEnginePool(size=1)
+
+        async def crash():
+            async with pool.engine():
+                await asyncio.sleep(0.05)
+                raise RuntimeError("engine crashed")
+
+        async def wait_for_engine():
+            async with pool.engine() as engine:
+                return engine
+
+        crashing = asyncio.create_task(crash())
+        await asyncio.sleep(0.01)  # The only engine is busy
+        waiter = asyncio.create_task(wait_for_engine())
+        results = await asyncio.wait_for(
+            asyncio.gather(crashing, waiter, return_exceptions=True), timeout=2
+        )
+        assert isinstance(results[0], RuntimeError)
+        assert isinstance(results[1], FakeEngine)
+        assert pool.started == 2
+        assert len(pool._engines) == 1
+
+    asyncio.run(scenario())
+
+
+def test_engines_are_reused():
+    async def scenario():
+        pool = FakeEnginePool(size=2)
+        for _ in range(3):
+            async with pool.engine():
+                pass
+        assert pool.started == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,152 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from tools import chess_tool
+from utils.cache import TTLCache
+
+
+CORNERS = ["bottom_left", "top_left", "bottom_right", "top_right"]
+
+
+class FakeReader:
+    """readtext_batched answering the texts set per corner, with confidence 0.9"""
+
+    def __init__(self):
+        self.corner_texts = {}
+        self.calls = 0
+
+    def readtext_batched(self, images, allowlist=None):
+        self.calls += 1
+        assert len(images) == 4 and allowlist == chess_tool.COORDINATE_GLYPHS
+        return [[(None, text, 0.9) for text in self.corner_texts.get(corner, [])] for corner in CORNERS]
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(chess_tool, "load_ocr_reader", lambda gpu=False: reader)
+    monkeypatch.setattr(chess_tool, "orientation_cache", TTLCache(max_size=16))
+    monkeypatch.setattr(chess_tool, "analysis_cache", TTLCache(max_size=16))
+    return reader
+
+
+def board_image(tmp_path, seed=0):
+    path = str(tmp_path / f"board_{seed}.png")
+    cv2.imwrite(path, np.random.default_rng(seed).integers(0, 255, (400, 400, 3), dtype=np.uint8))
+    return path
+
+
+def test_corner_glyphs_table_is_consistent():
+    # A square seen from Black's side is the point reflection of White's
+    opposite = {"bottom_left": "top_right", "top_left": "bottom_right", "bottom_right": "top_left", "top_right": "bottom_left"}
+    for corner, glyphs in chess_tool.CORNER_GLYPHS.items():
+        assert glyphs[True] == chess_tool.CORNER_GLYPHS[opposite[corner]][False]
+    assert {glyphs[False] for glyphs in chess_tool.CORNER_GLYPHS.values()} == {"a1", "a8", "h1", "h8"}
+
+
+@pytest.mark.parametrize(
+    "corner_texts, expected",
+    [
+        ({"bottom_left": ["a", "1"], "top_left": ["8"], "bottom_right": ["h"]}, False),  # White's view
+        ({"bottom_left": ["h", "8"], "top_left": ["1"], "top_right": ["A"]}, True),  # Black's view
+        ({"top_right": ["1"]}, True),  # Only one corner readable
+        ({"bottom_left": ["a"], "top_right": ["a"]}, None),  # Tie
+        ({}, None),  # No glyphs
+    ],
+)
+def test_detect_board_orientation(reader, corner_texts, expected):
+    reader.corner_texts = corner_texts
+    image = np.zeros((400, 400, 3), dtype=np.uint8)
+    assert chess_tool.detect_board_orientation(image) is expected
+
+
+def test_grab_board_view_is_cached_by_content(reader, tmp_path):
+    reader.corner_texts = {"bottom_left": ["h8"]}
+    path = board_image(tmp_path)
+    assert chess_tool.grab_board_view.invoke({"chess_img_path": path}) == {"black_view": True}
+    assert chess_tool.grab_board_view.invoke({"chess_img_path": path}) == {"black_view": True}
+    assert reader.calls == 1
+
+    reader.corner_texts = {}
+    assert chess_tool.grab_board_view.invoke({"chess_img_path": board_image(tmp_path, seed=1)}) == {
+        "black_view": "Unknown"
+    }
+    assert reader.calls == 2
+
+
+class FakeEnginePool:
+    def __init__(self, lines):
+        self.lines = lines
+        self.boards = []
+
+    async def analyse(self, board, limit, multipv=1):
+        self.boards.append(board.fen())
+        return self.lines[:multipv]
+
+
+@pytest.fixture
+def analysis(reader, monkeypatch):
+    """Stubs of the CNN, the orientation detector and the engine, recording their calls"""
+    state = {"placement": "4k3/8/8/8/8/8/8/4K2R", "black_view": None, "views": [], "engine": FakeEnginePool([])}
+
+    def fen_from_array(image, black_view=False):
+        state["views"].append(black_view)
+        return state["placement"]
+
+    monkeypatch.setattr(chess_tool, "fen_from_array", fen_from_array)
+    monkeypatch.setattr(chess_tool, "detect_board_orientation", lambda image, image_hash=None: state["black_view"])
+    monkeypatch.setattr(chess_tool, "get_engine_pool", lambda path: state["engine"])
+    return state
+
+
+def analyze(**kwargs):
+    return asyncio.run(chess_tool.analyze_chess_position.ainvoke(kwargs))
+
+
+@pytest.mark.parametrize(
+    "placement, error",
+    [
+        ("8/8/8/8/8/8/8/8", "Illegal position"),  # No kings
+        ("4k3/8/8/8/8/8/8/4K2Rx", "Invalid FEN prediction"),
+    ],
+)
+def test_unusable_position_is_reported_without_the_engine(analysis, tmp_path, placement, error):
+    analysis["placement"] = placement
+    result = analyze(chess_img_path=board_image(tmp_path))
+    assert result["error"].startswith(error)
+    assert "best_move" not in result
+    assert analysis["engine"].boards == []
+
+
+def test_legal_position_is_analysed_and_cached(analysis, tmp_path):
+    analysis["engine"] = FakeEnginePool(
+        [
+            {"san": "Rh8+", "mate": None, "score_cp": 450, "pv": "Rh8+ Kd7"},
+            {"san": "Kd2", "mate": None, "score_cp": 300, "pv": "Kd2"},
+        ]
+    )
+    path = board_image(tmp_path)
+    result = analyze(chess_img_path=path, multipv=2)
+    assert result["fen"] == "4k3/8/8/8/8/8/8/4K2R w - - 0 1"
+    assert result["black_view"] is False  # No readable coordinates, defaults to White
+    assert result["best_move"] == "Rh8+" and result["evaluation"] == "450 cp"
+    assert [line["move"] for line in result["lines"]] == ["Rh8+", "Kd2"]
+
+    assert analyze(chess_img_path=path, multipv=2) == result
+    assert analysis["views"] == [False] and len(analysis["engine"].boards) == 1
+
+    # Other arguments are another cache entry
+    analysis["black_view"] = True
+    result = analyze(chess_img_path=path, side_to_move="b")
+    assert result["black_view"] is True and "lines" not in result
+    assert analysis["views"] == [False, True]
+
+
+def test_no_legal_moves(analysis, tmp_path):
+    analysis["placement"] = "7k/5Q2/6K1/8/8/8/8/8"  # Stalemate, Black to move
+    result = analyze(chess_img_path=board_image(tmp_path), side_to_move="b", black_view=False)
+    assert result["best_move"] is None
+    assert result["evaluation"] == "No legal moves in this position."
@@ -0,0 +1,33 @@
+from collections import Counter
+
+from tools.handle_images import DetectionSummary
+
+
+def summarize(frames, **kwargs):
+    summary = DetectionSummary(**kwargs)
+    for frame, objects in enumerate(frames, start=1):
+        summary.update(frame, Counter(objects))
+    return summary.to_dict()
+
+
+def test_consecutive_identical_frames_form_one_segment():
+    result = summarize([["bird"], ["bird"], [], ["bird", "bird"]])
+    assert result["segments"] == [
+        {"start_frame": 1, "end_frame": 2, "objects": {"bird": 1}},
+        {"start_frame": 4, "end_frame": 4, "objects": {"bird": 2}},
+    ]
+    assert result["objects"]["bird"] == {
+        "max_simultaneous": 2, "first_frame": 1, "last_frame": 4, "frames_seen": 3
+    }
+
+
+def test_truncated_run_does_not_extend_the_last_segment():
+    result = summarize([["bird"], ["person"], ["person"]], max_segments=1)
+    assert result["segments"] == [{"start_frame": 1, "end_frame": 1, "objects": {"bird": 1}}]
+    assert result["segments_truncated"] == 1
+
+
+def test_truncated_runs_are_counted_once():
+    result = summarize([["bird"], ["person"], ["person"], ["bird"], ["person"]], max_segments=1)
+    assert result["segments"][0]["end_frame"] == 1
+    assert result["segments_truncated"] == 3
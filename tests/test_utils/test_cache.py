@@ -0,0 +1,74 @@
+import time
+
+from utils.cache import MISSING, SQLiteCache, TTLCache, TieredCache
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_expiration():
+    cache = TTLCache(ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=10)
+    time.sleep(0.1)
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == 2
+
+
+def test_none_is_a_cached_value():
+    cache = TTLCache()
+    cache.set("a", None)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path)
+    cache.set(("query", 1), {"result": [1, 2]})
+    cache.close()
+    assert SQLiteCache(path).get(("query", 1)) == {"result": [1, 2]}
+
+
+def test_sqlite_cache_max_entries_keeps_latest_writes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+    cache.set("b", "b2")  # Rewriting an entry makes it the latest
+    cache.set("d", "d")
+    assert cache.get("a") is MISSING and cache.get("c") is MISSING
+    assert cache.get("b") == "b2" and cache.get("d") == "d"
+
+
+def test_sqlite_cache_expiration(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=0.05)
+    cache.set("a", 1)
+    time.sleep(0.1)
+    assert cache.get("a") is MISSING
+    cache.set("b", 2)
+    time.sleep(0.1)
+    assert cache.purge_expired() == 1
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    TieredCache(disk_path=path).set("a", 1)
+    cache = TieredCache(disk_path=path)  # Cold memory tier
+    assert cache.get("a") == 1
+    assert cache.get("a") == 1
+    assert cache.get("b") is MISSING
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_tiered_cache_delete(tmp_path):
+    cache = TieredCache(disk_path=str(tmp_path / "cache.sqlite"))
+    cache.set("a", 1)
+    cache.delete("a")
+    assert cache.get("a") is MISSING
@@ -0,0 +1,42 @@
+from langchain_core.tools import tool
+
+from utils import decorators
+from utils.decorators import memoize_tool, memoize_tools, tool_cache_stats
+
+
+calls = []
+
+
+@tool
+def word_count(text: str) -> int:
+    """Count the words of a text"""
+    calls.append(text)
+    return len(text.split())
+
+
+@tool
+def read_df(path: str) -> str:
+    """Stand-in for pandas_toolbox.read_df"""
+    return path
+
+
+def test_cache_is_built_on_first_use(tmp_path, monkeypatch):
+    path = tmp_path / "tool_results.sqlite"
+    monkeypatch.setattr(decorators, "TOOL_CACHE_DB", str(path))
+    monkeypatch.setattr(decorators, "_tool_cache", None)
+    memoized = memoize_tool(word_count)
+    assert not path.exists()
+    assert tool_cache_stats()["cache"] == {}
+
+    calls.clear()
+    assert memoized.invoke({"text": "a b c"}) == 3
+    assert memoized.invoke({"text": "a b c"}) == 3
+    assert calls == ["a b c"]
+    assert path.exists()
+    assert tool_cache_stats()["tools"]["word_count"]["hits"] >= 1
+
+
+def test_excluded_tools_are_left_unchanged():
+    tools = memoize_tools([word_count, read_df])
+    assert tools[1] is read_df
+    assert tools[0] is not word_count
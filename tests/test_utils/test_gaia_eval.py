@@ -0,0 +1,71 @@
+import asyncio
+import importlib
+import os
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def gaia_eval(monkeypatch):
+    # gaia_eval imports the agent module (LLM clients, browser) and its siblings by bare name
+    monkeypatch.syspath_prepend(os.path.join(ROOT_DIR, "src", "utils"))
+    answers = {}
+
+    async def run_app(user_query, **kwargs):
+        for question, answer in answers.items():
+            if question in user_query:
+                if isinstance(answer, Exception):
+                    raise answer
+                return answer
+        raise RuntimeError("unknown question")
+
+    monkeypatch.setitem(sys.modules, "react", types.SimpleNamespace(run_app=run_app))
+    monkeypatch.delitem(sys.modules, "utils.gaia_eval", raising=False)
+    module = importlib.import_module("utils.gaia_eval")
+    module.answers = answers
+    yield module
+    sys.modules.pop("utils.gaia_eval", None)
+
+
+def questions(*rows):
+    return pd.DataFrame(
+        [(question, None, truth) for question, truth in rows], columns=["Question", "file_path", "Final answer"]
+    )
+
+
+def test_results_are_appended_and_resumed(gaia_eval, tmp_path):
+    output_csv = str(tmp_path / "results.csv")
+    gaia_eval.answers.update({"Capital of France?": "Paris", "2 + 2?": RuntimeError("rate limited")})
+    df = questions(("Capital of France?", "paris"), ("2 + 2?", "4"))
+    results = asyncio.run(gaia_eval.run_evaluation(df, output_csv, tokens_per_minute=10**6))
+    assert results["Question"].tolist() == ["Capital of France?"]
+    assert results["is_correct"].tolist() == [1]
+
+    # Only the failed question runs again
+    gaia_eval.answers.update({"Capital of France?": RuntimeError("not asked again"), "2 + 2?": "5"})
+    results = asyncio.run(gaia_eval.run_evaluation(df, output_csv, tokens_per_minute=10**6))
+    assert sorted(results["Question"]) == ["2 + 2?", "Capital of France?"]
+    assert results.set_index("Question")["is_correct"].to_dict() == {"Capital of France?": 1, "2 + 2?": 0}
+
+
+def test_every_question_failed(gaia_eval, tmp_path):
+    output_csv = str(tmp_path / "results.csv")
+    gaia_eval.answers["2 + 2?"] = RuntimeError("invalid API key")
+    results = asyncio.run(
+        gaia_eval.run_evaluation(questions(("2 + 2?", "4")), output_csv, tokens_per_minute=10**6)
+    )
+    assert results.empty
+    assert results.columns.tolist() == gaia_eval.RESULT_COLUMNS
+    assert not os.path.exists(output_csv)
+
+
+def test_no_questions(gaia_eval, tmp_path):
+    results = asyncio.run(
+        gaia_eval.run_evaluation(questions(), str(tmp_path / "results.csv"), tokens_per_minute=10**6)
+    )
+    assert results.empty
@@ -0,0 +1,58 @@
+import warnings
+
+import pytest
+
+from utils.gaia_scorer import question_scorer, score_batch
+
+
+CASES = [
+    # Numbers
+    ("4", "4"),
+    ("4.0", "4"),
+    ("$1,000", "1000"),
+    ("12%", "12"),
+    (" 7 ", "7"),
+    ("1_000", "1000"),
+    ("٣", "3"),  # Arabic-Indic digit
+    ("1e3", "1000"),
+    ("seven", "7"),
+    ("", "7"),
+    ("3", "3.5"),
+    # Lists
+    ("a, b", "a; b"),
+    ("a, b", "a; c"),
+    ("a, b, c", "a; b"),
+    ("1_000, Paris", "1000, paris"),
+    ("$5; x", "5; x"),
+    # Strings
+    ("Paris", "paris"),
+    ("sea gull", "seagull"),
+    ("St. Petersburg", "St Petersburg"),
+    ("London", "Paris"),
+    ("", "Paris"),
+]
+
+
+def test_score_batch_matches_question_scorer():
+    answers, truths = zip(*CASES)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # question_scorer warns on list length mismatches
+        expected = [question_scorer(answer, truth) for answer, truth in CASES]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # e.g. pandas dtype FutureWarnings
+        scores = score_batch(answers, truths)
+    assert scores["score"].tolist() == expected
+    assert scores["score"].dtype == bool
+
+
+@pytest.mark.parametrize(
+    "answer, truth, reason",
+    [
+        ("5", "4", "number mismatch"),
+        ("four", "4", "answer is not a number"),
+        ("a, b, c", "a; b", "list length mismatch"),
+        ("London", "Paris", "string mismatch"),
+    ],
+)
+def test_failure_reasons(answer, truth, reason):
+    assert score_batch([answer], [truth])["failure_reason"].iloc[0] == reason
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from utils import python_pool
+from utils.python_pool import PythonWorkerPool
+
+
+@pytest.fixture(autouse=True)
+def no_preload(monkeypatch):
+    # Faster startup, the tests don't need numpy / pandas
+    monkeypatch.setattr(python_pool, "CODE_WORKER_PRELOAD", "")
+
+
+def run(snippets, **pool_kwargs):
+    """Run (code, kwargs) snippets in order on a fresh pool, return the answers and the pool."""
+
+    async def scenario():
+        pool = PythonWorkerPool(**pool_kwargs)
+        try:
+            return [await pool.run(code, **kwargs) for code, kwargs in snippets], pool
+        finally:
+            await pool.close()
+
+    return asyncio.run(scenario())
+
+
+def test_stdout_and_fresh_globals():
+    answers, _ = run([("x = 41\nprint(x + 1)", {}), ("print('x' in globals())", {})], size=1)
+    assert answers[0] == {"ok": True, "stdout": "42\n", "stderr": ""}
+    assert answers[1]["stdout"] == "False\n"
+
+
+def test_exception_is_reported():
+    [answer], _ = run([("1 / 0", {})], size=1)
+    assert not answer["ok"]
+    assert "ZeroDivisionError" in answer["stderr"]
+
+
+def test_secrets_are_not_inherited(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    [answer], _ = run([("import os; print(os.getenv('OPENAI_API_KEY'))", {})], size=1)
+    assert answer["stdout"] == "None\n"
+
+
+def test_timeout_replaces_the_worker():
+    answers, _ = run([("import time; time.sleep(5)", {"timeout": 0.5}), ("print('ok')", {})], size=1)
+    assert not answers[0]["ok"] and "Timeout" in answers[0]["stderr"]
+    assert answers[1]["stdout"] == "ok\n"
+
+
+def test_cpu_limit():
+    answers, _ = run([("while True: pass", {"cpu_seconds": 1, "timeout": 15}), ("print('ok')", {})], size=1)
+    assert not answers[0]["ok"] and "CPU time limit" in answers[0]["stderr"]
+    assert answers[1]["stdout"] == "ok\n"
+
+
+def test_memory_limit(monkeypatch):
+    monkeypatch.setattr(python_pool, "CODE_WORKER_MEMORY_MB", 512)
+    [answer], _ = run([("data = bytearray(2 * 1024**3)", {})], size=1)
+    assert not answer["ok"] and "MemoryError" in answer["stderr"]
+
+
+def test_workers_are_recycled_after_max_runs():
+    answers, pool = run([("import os; print(os.getpid())", {})] * 3, size=1, max_runs=2)
+    pids = [answer["stdout"] for answer in answers]
+    assert pids[0] == pids[1] != pids[2]
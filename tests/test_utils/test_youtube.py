@@ -0,0 +1,58 @@
+import pytest
+
+from utils import youtube
+
+
+class FakeStream:
+    def __init__(self, url):
+        self.url = url
+        self.filesize = 1024
+
+
+class FakeQuery:
+    def __init__(self, streams):
+        self.streams = streams
+
+    def filter(self, only_video=False, only_audio=False, **kwargs):
+        kind = "video" if only_video else "audio"
+        return FakeQuery([stream for stream in self.streams if stream.url.startswith(kind)])
+
+    def order_by(self, attribute):
+        return self
+
+    def asc(self):
+        return self
+
+    def first(self):
+        return self.streams[0] if self.streams else None
+
+
+@pytest.fixture
+def fake_youtube(monkeypatch):
+    import pytubefix
+
+    def install(*urls):
+        monkeypatch.setattr(
+            pytubefix, "YouTube", lambda url: type("YouTube", (), {"streams": FakeQuery(list(map(FakeStream, urls)))})
+        )
+
+    return install
+
+
+def test_resolve_streams(fake_youtube):
+    fake_youtube("video-144p", "audio-48kbps")
+    streams = youtube.resolve_streams("https://youtu.be/x", get_audio=True, get_video=True)
+    assert streams == {"audio": ("audio-48kbps", 1024), "video": ("video-144p", 1024)}
+
+
+@pytest.mark.parametrize("get_audio, get_video, missing", [(True, False, "audio"), (False, True, "video")])
+def test_missing_stream_is_reported(fake_youtube, get_audio, get_video, missing):
+    fake_youtube("video-144p" if missing == "audio" else "audio-48kbps")
+    with pytest.raises(RuntimeError, match=f"No {missing} stream"):
+        youtube.resolve_streams("https://youtu.be/x", get_audio=get_audio, get_video=get_video)
+
+
+def test_ingest_outputs_are_recognized():
+    assert youtube.is_ingest_output("data/temp/IMgN1MGRKgA/processed_yt_video.mp4")
+    assert youtube.is_ingest_output("data/temp/IMgN1MGRKgA/yt_audio.mp3")
+    assert not youtube.is_ingest_output("data/attachments/clip.mp4")